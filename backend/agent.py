@@ -1,6 +1,7 @@
 import asyncio, json, base64, re
 from pathlib import Path
-from typing import Literal
+from typing import Callable, Literal
+from backend.proxy_manager import ProxyInfo
 from backend.smart_browser_controller import SmartBrowserController
 from backend.vision_model import decide
 from backend.universal_extractor import UniversalExtractor
@@ -58,9 +59,13 @@ def get_content_type(fmt: str) -> str:
     return content_types.get(fmt, 'application/octet-stream')
 
 async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","html","csv","pdf"],
-                   headless: bool, proxy: dict | None, enable_streaming: bool = False):
-    """Enhanced agent with smart proxy rotation and vision-based anti-bot detection"""
-    from backend.main import broadcast, OUTPUT_DIR, register_streaming_session, store_job_info
+                   headless: bool, proxy_lease: ProxyInfo | None, enable_streaming: bool = False,
+                   on_lease_change: Callable[[ProxyInfo | None], None] | None = None):
+    """Enhanced agent with smart proxy rotation and vision-based anti-bot detection.
+
+    ``proxy_lease`` is the job's proxy lease; when the browser rotates to another
+    proxy it reports the new lease to ``on_lease_change``, whose owner releases it."""
+    from backend.main import broadcast, OUTPUT_DIR, register_streaming_session, store_job_info, warm_pool
     
     print(f"🚀 Starting smart agent with vision-based anti-bot detection")
     print(f"📋 Goal: {prompt}")
@@ -75,8 +80,19 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
     # Initialize universal extractor
     extractor = UniversalExtractor()
     
-    # Use SmartBrowserController instead of regular BrowserController
-    async with SmartBrowserController(headless, proxy, enable_streaming) as browser:
+    proxy = proxy_lease.to_playwright_dict() if proxy_lease else None
+    proxy_country = proxy_lease.location if proxy_lease else None
+    
+    # A pre-warmed SmartBrowserController context from the shared pool (cold
+    # lease on a miss). The pool's processes all run in one display mode, so a
+    # job asking for the other one gets a browser of its own.
+    if headless == warm_pool.pool.headless:
+        session = warm_pool.session(proxy=proxy, proxy_country=proxy_country, enable_streaming=enable_streaming)
+    else:
+        session = SmartBrowserController(headless, proxy, enable_streaming, proxy_country=proxy_country)
+    async with session as browser:
+        browser.proxy_lease = proxy_lease
+        browser.on_lease_change = on_lease_change
         
         # Register streaming session
         if enable_streaming:
@@ -99,14 +115,8 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
         })
         
         # Smart navigation to starting URL
-        url_match = re.search(r"https?://[\w\-\.]+[^\s]*", prompt)
-        if url_match:
-            start_url = url_match.group(0).rstrip('".,;')
-            print(f"🔗 Found URL in prompt: {start_url}")
-        else:
-            start_url = determine_starting_url(prompt)
-            # start_url = 'www.google.com'
-            print(f"🔗 Starting at: {start_url}")
+        start_url = find_start_url(prompt)
+        print(f"🔗 Starting at: {start_url}")
         
         try:
             # This now uses smart navigation with anti-bot detection and proxy rotation
@@ -154,7 +164,9 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
             
             try:
                 page_state = await browser.get_page_state(include_screenshot=True)
-                print(f"📊 Found {len(page_state.selector_map)} interactive elements")
+                extraction = browser.get_page_state_stats()
+                print(f"📊 Found {len(page_state.selector_map)} interactive elements "
+                      f"in {extraction['extraction_ms_last']}ms (cache hit ratio {extraction['cache_hit_ratio']:.0%})")
                 print(f"📍 Current: {page_state.url}")
                 
                 await broadcast(job_id, {
@@ -163,6 +175,7 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
                     "url": page_state.url,
                     "title": page_state.title,
                     "interactive_elements": len(page_state.selector_map),
+                    "extraction": extraction,
                     "format": fmt
                 })
                 
@@ -189,7 +202,8 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
             
             # AI decision making
             try:
-                screenshot_bytes = base64.b64decode(page_state.screenshot)
+                # The step's frame: same JPEG bytes that were just broadcast
+                screenshot_bytes = page_state.frame.jpeg if page_state.frame else base64.b64decode(page_state.screenshot)
                 decision = await decide(screenshot_bytes, page_state, prompt)
                 
                 print(f"🤖 AI Decision: {decision.get('action')} - {decision.get('reason', 'No reason')}")
@@ -217,7 +231,7 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
                         await browser.click_element_by_index(index, page_state)
                         consecutive_scrolls = 0
                         extraction_attempts = 0  # Reset on navigation
-                        await asyncio.sleep(CLICK_SETTLE_S)
+                        await browser.wait_until_ready(CLICK_SETTLE_S)
                     else:
                         print(f"❌ Invalid click index: {index}")
                         
@@ -250,7 +264,7 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
                     print(f"🔑 Pressing key: {key}")
                     await browser.press_key(key)
                     consecutive_scrolls = 0
-                    await asyncio.sleep(NAVIGATION_SETTLE_S)
+                    await browser.wait_until_ready(NAVIGATION_SETTLE_S)
                     
                 elif action == "navigate":
                     url = decision.get("url", "")
@@ -261,7 +275,7 @@ async def run_agent(job_id: str, prompt: str, fmt: Literal["txt","md","json","ht
                             await browser.goto(url)
                             consecutive_scrolls = 0
                             extraction_attempts = 0
-                            await asyncio.sleep(NAVIGATION_SETTLE_S)
+                            await browser.wait_until_ready(NAVIGATION_SETTLE_S)
                         except Exception as nav_error:
                             print(f"❌ Smart navigation failed: {nav_error}")
                             # Broadcast navigation failure with proxy stats
@@ -413,6 +427,13 @@ def determine_starting_url(prompt: str) -> str:
     # Default to Google for most tasks
     return "https://duckduckgo.com/"
 
+def find_start_url(prompt: str) -> str:
+    """The URL named in the prompt, else the best guess from determine_starting_url"""
+    url_match = re.search(r"https?://[\w\-\.]+[^\s]*", prompt)
+    if url_match:
+        return url_match.group(0).rstrip('".,;')
+    return determine_starting_url(prompt)
+
 def determine_max_steps(prompt: str) -> int:
     """Determine max steps based on task complexity"""
     prompt_lower = prompt.lower()
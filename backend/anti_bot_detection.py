@@ -179,3 +179,14 @@ class AntiBotVisionModel:
                 "confidence": 0.0,
                 "instructions": f"CAPTCHA solving failed: {str(e)}"
             }
+
+
+_shared_model: AntiBotVisionModel | None = None
+
+
+def get_shared_vision_model() -> AntiBotVisionModel:
+    """The process-wide vision model, created on first use."""
+    global _shared_model
+    if _shared_model is None:
+        _shared_model = AntiBotVisionModel()
+    return _shared_model
@@ -0,0 +1,182 @@
+"""Cheap local anti-bot classifier that runs ahead of the vision model.
+
+A screenshot plus a Gemini call costs seconds per page. The browser already
+holds most of what that call would report: the HTTP status, the response
+headers, the cookies the site set, the scripts it loaded and the title.
+``classify_page`` turns those into one of three verdicts:
+
+- BLOCKED: a known challenge or block signature (429, ``cf-mitigated``,
+  DataDome/PerimeterX/Cloudflare interstitial markup; weaker markup and
+  block-page titles only on an error status or a short page)
+- CLEAN: a normal response with real content and no signatures
+- AMBIGUOUS: everything else (tiny pages, bare 403/503, weak text hints)
+
+Only AMBIGUOUS pages need the vision model.
+"""
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterable, Mapping
+
+# Text fragments that usually mean a block page. Also plain English words,
+# so they count only on small pages or alongside an error status.
+BLOCK_TEXT_SIGNALS = frozenset([
+    "access denied", "blocked", "captcha", "challenge",
+    "verify you are human", "pardon our interruption",
+    "please turn javascript on", "checking your browser",
+])
+
+# (detection_type, markers). Only interstitial pages carry these, so a match in
+# the raw HTML is conclusive.
+_HTML_SIGNATURES = (
+    ("cloudflare", ("_cf_chl_opt", "/cdn-cgi/challenge-platform/h/g/orchestrate",
+                    'id="challenge-form"', "__cf_chl_f_tk", "__cf_chl_rt_tk")),
+    ("captcha", ("captcha-delivery.com", "px-captcha")),
+    ("access_denied", ("_incapsula_resource?cwudnsai",)),
+)
+
+# (detection_type, markers) that normal pages can carry too (Cloudflare's JS
+# Detections script lives under /cdn-cgi/challenge-platform/, the AWS WAF
+# captcha SDK loads anywhere): they count only alongside a block status or on a short page.
+_WEAK_HTML_SIGNATURES = (
+    ("cloudflare", ("cf-chl-", "cf_chl_", "/cdn-cgi/challenge-platform/")),
+    ("captcha", ("awswafcaptcha",)),
+)
+
+# (detection_type, title fragments). Article titles can say these too, so they
+# count only alongside a block status or on a short page.
+_TITLE_SIGNATURES = (
+    ("cloudflare", ("just a moment", "attention required", "checking your browser")),
+    ("captcha", ("are you a robot", "are you a human", "robot check", "verify you are human",
+                 "human verification", "security check")),
+    ("access_denied", ("access denied", "access to this page has been denied", "request unsuccessful",
+                       "pardon our interruption", "you have been blocked", "403 forbidden")),
+    ("rate_limit", ("too many requests", "rate limited")),
+)
+
+# Bot-management cookies. Protected sites also set these on normal pages, so
+# they only tip a 401/403/503 over to BLOCKED.
+_VENDOR_COOKIES = ("datadome", "_px", "ak_bmsc", "bm_sz", "incap_ses_", "visid_incap_", "reese84", "__cf_bm")
+
+_SUGGESTED_ACTION = {
+    "cloudflare": "rotate_proxy",
+    "captcha": "solve_captcha",
+    "access_denied": "rotate_proxy",
+    "rate_limit": "rotate_proxy",
+}
+
+# Pages with at least this much visible text and no signatures are real content.
+CLEAN_MIN_TEXT = 200
+# Weak text hints, weak markup and block titles on pages longer than this are
+# treated as content, not a block.
+WEAK_SIGNAL_MAX_TEXT = 2000
+# Statuses that make weak signatures count on any page length
+_BLOCK_STATUSES = (403, 429, 503)
+
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|noscript)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class Verdict(str, Enum):
+    CLEAN = "clean"
+    BLOCKED = "blocked"
+    AMBIGUOUS = "ambiguous"
+
+
+@dataclass(frozen=True)
+class Classification:
+    verdict: Verdict
+    detection_type: str = "none"
+    suggested_action: str | None = None
+    reason: str = ""
+
+    @property
+    def is_anti_bot(self) -> bool:
+        return self.verdict is Verdict.BLOCKED
+
+
+def visible_text(html: str) -> str:
+    """Rough visible text of an HTML document: scripts, styles and tags removed."""
+    text = _SCRIPT_STYLE_RE.sub(" ", html)
+    text = _TAG_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _blocked(detection_type: str, reason: str) -> Classification:
+    return Classification(Verdict.BLOCKED, detection_type, _SUGGESTED_ACTION.get(detection_type, "rotate_proxy"), reason)
+
+
+def classify_page(
+    status: int = 0,
+    headers: Mapping[str, str] | None = None,
+    cookie_names: Iterable[str] = (),
+    html: str = "",
+    title: str = "",
+) -> Classification:
+    """Classify a loaded page from what the browser already has in hand.
+
+    ``status`` 0 means no response was observed (e.g. a same-document
+    navigation) and is treated like 200. Header names are matched
+    case-insensitively.
+    """
+    headers = {k.lower(): str(v).lower() for k, v in (headers or {}).items()}
+    title_l = (title or "").strip().lower()
+    html_l = (html or "").lower()
+
+    if status == 429:
+        return _blocked("rate_limit", "HTTP 429")
+    if headers.get("cf-mitigated") == "challenge":
+        return _blocked("cloudflare", "cf-mitigated: challenge")
+    if "captcha" in headers.get("x-amzn-waf-action", "") or ("x-datadome" in headers and status in (401, 403)):
+        return _blocked("captcha", "WAF captcha header")
+
+    for detection_type, markers in _HTML_SIGNATURES:
+        for marker in markers:
+            if marker in html_l:
+                return _blocked(detection_type, f"markup contains {marker!r}")
+
+    text = visible_text(html_l) if html_l else ""
+    if status in _BLOCK_STATUSES or len(text) < WEAK_SIGNAL_MAX_TEXT:
+        for detection_type, markers in _WEAK_HTML_SIGNATURES:
+            for marker in markers:
+                if marker in html_l:
+                    return _blocked(detection_type, f"markup contains {marker!r}")
+        for detection_type, fragments in _TITLE_SIGNATURES:
+            for fragment in fragments:
+                if fragment in title_l:
+                    return _blocked(detection_type, f"title contains {fragment!r}")
+
+    hints = sorted(s for s in BLOCK_TEXT_SIGNALS if s in text)
+    vendor = any(name.lower().startswith(_VENDOR_COOKIES) for name in cookie_names)
+    protected = vendor or "cloudflare" in headers.get("server", "")
+
+    if status in (401, 403, 503):
+        if hints:
+            return _blocked("access_denied", f"HTTP {status} with {hints[0]!r}")
+        if protected and len(text) < WEAK_SIGNAL_MAX_TEXT:
+            return _blocked("access_denied", f"HTTP {status} from a bot-managed site")
+        return Classification(Verdict.AMBIGUOUS, reason=f"HTTP {status} without a known signature")
+    if status >= 500:
+        return Classification(Verdict.AMBIGUOUS, reason=f"HTTP {status}")
+    if status >= 400:
+        return Classification(Verdict.CLEAN, reason=f"HTTP {status} is not a block")
+    if hints and len(text) < WEAK_SIGNAL_MAX_TEXT:
+        return Classification(Verdict.AMBIGUOUS, reason=f"short page mentions {hints[0]!r}")
+    if len(text) < CLEAN_MIN_TEXT:
+        return Classification(Verdict.AMBIGUOUS, reason=f"only {len(text)} chars of text")
+    return Classification(Verdict.CLEAN, reason="content page without signatures")
+
+
+async def classify_live_page(page, response=None) -> Classification:
+    """Run ``classify_page`` on a Playwright page and the response that loaded it."""
+    try:
+        status = response.status if response else 0
+        headers = response.headers if response else {}
+        title = await page.title()
+        html = await page.content()
+        cookies = await page.context.cookies()
+    except Exception as e:
+        return Classification(Verdict.AMBIGUOUS, reason=f"could not inspect page: {e}")
+    return classify_page(status, headers, (c.get("name", "") for c in cookies), html, title)
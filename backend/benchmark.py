@@ -11,15 +11,22 @@ Usage:
     python -m backend.benchmark --only sannysoft     # run a subset
     python -m backend.benchmark --dry-run            # list targets, launch nothing
     python -m backend.benchmark --headless           # for servers without a display
+    python -m backend.benchmark --concurrency 4      # detectors in parallel, one context each
+    python -m backend.benchmark --rotation 10        # proxy-rotation latency: relaunch vs new context
+    python -m backend.benchmark --readiness 5        # fixed settle sleep vs event-driven readiness
+    python -m backend.benchmark --page-state 5 --pages saved/  # JS vs DOMSnapshot extraction on saved pages
 
 The pure helpers (interpret_evaluation, build_summary_table, select_targets,
 parse_args) are import-safe and browser-free so they can be unit-tested without
-launching Chromium; BrowserController is imported lazily only when a run starts.
+launching Chromium; BrowserPool is imported lazily only when a run starts. Each
+detector gets its own leased context, so no cookies or storage leak between them.
 """
 from __future__ import annotations
 
 import argparse
 import asyncio
+import statistics
+import time
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional
@@ -194,6 +201,16 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     p.add_argument("--out", default=str(DEFAULT_OUT_DIR), help="Artifact output directory")
     p.add_argument("--dry-run", action="store_true", help="List selected targets and exit (no browser)")
     p.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT_MS, help="Per-page navigation timeout (ms)")
+    p.add_argument("--concurrency", type=int, default=1,
+                   help="Detectors to run at once, each in its own context on one Chromium process")
+    p.add_argument("--rotation", type=int, default=0, metavar="N",
+                   help="Instead of detectors, time N proxy rotations: full relaunch vs new context")
+    p.add_argument("--readiness", type=int, default=0, metavar="N",
+                   help="Instead of detectors, load N rounds of local test pages: fixed settle vs readiness wait")
+    p.add_argument("--page-state", type=int, default=0, metavar="N",
+                   help="Instead of detectors, time N page-state extractions per page: JS walk vs DOM snapshot")
+    p.add_argument("--pages", metavar="DIR",
+                   help="Saved .html pages for --page-state (default: generated heavy catalog pages)")
     return p.parse_args(argv)
 
 
@@ -245,21 +262,254 @@ async def run_target(bc: Any, target: BenchmarkTarget, out_dir: Path, timeout_ms
 
 
 async def run_benchmark(targets: list[BenchmarkTarget], out_dir: Path,
-                        headless: bool = False, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> list[BenchmarkResult]:
+                        headless: bool = False, timeout_ms: int = DEFAULT_TIMEOUT_MS,
+                        concurrency: int = 1, pool: Any = None) -> list[BenchmarkResult]:
+    """Run every target in its own leased context, ``concurrency`` at a time.
+
+    ``pool`` is anything with ``leased()`` (a BrowserPool in production); by
+    default a single-process pool is created for the run and closed after it.
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
-    # Lazy import: keeps the pure helpers (and their tests) browser-free.
-    from backend.browser_controller import BrowserController
+    own_pool = pool is None
+    if own_pool:
+        # Lazy import: keeps the pure helpers (and their tests) browser-free.
+        from backend.browser_pool import BrowserPool
+        pool = BrowserPool(processes=1, contexts_per_process=max(1, concurrency), headless=headless)
+
+    sem = asyncio.Semaphore(max(1, concurrency))
 
-    results: list[BenchmarkResult] = []
-    async with BrowserController(headless=headless, proxy=None) as bc:
-        for target in targets:
+    async def one(target: BenchmarkTarget) -> BenchmarkResult:
+        async with sem:
             print(f"→ {target.name}: {target.url}")
-            results.append(await run_target(bc, target, out_dir, timeout_ms))
-    return results
+            async with pool.leased() as bc:
+                return await run_target(bc, target, out_dir, timeout_ms)
+
+    try:
+        return list(await asyncio.gather(*(one(t) for t in targets)))
+    finally:
+        if own_pool:
+            await pool.close()
+
+
+# ── Proxy rotation latency ───────────────────────────────────────────────────
+async def time_rotations(rotate: Any, rounds: int) -> dict[str, Any]:
+    """Await ``rotate()`` ``rounds`` times and summarize the latency in ms."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await rotate()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "rounds": rounds,
+        "mean_ms": round(statistics.fmean(samples), 1),
+        "p50_ms": round(samples[len(samples) // 2], 1),
+        "max_ms": round(samples[-1], 1),
+    }
+
+
+async def run_rotation_benchmark(rounds: int, headless: bool = False) -> list[dict[str, Any]]:
+    """Compare the old rotation (close Chromium, launch a new one) with the
+    per-context rotation ``SmartBrowserController`` now does."""
+    from backend.smart_browser_controller import SmartBrowserController
+
+    async with SmartBrowserController(headless, None) as bc:
+        async def relaunch():
+            await bc.browser.close()
+            bc.browser = await bc.play.chromium.launch(**bc._launch_options())
+            await bc._open_context()
+
+        async def new_context():
+            await bc._restart_browser_with_proxy(None)
+
+        return [
+            {"method": "relaunch", **await time_rotations(relaunch, rounds)},
+            {"method": "new_context", **await time_rotations(new_context, rounds)},
+        ]
+
+
+# ── Page readiness ───────────────────────────────────────────────────────────
+# Local pages with different load behaviour. Each adds #done once its content is
+# complete, so a wait that returned too early shows up as incomplete.
+_DONE = "document.body.appendChild(Object.assign(document.createElement('div'), {id: 'done'}))"
+READINESS_PAGES: dict[str, str] = {
+    "static": f"<html><body><h1>Static</h1><script>{_DONE}</script></body></html>",
+    "late_xhr": (
+        "<html><body><div id='out'>loading</div><script>"
+        "setTimeout(() => fetch('/api/slow?ms=600').then(r => r.text()).then(t => {"
+        f"document.getElementById('out').textContent = t; {_DONE}; }}), 100);"
+        "</script></body></html>"
+    ),
+    "dom_churn": (
+        "<html><body><ul id='list'></ul><script>let n = 0; const t = setInterval(() => {"
+        "document.getElementById('list').appendChild(document.createElement('li'));"
+        f"if (++n === 12) {{ clearInterval(t); {_DONE}; }} }}, 50);</script></body></html>"
+    ),
+    "slow_image": (
+        "<html><body><img src='/api/slow?ms=900' "
+        f"onload=\"{_DONE}\" onerror=\"{_DONE}\"></body></html>"
+    ),
+    # never goes quiet: the wait is capped at the old settle time
+    "ticker": (
+        "<html><body><span id='clock'></span><script>"
+        f"{_DONE}; setInterval(() => {{ document.getElementById('clock').textContent = Date.now(); }}, 100);"
+        "</script></body></html>"
+    ),
+}
+
+
+async def start_readiness_server() -> tuple[Any, str]:
+    """Serve READINESS_PAGES (and a delayed /api/slow) on localhost; returns (runner, base_url)."""
+    from aiohttp import web
+
+    async def page(request):
+        return web.Response(text=READINESS_PAGES[request.match_info["name"]], content_type="text/html")
+
+    async def slow(request):
+        await asyncio.sleep(int(request.query.get("ms", "500")) / 1000)
+        return web.Response(text="loaded")
+
+    app = web.Application()
+    app.router.add_get("/page/{name}", page)
+    app.router.add_get("/api/slow", slow)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+async def run_readiness_benchmark(rounds: int, headless: bool = False) -> list[dict[str, Any]]:
+    """Per page: time after ``domcontentloaded`` and share of loads complete when
+    the wait returned, for the fixed ``NAVIGATION_SETTLE_S`` sleep vs ``wait_for_ready``."""
+    from backend.config import NAVIGATION_SETTLE_S
+    from backend.page_readiness import wait_for_ready
+    from backend.browser_pool import BrowserPool
+
+    async def fixed(page):
+        await asyncio.sleep(NAVIGATION_SETTLE_S)
+
+    async def event_driven(page):
+        await wait_for_ready(page, NAVIGATION_SETTLE_S)
+
+    runner, base = await start_readiness_server()
+    pool = BrowserPool(processes=1, contexts_per_process=1, headless=headless)
+    rows = []
+    try:
+        async with pool.leased() as bc:
+            for name in READINESS_PAGES:
+                for method, wait in (("fixed", fixed), ("readiness", event_driven)):
+                    samples, complete = [], 0
+                    for _ in range(rounds):
+                        await bc.page.goto(f"{base}/page/{name}", wait_until="domcontentloaded")
+                        start = time.perf_counter()
+                        await wait(bc.page)
+                        samples.append((time.perf_counter() - start) * 1000)
+                        complete += bool(await bc.page.query_selector("#done"))
+                    rows.append({"page": name, "method": method,
+                                 "mean_ms": round(statistics.fmean(samples), 1),
+                                 "complete": f"{complete}/{rounds}"})
+    finally:
+        await pool.close()
+        await runner.cleanup()
+    return rows
+
+
+# ── Page-state engines ───────────────────────────────────────────────────────
+def heavy_page_html(products: int) -> str:
+    """A product-listing page shaped like a heavy retail site: nav, filters,
+    ``products`` cards with links, buttons and inputs, and plenty of hidden markup."""
+    nav = "".join(f"<li><a href='/c/{i}'>Category {i}</a></li>" for i in range(60))
+    filters = "".join(
+        f"<label><input type='checkbox' name='f{i}'> Filter {i}</label>"
+        f"<div class='tip' style='display:none'><span>Help for filter {i}</span></div>" for i in range(40)
+    )
+    cards = "".join(
+        f"<div class='card' style='cursor:pointer'><img alt='Product {i}' width='120' height='90'>"
+        f"<h3><a href='/p/{i}'>Product {i} with a reasonably long descriptive title</a></h3>"
+        f"<div class='price'><span>$</span><span>{i % 97}.99</span></div>"
+        f"<select name='qty{i}'><option value='1'>1</option><option value='2'>2</option></select>"
+        f"<button type='button' onclick='void 0'>Add to cart</button>"
+        f"<div role='button' tabindex='0'>Save</div><ul class='specs'>"
+        + "".join(f"<li><span>Spec {k}</span><span>value {k}</span></li>" for k in range(4))
+        + "</ul></div>"
+        for i in range(products)
+    )
+    return (
+        "<html><head><style>.card{display:inline-block;width:220px;margin:8px}</style></head><body>"
+        f"<header><input type='search' placeholder='Search'><nav><ul>{nav}</ul></nav></header>"
+        f"<aside>{filters}</aside><main>{cards}</main></body></html>"
+    )
+
+
+def load_pages(pages_dir: Optional[str]) -> dict[str, str]:
+    """Saved pages (``*.html`` / ``*.htm`` in ``pages_dir``) by file name, or generated ones."""
+    if not pages_dir:
+        return {f"catalog_{n}": heavy_page_html(n) for n in (200, 1000, 3000)}
+    files = sorted(p for p in Path(pages_dir).iterdir() if p.suffix.lower() in (".html", ".htm"))
+    return {p.name: p.read_text(encoding="utf-8", errors="replace") for p in files}
+
+
+def compare_selector_maps(js: list[dict], snapshot: list[dict]) -> float:
+    """Share of indexed elements both engines agree on (same index, tag and text)."""
+    a = {e["index"]: (e["tagName"], e["text"]) for e in js if e["index"] is not None}
+    b = {e["index"]: (e["tagName"], e["text"]) for e in snapshot if e["index"] is not None}
+    if not a and not b:
+        return 1.0
+    return sum(1 for i, v in a.items() if b.get(i) == v) / max(len(a), len(b))
+
+
+async def run_page_state_benchmark(rounds: int, pages_dir: Optional[str] = None,
+                                   headless: bool = False) -> list[dict[str, Any]]:
+    """Per page and engine: mean extraction time and indexed elements, plus how
+    closely the snapshot engine's selector map matches the JS engine's."""
+    from backend.browser_pool import BrowserPool
+
+    pages = load_pages(pages_dir)
+    pool = BrowserPool(processes=1, contexts_per_process=1, headless=headless)
+    rows = []
+    try:
+        async with pool.leased() as bc:
+            # Saved pages still point at live assets; keep the network out of it
+            await bc.page.route("**/*", lambda route: route.abort())
+            for name, html in pages.items():
+                await bc.page.set_content(html, wait_until="domcontentloaded")
+                found = {}
+                for engine in ("js", "snapshot"):
+                    bc.page_state_engine = engine
+                    samples = []
+                    for _ in range(rounds):
+                        start = time.perf_counter()
+                        found[engine] = (await bc._extract_elements(highlight_elements=False))["elements"]
+                        samples.append((time.perf_counter() - start) * 1000)
+                    rows.append({"page": name, "engine": engine,
+                                 "mean_ms": round(statistics.fmean(samples), 1),
+                                 "indexed": sum(e["index"] is not None for e in found[engine])})
+                rows[-1]["match"] = f"{compare_selector_maps(found['js'], found['snapshot']):.1%}"
+    finally:
+        await pool.close()
+    return rows
 
 
 def main(argv: Optional[list[str]] = None) -> int:
     args = parse_args(argv)
+    if args.rotation > 0:
+        for row in asyncio.run(run_rotation_benchmark(args.rotation, headless=args.headless)):
+            print(f"{row['method'].ljust(12)} mean {row['mean_ms']}ms  p50 {row['p50_ms']}ms  max {row['max_ms']}ms")
+        return 0
+    if args.readiness > 0:
+        for row in asyncio.run(run_readiness_benchmark(args.readiness, headless=args.headless)):
+            print(f"{row['page'].ljust(11)} {row['method'].ljust(10)} mean {row['mean_ms']}ms  complete {row['complete']}")
+        return 0
+
+    if args.page_state > 0:
+        for row in asyncio.run(run_page_state_benchmark(args.page_state, args.pages, headless=args.headless)):
+            match = f"  match {row['match']}" if "match" in row else ""
+            print(f"{row['page'][:24].ljust(24)} {row['engine'].ljust(9)} mean {row['mean_ms']}ms"
+                  f"  indexed {row['indexed']}{match}")
+        return 0
+
     targets = select_targets(args.only)
     if not targets:
         print("No matching detectors. Available:", ", ".join(t.name for t in TARGETS))
@@ -271,7 +521,8 @@ def main(argv: Optional[list[str]] = None) -> int:
         return 0
 
     out_dir = Path(args.out)
-    results = asyncio.run(run_benchmark(targets, out_dir, headless=args.headless, timeout_ms=args.timeout))
+    results = asyncio.run(run_benchmark(targets, out_dir, headless=args.headless,
+                                        timeout_ms=args.timeout, concurrency=args.concurrency))
     print("\n" + build_summary_table(results))
     print(f"\nArtifacts (screenshot + text per detector): {out_dir}/")
     return 0
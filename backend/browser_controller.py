@@ -1,14 +1,13 @@
 import asyncio
-import subprocess
 import os
 import logging
 import json
 import base64
+import time
 from typing import Optional, Dict, List, Any, Tuple
 import hashlib
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from pydantic import BaseModel
-from pathlib import Path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -19,12 +18,16 @@ from backend.config import (
     BROWSER_VIEWPORT_WIDTH, BROWSER_VIEWPORT_HEIGHT,
     NAVIGATION_SETTLE_S, CLICK_SETTLE_S, SCROLL_SETTLE_S,
     INTERACTION_DELAY_S, STREAM_POLL_INTERVAL_S,
-    WS_BASE_URL, XVFB_DISPLAY_START, XVFB_DISPLAY_END,
+    WS_BASE_URL,
     GHOST_MODE_ENABLED, GHOST_MODE_HUMAN_BEHAVIOR, GHOST_MODE_SEED,
+    PAGE_STATE_ENGINE, FRAME_JPEG_QUALITY, FRAME_MAX_WIDTH, FRAME_MAX_HEIGHT,
     get_random_ua,
 )
 from backend.stealth_engine import get_ua_headers
+from backend.display_manager import display_manager
 from backend.fingerprint_profile import generate_profile, FingerprintProfile
+from backend.page_readiness import Readiness, track_network, wait_for_ready
+from backend import dom_snapshot
 from backend.human_behavior import (
     human_move_and_click, human_type, human_scroll, human_pre_action_pause,
 )
@@ -49,14 +52,29 @@ class ElementInfo:
     center_coordinates: Optional[Dict[str, float]] = None
     viewport_coordinates: Optional[Dict[str, float]] = None
 
+@dataclass
+class Frame:
+    """One viewport screenshot as JPEG, shared by everything that needs the current picture"""
+    jpeg: bytes
+    url: str
+    captured_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def b64(self) -> str:
+        if not hasattr(self, "_b64"):
+            self._b64 = base64.b64encode(self.jpeg).decode('utf-8')
+        return self._b64
+
 class PageState:
     """Page state compatible with browser-use"""
-    def __init__(self, url: str, title: str, elements: List[ElementInfo], selector_map: Dict[int, ElementInfo], screenshot: Optional[str] = None):
+    def __init__(self, url: str, title: str, elements: List[ElementInfo], selector_map: Dict[int, ElementInfo],
+                 screenshot: Optional[str] = None, frame: Optional[Frame] = None):
         self.url = url
         self.title = title
         self.elements = elements
         self.selector_map = selector_map
         self.screenshot = screenshot
+        self.frame = frame
         self.clickable_elements = [e for e in elements if e.is_clickable]
         self.input_elements = [e for e in elements if e.is_input]
 
@@ -76,25 +94,25 @@ class BrowserController:
         self.stream_clients = set()
         self._cached_page_state = None
         self._cached_url = None
+        # get_page_state: wall time per call, and element data served from the in-page cache
+        self.extraction_times_ms: list[float] = []
+        self.page_state_counts = {"full": 0, "incremental": 0, "unchanged": 0, "reused": 0, "extracted": 0}
         self._last_action_timestamp = None
         self.input_enabled = False
-        self._original_display = os.environ.get("DISPLAY")
-        self._display_was_set = False
-        self._xvfb_process: subprocess.Popen | None = None
-        self._xvfb_display: str | None = None
+        self._display: str | None = None
         self._profile: FingerprintProfile | None = None
+        self._leased = False
 
         # Load the robust DOM extraction JavaScript
         self.dom_js = self._get_dom_extraction_js()
-
-    def _find_free_display(self, start: int = XVFB_DISPLAY_START, end: int = XVFB_DISPLAY_END) -> int:
-        """Locate a free X display number for Xvfb."""
-        for display in range(start, end):
-            lock_file = Path(f"/tmp/.X{display}-lock")
-            if not lock_file.exists():
-                return display
-        # Fall back to the starting display even if locked (Xvfb will fail clearly)
-        return start
+        self.page_state_engine = PAGE_STATE_ENGINE
+        # CDP session for DOM snapshots and frames, tied to the page it was opened on
+        self._page_session = None
+        self._session_page = None
+        # The current step's screenshot; dropped by every action (see capture_frame)
+        self._frame: Frame | None = None
+        self._frame_page = None
+        self.frame_counts = {"captured": 0, "reused": 0}
 
     def _get_launch_args(self) -> list:
         """Chromium launch arguments shared by initial launch and proxy-rotation restarts."""
@@ -114,110 +132,74 @@ class BrowserController:
             "--use-angle=vulkan",
         ]
 
-    def _terminate_xvfb(self):
-        """Stop the Xvfb process if it was started."""
-        if not self._xvfb_process:
-            return
-
-        self._xvfb_process.terminate()
-        try:
-            self._xvfb_process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            self._xvfb_process.kill()
-        finally:
-            self._xvfb_process = None
-            self._xvfb_display = None
+    def _launch_options(self) -> dict:
+        """``chromium.launch`` kwargs: mode, args, and our leased display if we have one."""
+        options = {
+            "headless": self.headless,
+            "args": self._get_launch_args(),
+        }
+        if self._display:
+            options["env"] = {**os.environ, "DISPLAY": self._display}
+        if self.proxy:
+            options["proxy"] = self.proxy
+        return options
 
     async def _ensure_display(self):
-        """Start a virtual X server when running in headful mode without DISPLAY."""
-        if self.headless or os.environ.get("DISPLAY"):
+        """Lease a shared Xvfb screen when running headful without a DISPLAY."""
+        if self.headless or self._display or os.environ.get("DISPLAY"):
             return
-
-        display_number = self._find_free_display()
-        display = f":{display_number}"
-        xvfb_cmd = [
-            "Xvfb",
-            display,
-            "-screen",
-            "0",
-            "1280x800x24",
-            "-nolisten",
-            "tcp",
-        ]
-
-        try:
-            self._xvfb_process = subprocess.Popen(
-                xvfb_cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            self._xvfb_display = display
-            logger.info("🖥️ Started Xvfb on display %s for headful browser session", display)
-        except FileNotFoundError:
-            logger.warning("⚠️ Xvfb not available; falling back to headless mode")
+        self._display = await display_manager.acquire()
+        if self._display is None:
+            logger.warning("⚠️ No X display available; falling back to headless mode")
             self.headless = True
-            return
-
-        # Wait briefly for Xvfb to be ready
-        ready = False
-        for _ in range(30):
-            if self._xvfb_process.poll() is not None:
-                logger.error(
-                    "❌ Xvfb exited prematurely with code %s", self._xvfb_process.returncode
-                )
-                self._terminate_xvfb()
-                self.headless = True
-                return
-            if Path(f"/tmp/.X{display_number}-lock").exists():
-                ready = True
-                break
-            await asyncio.sleep(0.1)
-
-        if not ready:
-            logger.warning("⚠️ Timed out waiting for Xvfb; falling back to headless mode")
-            self._terminate_xvfb()
-            self.headless = True
-            return
-
-        os.environ["DISPLAY"] = display
-        self._display_was_set = True
 
     def _restore_display(self):
-        """Restore the DISPLAY environment variable and stop Xvfb if needed."""
-        self._terminate_xvfb()
-
-        if not self._display_was_set:
-            return
-
-        if self._original_display is None:
-            os.environ.pop("DISPLAY", None)
-        else:
-            os.environ["DISPLAY"] = self._original_display
-
-        self._display_was_set = False
+        """Hand our Xvfb screen back to the shared display manager."""
+        if self._display:
+            display_manager.release(self._display)
+            self._display = None
 
     async def __aenter__(self):
         """Initialize browser with CDP streaming support"""
         await self._ensure_display()
 
-        if GHOST_MODE_ENABLED:
-            seed = GHOST_MODE_SEED if GHOST_MODE_SEED else None
-            self._profile = generate_profile(seed=seed, proxy_country=self._proxy_country)
-            self._user_agent = self._profile.user_agent
-        else:
-            self._profile = generate_profile(user_agent=get_random_ua())
-            self._user_agent = self._profile.user_agent
+        self._profile = self._default_profile()
+        self._user_agent = self._profile.user_agent
 
         self.play = await async_playwright().start()
+        self.browser = await self.play.chromium.launch(**self._launch_options())
+        await self._open_context()
 
-        launch_options = {
-            "headless": self.headless,
-            "args": self._get_launch_args(),
-        }
-        if self.proxy:
-            launch_options["proxy"] = self.proxy
+        # Set up CDP session for streaming
+        if self.enable_streaming:
+            await self._setup_cdp_streaming()
+
+        return self
+
+    async def attach(self, browser, profile: FingerprintProfile | None = None):
+        """Open this controller's own context on a browser someone else launched.
 
-        self.browser = await self.play.chromium.launch(**launch_options)
+        Used by ``BrowserPool``: the controller gets an isolated context (its own
+        fingerprint, proxy, cookies) but does not own the Chromium process, so
+        ``__aexit__`` closes only the context.
+        """
+        self.browser = browser
+        self._leased = True
+        self._profile = profile or self._default_profile()
+        self._user_agent = self._profile.user_agent
+        await self._open_context()
+        if self.enable_streaming:
+            await self._setup_cdp_streaming()
+        return self
+
+    def _default_profile(self) -> FingerprintProfile:
+        if GHOST_MODE_ENABLED:
+            seed = GHOST_MODE_SEED if GHOST_MODE_SEED else None
+            return generate_profile(seed=seed, proxy_country=self._proxy_country)
+        return generate_profile(user_agent=get_random_ua())
+
+    async def _open_context(self, cookies: list[dict] | None = None):
+        """Create a context + page for the current profile and proxy; make it ``self.page``."""
         context = await self.browser.new_context(
             viewport={"width": self._profile.viewport_width, "height": self._profile.viewport_height},
             user_agent=self._user_agent,
@@ -228,23 +210,36 @@ class BrowserController:
             color_scheme="light",
             proxy=self.proxy if self.proxy else None,
         )
+
+        if cookies:
+            await context.add_cookies(cookies)
+
         if self.block_resources:
-            _BLOCKED_TYPES = {"image", "media", "font", "stylesheet"}
-            async def _block_route(route):
-                if route.request.resource_type in _BLOCKED_TYPES:
-                    await route.abort()
-                else:
-                    await route.continue_()
-            await context.route("**/*", _block_route)
+            await context.route("**/*", self._block_route)
 
         self.page = await context.new_page()
+        track_network(self.page)
         await self.page.set_extra_http_headers(get_ua_headers(self._user_agent))
 
-        # Set up CDP session for streaming
-        if self.enable_streaming:
-            await self._setup_cdp_streaming()
+    _BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
 
-        return self
+    async def _block_route(self, route):
+        if route.request.resource_type in self._BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def set_resource_blocking(self, enabled: bool):
+        """Turn image/media/font/CSS blocking on or off for the current context."""
+        if enabled == self.block_resources:
+            return
+        self.block_resources = enabled
+        if not self.page:
+            return
+        if enabled:
+            await self.page.context.route("**/*", self._block_route)
+        else:
+            await self.page.context.unroute("**/*", self._block_route)
 
     async def get_cookies(self) -> list[dict]:
         """Export cookies from the current context."""
@@ -266,31 +261,7 @@ class BrowserController:
             self._profile = new_profile
             self._user_agent = new_profile.user_agent
 
-        context = await self.browser.new_context(
-            viewport={"width": self._profile.viewport_width, "height": self._profile.viewport_height},
-            user_agent=self._user_agent,
-            locale=self._profile.locale,
-            timezone_id=self._profile.timezone,
-            screen={"width": self._profile.screen_width, "height": self._profile.screen_height},
-            device_scale_factor=self._profile.device_pixel_ratio,
-            color_scheme="light",
-            proxy=self.proxy if self.proxy else None,
-        )
-
-        if cookies:
-            await context.add_cookies(cookies)
-
-        if self.block_resources:
-            _BLOCKED_TYPES = {"image", "media", "font", "stylesheet"}
-            async def _block_route(route):
-                if route.request.resource_type in _BLOCKED_TYPES:
-                    await route.abort()
-                else:
-                    await route.continue_()
-            await context.route("**/*", _block_route)
-
-        self.page = await context.new_page()
-        await self.page.set_extra_http_headers(get_ua_headers(self._user_agent))
+        await self._open_context(cookies=cookies)
 
         if old_context:
             try:
@@ -305,6 +276,11 @@ class BrowserController:
         """Cleanup browser and CDP session"""
         if self.streaming_active:
             await self._stop_cdp_streaming()
+        if self._leased:
+            # The pool owns the process (and display); only this context is ours.
+            if self.page:
+                await self.page.context.close()
+            return
         if self.browser:
             await self.browser.close()
         if self.play:
@@ -383,12 +359,12 @@ class BrowserController:
         async def screenshot_loop():
             while self.streaming_active:
                 try:
-                    screenshot_bytes = await self.page.screenshot(type='jpeg', quality=80)
-                    screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+                    # Shares frames with the agent step instead of taking its own
+                    frame = await self.capture_frame(max_age_s=STREAM_POLL_INTERVAL_S)
                     
                     frame_data = {
                         'type': 'frame',
-                        'data': screenshot_b64,
+                        'data': frame.b64,
                         'timestamp': asyncio.get_running_loop().time(),
                         'method': 'polling'
                     }
@@ -476,6 +452,7 @@ class BrowserController:
 
     async def handle_mouse_event(self, event_data):
         """Handle mouse events with fallback support"""
+        self.invalidate_frame()
         try:
             if self.input_enabled and self.cdp_session:
                 # Use CDP Input domain if available
@@ -498,6 +475,7 @@ class BrowserController:
 
     async def handle_keyboard_event(self, event_data):
         """Handle keyboard events with fallback support"""
+        self.invalidate_frame()
         try:
             if self.input_enabled and self.cdp_session:
                 # Use CDP Input domain if available
@@ -533,33 +511,131 @@ class BrowserController:
 
     # Keep all your existing methods from the original code
     def _get_dom_extraction_js(self) -> str:
-        """Get the robust DOM extraction JavaScript similar to browser-use"""
+        """Get the robust DOM extraction JavaScript similar to browser-use.
+
+        Incremental: a MutationObserver (installed on first use, kept on a
+        non-enumerable window property) marks the elements whose subtree changed,
+        and per-element data (attributes, text, computed style checks) is cached
+        until its element is marked. Each call still reads every element's rect,
+        since scrolling moves them all. Interactive elements keep the index they
+        were first given for as long as the document lives, and a call with
+        nothing marked and the same scroll / viewport / document size returns
+        ``{unchanged: true}`` without walking. ``reset`` drops the cache (the
+        caller passes it when the URL changed without a new document).
+
+        Computed styles can change without a mutation on the element or its
+        ancestors, so the cached data is also dropped for: the following
+        siblings of a changed element (``+`` / ``~`` rules, ``:checked``), every
+        element when a stylesheet is added, removed, edited or finishes loading,
+        and every element when the viewport size changes (media queries).
+        """
         return """
         (args) => {
-            const { doHighlightElements = true, debugMode = false } = args || {};
+            const { doHighlightElements = true, reset = false } = args || {};
+            const LABEL_ATTR = 'data-browserpilot-label';
             
             // Performance tracking
             const startTime = performance.now();
             let nodeCount = 0;
             let processedCount = 0;
+            let reused = 0;
+            let extracted = 0;
             
-            // Results
-            const elementMap = new Map();
-            const selectorMap = {};
-            let highlightIndex = 0;
+            // Cache state lives with the document, so a navigation starts over
+            const KEY = Symbol.for('browserpilot.pagestate');
+            let state = window[KEY];
+            const full = !state || reset;
+            if (full) {
+                if (state) {
+                    state.observer.disconnect();
+                    for (const type of ['input', 'change']) document.removeEventListener(type, state.onInput, true);
+                    document.removeEventListener('load', state.onLoad, true);
+                }
+                state = {cache: new WeakMap(), indices: new WeakMap(), nextIndex: 0,
+                         dirty: new Map(), restyle: false, viewport: null,
+                         signature: null, highlighted: null, walked: 0};
+                const isStyleNode = node => node && node.nodeType === 1 &&
+                    (node.tagName === 'STYLE' || (node.tagName === 'LINK' && /stylesheet/i.test(node.rel)));
+                // deep: the element's own attributes changed, so inherited styles of
+                // its subtree may have too; otherwise only its (and its ancestors') text
+                const mark = (el, deep) => {
+                    if (!el || el.nodeType !== 1) return;
+                    if (isStyleNode(el)) state.restyle = true;
+                    state.dirty.set(el, deep || state.dirty.get(el) === true);
+                };
+                // Sibling combinators restyle the elements after a changed one
+                const markFollowing = node => {
+                    for (let el = node && (node.nodeType === 1 ? node : node.nextElementSibling); el;
+                         el = el.nextElementSibling) mark(el, true);
+                };
+                state.mark = records => {
+                    for (const r of records) {
+                        if (r.type === 'attributes') {
+                            mark(r.target, true);
+                            markFollowing(r.target.nextElementSibling);
+                        } else if (r.type === 'characterData') {
+                            mark(r.target.parentElement, false);
+                        } else {
+                            mark(r.target, false);
+                            markFollowing(r.nextSibling);
+                            for (const nodes of [r.addedNodes, r.removedNodes]) {
+                                for (const node of nodes) if (isStyleNode(node)) state.restyle = true;
+                            }
+                        }
+                    }
+                };
+                state.observer = new MutationObserver(state.mark);
+                state.observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+                // Typing and checking change .value / :checked without a mutation
+                state.onInput = e => {
+                    mark(e.target, true);
+                    markFollowing(e.target.nextElementSibling);
+                };
+                for (const type of ['input', 'change']) document.addEventListener(type, state.onInput, true);
+                // A stylesheet that finishes loading after it was inserted
+                state.onLoad = e => { if (isStyleNode(e.target)) state.restyle = true; };
+                document.addEventListener('load', state.onLoad, true);
+                Object.defineProperty(window, KEY, {value: state, enumerable: false, configurable: true});
+            }
+            state.mark(state.observer.takeRecords());
             
-            // Helper functions
-            function getClassName(element) {
-                if (!element.className) return '';
-                if (typeof element.className === 'string') return element.className;
-                if (element.className.toString) return element.className.toString();
-                if (element.classList && element.classList.length > 0) {
-                    return Array.from(element.classList).join(' ');
+            // Media queries follow the viewport size; a stylesheet change can restyle anything
+            const viewport = window.innerWidth + 'x' + window.innerHeight;
+            if (state.restyle || (state.viewport !== null && viewport !== state.viewport)) {
+                state.cache = new WeakMap();
+                state.dirty.clear();
+            }
+            const restyled = state.restyle || viewport !== state.viewport;
+            state.restyle = false;
+            state.viewport = viewport;
+            
+            const root = document.documentElement;
+            const signature = [window.scrollX, window.scrollY, window.innerWidth, window.innerHeight,
+                               root ? root.scrollWidth : 0, root ? root.scrollHeight : 0].join(',');
+            if (!full && !restyled && state.dirty.size === 0 && signature === state.signature &&
+                doHighlightElements === state.highlighted) {
+                return {
+                    unchanged: true,
+                    stats: {reused: state.walked, extracted: 0, full: false,
+                            executionTime: performance.now() - startTime}
+                };
+            }
+            
+            // Drop cached data for changed elements and their ancestors (whose text
+            // includes theirs); a deep change also drops the whole subtree
+            for (const [el, deep] of state.dirty) {
+                if (deep) {
+                    for (const child of el.querySelectorAll('*')) state.cache.delete(child);
                 }
-                return '';
+                for (let node = el; node; node = node.parentElement) state.cache.delete(node);
             }
+            state.dirty.clear();
             
-            function isInteractive(element) {
+            // Results
+            const selectorMap = {};
+            
+            // Helper functions
+            function isInteractive(element, style) {
                 const tagName = element.tagName.toLowerCase();
                 const interactiveTags = ['a', 'button', 'input', 'select', 'textarea', 'label'];
                 if (interactiveTags.includes(tagName)) return true;
@@ -568,7 +644,6 @@ class BrowserController:
                 if (element.getAttribute('role') === 'link') return true;
                 if (element.hasAttribute('tabindex')) return true;
                 if (element.contentEditable === 'true') return true;
-                const style = window.getComputedStyle(element);
                 if (style.cursor === 'pointer') return true;
                 return false;
             }
@@ -595,79 +670,88 @@ class BrowserController:
                 return text.substring(0, 200);
             }
             
-            function isVisibleAndInViewport(element) {
-                const rect = element.getBoundingClientRect();
+            // Everything about an element except where it is
+            function describe(element) {
                 const style = window.getComputedStyle(element);
-                const hasDimensions = rect.width > 0 && rect.height > 0;
-                const isVisible = style.visibility !== 'hidden' &&
-                                style.display !== 'none' &&
-                                style.opacity !== '0';
-                const isInViewport = rect.top < window.innerHeight &&
-                                   rect.bottom > 0 &&
-                                   rect.left < window.innerWidth &&
-                                   rect.right > 0;
-                return hasDimensions && isVisible && isInViewport;
+                const attributes = {};
+                if (element.attributes) {
+                    for (let attr of element.attributes) {
+                        attributes[attr.name] = attr.value;
+                    }
+                }
+                return {
+                    tagName: element.tagName.toLowerCase(),
+                    text: getTextContent(element),
+                    attributes: attributes,
+                    isClickable: isInteractive(element, style),
+                    isInput: isInput(element),
+                    styleVisible: style.visibility !== 'hidden' &&
+                                  style.display !== 'none' &&
+                                  style.opacity !== '0',
+                    inputType: element.type || null,
+                    placeholder: element.placeholder || null
+                };
             }
             
             // Process elements
+            if (doHighlightElements) {
+                document.querySelectorAll(`[${LABEL_ATTR}]`).forEach(label => label.remove());
+            }
             const allElements = document.querySelectorAll('*');
             const elements = [];
+            const labels = [];
             
             allElements.forEach(element => {
                 nodeCount++;
                 if (!element || element.nodeType !== 1) return;
+                if (element.hasAttribute(LABEL_ATTR)) return;
                 
-                const isElementVisible = isVisibleAndInViewport(element);
-                const isElementInteractive = isInteractive(element);
-                const isElementInput = isInput(element);
+                let info = state.cache.get(element);
+                if (info) {
+                    reused++;
+                } else {
+                    info = describe(element);
+                    state.cache.set(element, info);
+                    extracted++;
+                }
+                
+                const rect = element.getBoundingClientRect();
+                const hasDimensions = rect.width > 0 && rect.height > 0;
+                const isInViewport = rect.top < window.innerHeight &&
+                                   rect.bottom > 0 &&
+                                   rect.left < window.innerWidth &&
+                                   rect.right > 0;
+                const isElementVisible = hasDimensions && info.styleVisible && isInViewport;
                 
-                if (!isElementVisible && !isElementInteractive) return;
+                if (!isElementVisible && !info.isClickable) return;
                 
                 processedCount++;
-                const rect = element.getBoundingClientRect();
                 const elementId = `element_${processedCount}`;
                 let currentHighlightIndex = null;
                 
-                if (isElementInteractive || isElementInput) {
-                    currentHighlightIndex = highlightIndex++;
-                    
-                    if (doHighlightElements) {
-                        element.style.outline = '2px solid red';
-                        element.style.outlineOffset = '1px';
-                        
-                        const label = document.createElement('div');
-                        label.textContent = currentHighlightIndex.toString();
-                        label.style.cssText = `
-                            position: absolute;
-                            top: ${rect.top + window.scrollY - 20}px;
-                            left: ${rect.left + window.scrollX}px;
-                            background: red;
-                            color: white;
-                            padding: 2px 6px;
-                            font-size: 12px;
-                            font-weight: bold;
-                            z-index: 10000;
-                            border-radius: 3px;
-                            pointer-events: none;
-                        `;
-                        document.body.appendChild(label);
+                if (info.isClickable || info.isInput) {
+                    currentHighlightIndex = state.indices.get(element);
+                    if (currentHighlightIndex === undefined) {
+                        currentHighlightIndex = state.nextIndex++;
+                        state.indices.set(element, currentHighlightIndex);
                     }
+                    if (doHighlightElements) labels.push([element, rect, currentHighlightIndex]);
                 }
                 
                 const elementData = {
                     index: currentHighlightIndex,
                     id: elementId,
-                    tagName: element.tagName.toLowerCase(),
+                    tagName: info.tagName,
                     xpath: '',
                     cssSelector: '',
-                    text: getTextContent(element),
-                    attributes: {},
-                    isClickable: isElementInteractive,
-                    isInput: isElementInput,
+                    text: info.text,
+                    attributes: info.attributes,
+                    isClickable: info.isClickable,
+                    isInput: info.isInput,
                     isVisible: isElementVisible,
                     isInViewport: isElementVisible,
-                    inputType: element.type || null,
-                    placeholder: element.placeholder || null,
+                    inputType: info.inputType,
+                    placeholder: info.placeholder,
                     boundingBox: {
                         x: rect.x,
                         y: rect.y,
@@ -684,12 +768,6 @@ class BrowserController:
                     }
                 };
                 
-                if (element.attributes) {
-                    for (let attr of element.attributes) {
-                        elementData.attributes[attr.name] = attr.value;
-                    }
-                }
-                
                 elements.push(elementData);
                 
                 if (currentHighlightIndex !== null) {
@@ -697,6 +775,34 @@ class BrowserController:
                 }
             });
             
+            for (const [element, rect, index] of labels) {
+                element.style.outline = '2px solid red';
+                element.style.outlineOffset = '1px';
+                
+                const label = document.createElement('div');
+                label.setAttribute(LABEL_ATTR, '');
+                label.textContent = index.toString();
+                label.style.cssText = `
+                    position: absolute;
+                    top: ${rect.top + window.scrollY - 20}px;
+                    left: ${rect.left + window.scrollX}px;
+                    background: red;
+                    color: white;
+                    padding: 2px 6px;
+                    font-size: 12px;
+                    font-weight: bold;
+                    z-index: 10000;
+                    border-radius: 3px;
+                    pointer-events: none;
+                `;
+                document.body.appendChild(label);
+            }
+            // Our own outlines and labels are not page changes
+            state.observer.takeRecords();
+            state.signature = signature;
+            state.highlighted = doHighlightElements;
+            state.walked = reused + extracted;
+            
             const endTime = performance.now();
             return {
                 elements: elements,
@@ -705,48 +811,167 @@ class BrowserController:
                     totalNodes: nodeCount,
                     processedNodes: processedCount,
                     interactiveElements: Object.keys(selectorMap).length,
+                    reused: reused,
+                    extracted: extracted,
+                    full: full,
                     executionTime: endTime - startTime
                 }
             };
         }
         """
 
+    async def wait_until_ready(self, max_wait_s: float) -> Readiness:
+        """Wait for the page to go network- and DOM-quiet, at most ``max_wait_s``"""
+        self.invalidate_frame()
+        readiness = await wait_for_ready(self.page, max_wait_s)
+        logger.debug(f"Page ready after {readiness.waited_s * 1000:.0f}ms"
+                     f"{' (capped)' if readiness.timed_out else ''}")
+        return readiness
+
     # Add all your existing methods here (goto, get_page_state, click_element_by_index, etc.)
     async def goto(self, url: str, wait_until: str = "domcontentloaded", timeout: int = 30000):
         """Navigate to a URL with proper waiting"""
         try:
             logger.info(f"Navigating to: {url}")
+            self.invalidate_frame()
             await self.page.goto(url, wait_until=wait_until, timeout=timeout)
-            await asyncio.sleep(NAVIGATION_SETTLE_S)
+            await self.wait_until_ready(NAVIGATION_SETTLE_S)
             logger.info(f"Successfully navigated to: {url}")
         except Exception as e:
             logger.error(f"Failed to navigate to {url}: {e}")
             raise
 
+    async def _get_page_session(self):
+        if self._page_session is None or self._session_page is not self.page:
+            self._page_session = await self.page.context.new_cdp_session(self.page)
+            self._session_page = self.page
+        return self._page_session
+
+    def invalidate_frame(self):
+        """The page may look different now: the next capture_frame takes a new screenshot"""
+        self._frame = None
+
+    async def capture_frame(self, max_age_s: float | None = None) -> Frame:
+        """The current viewport as a JPEG of at most FRAME_MAX_WIDTH x FRAME_MAX_HEIGHT.
+
+        Taken once per step: the page state, the decision model, anti-bot
+        checks, CAPTCHA solving and stream polling all get the same frame until
+        an action (navigation, click, typing, scrolling, a readiness wait)
+        invalidates it, the page or URL changes, or it is older than ``max_age_s``.
+        """
+        frame = self._frame
+        if (frame is not None and self._frame_page is self.page and frame.url == self.page.url
+                and (max_age_s is None or time.monotonic() - frame.captured_at <= max_age_s)):
+            self.frame_counts["reused"] += 1
+            return frame
+        try:
+            jpeg = await self._capture_jpeg_cdp()
+        except Exception as e:
+            logger.debug(f"CDP frame capture failed, using page.screenshot: {e}")
+            self._page_session = None
+            jpeg = await self.page.screenshot(type='jpeg', quality=FRAME_JPEG_QUALITY, scale='css')
+        self._frame = Frame(jpeg, self.page.url)
+        self._frame_page = self.page
+        self.frame_counts["captured"] += 1
+        return self._frame
+
+    async def _capture_jpeg_cdp(self) -> bytes:
+        """Page.captureScreenshot straight to JPEG at target size (no PNG encode, no resize here)"""
+        session = await self._get_page_session()
+        metrics = await session.send('Page.getLayoutMetrics')
+        viewport = metrics.get('cssVisualViewport') or metrics['visualViewport']
+        width, height = viewport['clientWidth'], viewport['clientHeight']
+        dpr = self._profile.device_pixel_ratio if getattr(self, '_profile', None) else 1
+        # clip.scale is applied on top of the device pixel ratio
+        scale = min(1.0, FRAME_MAX_WIDTH / width, FRAME_MAX_HEIGHT / height) / (dpr or 1)
+        result = await session.send('Page.captureScreenshot', {
+            'format': 'jpeg',
+            'quality': FRAME_JPEG_QUALITY,
+            'clip': {'x': viewport['pageX'], 'y': viewport['pageY'], 'width': width, 'height': height, 'scale': scale},
+        })
+        return base64.b64decode(result['data'])
+
+    async def _extract_elements(self, highlight_elements: bool, reset: bool = False) -> dict:
+        """Element dicts from the configured engine, as ``{"elements": [...]}``;
+        the JS engine may instead answer ``{"unchanged": True}`` (see ``_get_dom_extraction_js``)"""
+        if self.page_state_engine == "snapshot":
+            try:
+                session = await self._get_page_session()
+                viewport = self.page.viewport_size or {"width": BROWSER_VIEWPORT_WIDTH, "height": BROWSER_VIEWPORT_HEIGHT}
+                elements = await dom_snapshot.capture_elements(session, viewport)
+                if highlight_elements:
+                    await dom_snapshot.highlight_elements(self.page, elements)
+                return {"elements": elements}
+            except Exception as e:
+                # A detached session (crashed target, swapped page) is reopened next time
+                self._page_session = None
+                logger.warning(f"DOM snapshot failed, falling back to JS extraction: {e}")
+        return await self.page.evaluate(self.dom_js, {"doHighlightElements": highlight_elements, "reset": reset})
+
+    def _record_extraction(self, start: float, dom_result: dict):
+        self.extraction_times_ms.append((time.perf_counter() - start) * 1000)
+        stats = dom_result.get("stats") or {}
+        counts = self.page_state_counts
+        if dom_result.get("unchanged"):
+            counts["unchanged"] += 1
+        elif stats.get("full", True):
+            counts["full"] += 1
+        else:
+            counts["incremental"] += 1
+        counts["reused"] += stats.get("reused", 0)
+        # The snapshot engine has no cache: every element is extracted
+        counts["extracted"] += stats.get("extracted", len(dom_result.get("elements", [])))
+
+    def get_page_state_stats(self) -> dict:
+        """Extraction time and in-page cache effectiveness across get_page_state calls"""
+        counts = self.page_state_counts
+        looked_up = counts["reused"] + counts["extracted"]
+        times = self.extraction_times_ms
+        return {
+            "steps": len(times),
+            "full_scans": counts["full"],
+            "incremental": counts["incremental"],
+            "unchanged": counts["unchanged"],
+            "cache_hit_ratio": round(counts["reused"] / looked_up, 3) if looked_up else 0.0,
+            "extraction_ms_last": round(times[-1], 1) if times else 0.0,
+            "extraction_ms_avg": round(sum(times) / len(times), 1) if times else 0.0,
+            "frames_captured": self.frame_counts["captured"],
+            "frames_reused": self.frame_counts["reused"],
+        }
+
     async def get_page_state(self, include_screenshot: bool = True, highlight_elements: bool = True) -> PageState:
         """Get current page state with elements"""
         try:
             await self.page.wait_for_load_state("domcontentloaded", timeout=10000)
-            await asyncio.sleep(SCROLL_SETTLE_S)
+            await self.wait_until_ready(SCROLL_SETTLE_S)
             
             url = self.page.url
             title = await self.page.title()
             
-            screenshot = None
-            if include_screenshot:
-                screenshot_bytes = await self.page.screenshot(
-                    full_page=False,
-                    clip={'x': 0, 'y': 0, 'width': 1250, 'height': 800}
-                )
-                screenshot = base64.b64encode(screenshot_bytes).decode('utf-8')
+            frame = await self.capture_frame() if include_screenshot else None
+            screenshot = frame.b64 if frame else None
             
-            # Extract DOM elements
+            # Extract DOM elements; a URL change without a new document (SPA
+            # routing) must not reuse the old page's cache
+            start = time.perf_counter()
             try:
-                dom_result = await self.page.evaluate(self.dom_js, {"doHighlightElements": highlight_elements})
-                logger.info(f"Extracted {len(dom_result.get('elements', []))} interactive elements")
+                dom_result = await self._extract_elements(highlight_elements, reset=url != self._cached_url)
             except Exception as e:
                 logger.error(f"DOM extraction failed: {e}")
-                return PageState(url, title, [], {}, screenshot)
+                self._cached_page_state = self._cached_url = None
+                return PageState(url, title, [], {}, screenshot, frame)
+            
+            if dom_result.get("unchanged") and self._cached_page_state is not None:
+                cached = self._cached_page_state
+                page_state = PageState(url, title, cached.elements, cached.selector_map, screenshot, frame)
+                self._record_extraction(start, dom_result)
+                logger.info(f"Page unchanged, reusing {len(cached.elements)} elements")
+                self._cached_page_state = page_state
+                return page_state
+            if dom_result.get("unchanged"):
+                dom_result = await self._extract_elements(highlight_elements, reset=True)
+            self._record_extraction(start, dom_result)
+            logger.info(f"Extracted {len(dom_result.get('elements', []))} interactive elements")
             
             elements = []
             selector_map = {}
@@ -769,7 +994,10 @@ class BrowserController:
                 if element_info.index is not None:
                     selector_map[element_info.index] = element_info
             
-            return PageState(url, title, elements, selector_map, screenshot)
+            page_state = PageState(url, title, elements, selector_map, screenshot, frame)
+            self._cached_page_state = page_state
+            self._cached_url = url
+            return page_state
             
         except Exception as e:
             logger.error(f"Failed to get page state: {e}")
@@ -794,13 +1022,14 @@ class BrowserController:
             y = element.center_coordinates['y']
             
             logger.info(f"Clicking element {index}: {element.text[:50]}... at ({x}, {y})")
+            self.invalidate_frame()
 
             if GHOST_MODE_ENABLED and GHOST_MODE_HUMAN_BEHAVIOR:
                 await human_pre_action_pause()
                 await human_move_and_click(self.page, x, y)
             else:
                 await self.page.mouse.click(x, y)
-            await asyncio.sleep(CLICK_SETTLE_S)
+            await self.wait_until_ready(CLICK_SETTLE_S)
 
             logger.info(f"Successfully clicked element {index}")
             return True
@@ -828,6 +1057,7 @@ class BrowserController:
             y = element.center_coordinates['y']
             
             logger.info(f"Typing '{text}' into element {index}")
+            self.invalidate_frame()
 
             if GHOST_MODE_ENABLED and GHOST_MODE_HUMAN_BEHAVIOR:
                 await human_pre_action_pause()
@@ -850,6 +1080,7 @@ class BrowserController:
 
     async def scroll_page(self, direction: str = "down", amount: int = 500):
         """Scroll the page"""
+        self.invalidate_frame()
         if GHOST_MODE_ENABLED and GHOST_MODE_HUMAN_BEHAVIOR:
             await human_scroll(self.page, direction, amount)
         else:
@@ -857,10 +1088,11 @@ class BrowserController:
                 await self.page.mouse.wheel(0, amount)
             elif direction == "up":
                 await self.page.mouse.wheel(0, -amount)
-            await asyncio.sleep(SCROLL_SETTLE_S)
+            await self.wait_until_ready(SCROLL_SETTLE_S)
 
     async def press_key(self, key: str) -> bool:
         """Press a keyboard key"""
+        self.invalidate_frame()
         try:
             await self.page.keyboard.press(key)
             logger.info(f"Pressed key: {key}")
@@ -0,0 +1,386 @@
+"""Shared Chromium process pool — a few browser processes, many isolated contexts.
+
+A Playwright ``BrowserContext`` has its own cookies, storage, cache, fingerprint
+(UA, viewport, locale, timezone) and proxy, but shares the browser, GPU and
+network-service processes of the Chromium it runs in. Leasing contexts from a
+handful of processes instead of launching one Chromium (plus one Playwright
+driver, plus possibly one Xvfb) per worker fits several times more concurrent
+pages into the same RAM.
+
+Architecture:
+- One Playwright driver for the whole pool; each process leases a screen
+  from the shared display manager
+- Up to ``processes`` Chromium processes, launched lazily on first demand
+- Each lease is a ``BrowserController`` attached to its own context on the
+  least-loaded process; at most ``contexts_per_process`` leases per process
+- When every slot is taken, ``lease()`` waits for a ``release()``
+- A process that crashes (disconnects) is dropped and relaunched on demand
+- ``WarmPool`` keeps a few freshly opened contexts idle and ready, so
+  interactive jobs skip the cold start entirely
+
+Usage:
+    pool = BrowserPool(processes=2, contexts_per_process=8)
+    async with pool.leased(proxy=proxy, proxy_country="US") as bc:
+        await bc.page.goto(url)
+    await pool.close()
+
+    warm = WarmPool(pool, size=2)
+    await warm.start()                       # at app startup
+    async with warm.session(proxy=None) as bc:
+        await bc.goto(url)
+    warm.stats()                             # hit rate, time-to-first-navigation
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+from patchright.async_api import async_playwright
+
+from backend.browser_controller import BrowserController
+from backend.config import (
+    BROWSER_POOL_CONTEXTS_PER_PROCESS, BROWSER_POOL_PROCESSES,
+    WARM_POOL_SIZE,
+)
+from backend.fingerprint_profile import FingerprintProfile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Process:
+    browser: Any
+    # Bare controller that holds this process's display lease and launch args.
+    host: BrowserController
+    leases: int = 0
+
+
+class BrowserPool:
+    """Leases isolated browser contexts from a small, shared set of Chromium processes."""
+
+    def __init__(
+        self,
+        processes: int = BROWSER_POOL_PROCESSES,
+        contexts_per_process: int = BROWSER_POOL_CONTEXTS_PER_PROCESS,
+        headless: bool = False,
+    ):
+        self.processes = max(1, processes)
+        self.contexts_per_process = max(1, contexts_per_process)
+        self.headless = headless
+        self._procs: list[_Process] = []
+        self._launching = 0
+        self._leases: dict[int, tuple[BrowserController, _Process]] = {}
+        self._cond = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._play = None
+        self.launches = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.processes * self.contexts_per_process
+
+    def stats(self) -> dict:
+        return {
+            "processes": len(self._procs),
+            "max_processes": self.processes,
+            "leased": len(self._leases),
+            "capacity": self.capacity,
+            "launches": self.launches,
+        }
+
+    # ── process management ───────────────────────────────────────────────────
+
+    async def _start(self) -> None:
+        """Start the shared Playwright driver (once)."""
+        async with self._start_lock:
+            if self._play is None:
+                self._play = await async_playwright().start()
+
+    async def _launch(self) -> _Process:
+        await self._start()
+        host = BrowserController(headless=self.headless, proxy=None)
+        await host._ensure_display()
+        try:
+            browser = await self._play.chromium.launch(**host._launch_options())
+        except BaseException:
+            host._restore_display()
+            raise
+        self.launches += 1
+        logger.info("🧩 Browser pool launched Chromium process %d/%d", len(self._procs) + 1, self.processes)
+        return _Process(browser=browser, host=host)
+
+    def _prune_dead(self) -> None:
+        for proc in self._procs:
+            if not proc.browser.is_connected():
+                proc.host._restore_display()
+        self._procs = [p for p in self._procs if p.browser.is_connected()]
+
+    async def _acquire(self) -> _Process:
+        """Reserve a context slot on the least-loaded live process, launching one if allowed."""
+        async with self._cond:
+            while True:
+                self._prune_dead()
+                free = [p for p in self._procs if p.leases < self.contexts_per_process]
+                if free:
+                    proc = min(free, key=lambda p: p.leases)
+                    proc.leases += 1
+                    return proc
+                if len(self._procs) + self._launching < self.processes:
+                    self._launching += 1
+                    break
+                await self._cond.wait()
+
+        # Launch outside the condition so other leases on live processes proceed.
+        try:
+            proc = await self._launch()
+        except BaseException:
+            async with self._cond:
+                self._launching -= 1
+                self._cond.notify_all()
+            raise
+        async with self._cond:
+            self._launching -= 1
+            proc.leases += 1
+            self._procs.append(proc)
+            self._cond.notify_all()
+        return proc
+
+    async def _free(self, proc: _Process) -> None:
+        async with self._cond:
+            proc.leases = max(0, proc.leases - 1)
+            self._cond.notify_all()
+
+    # ── leasing ──────────────────────────────────────────────────────────────
+
+    async def lease(
+        self,
+        proxy: dict | None = None,
+        proxy_country: str | None = None,
+        profile: FingerprintProfile | None = None,
+        block_resources: bool = False,
+        enable_streaming: bool = False,
+        controller_cls: type[BrowserController] = BrowserController,
+    ) -> BrowserController:
+        """Return a controller on a fresh, isolated context. Pair with ``release()``."""
+        proc = await self._acquire()
+        bc = controller_cls(
+            headless=self.headless, proxy=proxy, enable_streaming=enable_streaming,
+            proxy_country=proxy_country, block_resources=block_resources,
+        )
+        try:
+            await bc.attach(proc.browser, profile=profile)
+        except BaseException:
+            await self._free(proc)
+            raise
+        self._leases[id(bc)] = (bc, proc)
+        return bc
+
+    async def release(self, bc: BrowserController) -> None:
+        """Close the controller's context and return its slot. Never raises."""
+        entry = self._leases.pop(id(bc), None)
+        try:
+            await bc.__aexit__(None, None, None)
+        except Exception as e:
+            logger.debug("Browser pool: closing leased context failed: %s", e)
+        if entry:
+            await self._free(entry[1])
+
+    @asynccontextmanager
+    async def leased(self, **kwargs) -> AsyncIterator[BrowserController]:
+        bc = await self.lease(**kwargs)
+        try:
+            yield bc
+        finally:
+            await self.release(bc)
+
+    async def close(self) -> None:
+        """Close every process and the driver. The pool relaunches lazily if leased again."""
+        for bc, _ in list(self._leases.values()):
+            await self.release(bc)
+        procs, self._procs = self._procs, []
+        for proc in procs:
+            try:
+                await proc.browser.close()
+            except Exception:
+                pass
+            proc.host._restore_display()
+        if self._play is not None:
+            try:
+                await self._play.stop()
+            except Exception:
+                pass
+            self._play = None
+
+
+# ── Warm pool (pre-launched idle contexts) ───────────────────────────────────
+
+def _proxy_key(proxy: dict | None) -> str | None:
+    return proxy.get("server") if proxy else None
+
+
+class WarmPool:
+    """Keeps ``size`` idle contexts leased from a ``BrowserPool`` and ready to use.
+
+    ``acquire()`` hands out an idle context (a hit) or falls back to a cold
+    lease (a miss); either way a background task tops the idle set back up.
+    Each context serves one job: ``release()`` closes it, so no cookies,
+    storage, cache, service workers, fingerprint or controller state carry
+    over to the next job, which gets a fresh context on the same warm process.
+
+    Warm contexts are built without a proxy. A context's proxy is fixed when it
+    is opened and jobs lease theirs (``acquire_proxy``) only when they start,
+    so only proxy-less requests can hit; a request with a proxy always takes a
+    cold lease.
+
+    Idle contexts hold ``BrowserPool`` slots, so ``size`` is capped one below
+    the pool's capacity: there is always a slot a cold lease can wait for.
+    """
+
+    def __init__(
+        self,
+        pool: BrowserPool,
+        size: int = WARM_POOL_SIZE,
+        controller_cls: type[BrowserController] = BrowserController,
+        samples: int = 200,
+    ):
+        self.pool = pool
+        self.size = max(0, min(size, pool.capacity - 1))
+        if self.size < size:
+            logger.warning("Warm pool: size %d capped to %d (browser pool capacity %d)",
+                           size, self.size, pool.capacity)
+        self.controller_cls = controller_cls
+        self._idle: list[BrowserController] = []
+        self._filling = 0
+        self._wanted = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self._acquire_ms: dict[str, deque] = {"hit": deque(maxlen=samples), "miss": deque(maxlen=samples)}
+        self._first_nav_ms: dict[str, deque] = {"hit": deque(maxlen=samples), "miss": deque(maxlen=samples)}
+
+    # ── background replenishment ─────────────────────────────────────────────
+
+    async def start(self) -> None:
+        if self.size and self._task is None:
+            self._task = asyncio.create_task(self._replenish())
+            self._wanted.set()
+
+    async def fill(self) -> None:
+        """Top the idle set up to ``size`` now (what the background task does)."""
+        while len(self._idle) + self._filling < self.size:
+            self._filling += 1
+            try:
+                bc = await self.pool.lease(controller_cls=self.controller_cls)
+                self._idle.append(bc)
+            finally:
+                self._filling -= 1
+
+    async def _replenish(self) -> None:
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            try:
+                await self.fill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Warm pool: pre-launching a context failed: %s", e)
+                await asyncio.sleep(5)
+                self._wanted.set()
+
+    # ── acquire / release ────────────────────────────────────────────────────
+
+    def _take_idle(self, proxy: dict | None) -> BrowserController | None:
+        key = _proxy_key(proxy)
+        for i, bc in enumerate(self._idle):
+            if _proxy_key(bc.proxy) == key and bc.browser.is_connected():
+                return self._idle.pop(i)
+        return None
+
+    async def acquire(
+        self,
+        proxy: dict | None = None,
+        proxy_country: str | None = None,
+        block_resources: bool = False,
+        enable_streaming: bool = False,
+    ) -> BrowserController:
+        start = time.perf_counter()
+        bc = self._take_idle(proxy)
+        kind = "hit" if bc is not None else "miss"
+        if bc is None:
+            self.misses += 1
+            bc = await self.pool.lease(proxy=proxy, proxy_country=proxy_country,
+                                       block_resources=block_resources,
+                                       enable_streaming=enable_streaming,
+                                       controller_cls=self.controller_cls)
+        else:
+            self.hits += 1
+            await bc.set_resource_blocking(block_resources)
+            if enable_streaming and not bc.enable_streaming:
+                bc.enable_streaming = True
+                await bc._setup_cdp_streaming()
+        self._wanted.set()
+        self._acquire_ms[kind].append((time.perf_counter() - start) * 1000)
+        self._watch_first_navigation(bc, start, kind)
+        return bc
+
+    def _watch_first_navigation(self, bc: BrowserController, start: float, kind: str) -> None:
+        once = getattr(bc.page, "once", None)
+        if once is None:
+            return
+        once("domcontentloaded", lambda *_: self._first_nav_ms[kind].append(
+            (time.perf_counter() - start) * 1000))
+
+    async def release(self, bc: BrowserController) -> None:
+        """Close a job's context; the background task opens a fresh one in its place."""
+        await self.pool.release(bc)
+        self._wanted.set()
+
+    @asynccontextmanager
+    async def session(self, **kwargs) -> AsyncIterator[BrowserController]:
+        bc = await self.acquire(**kwargs)
+        try:
+            yield bc
+        finally:
+            await self.release(bc)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        idle, self._idle = self._idle, []
+        for bc in idle:
+            await self.pool.release(bc)
+
+    # ── metrics ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _summary(samples: deque) -> dict:
+        if not samples:
+            return {"count": 0, "avg_ms": None, "p50_ms": None}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "avg_ms": round(sum(ordered) / len(ordered), 1),
+            "p50_ms": round(ordered[len(ordered) // 2], 1),
+        }
+
+    def stats(self) -> dict:
+        served = self.hits + self.misses
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / served, 3) if served else None,
+            "acquire": {k: self._summary(v) for k, v in self._acquire_ms.items()},
+            "time_to_first_navigation": {k: self._summary(v) for k, v in self._first_nav_ms.items()},
+        }
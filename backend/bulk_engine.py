@@ -1,43 +1,58 @@
 """Bulk scraping engine — concurrent stealth sessions with fingerprint/proxy rotation.
 
 Architecture:
-- Workers share a single xvfb display (set once at engine level)
-- Each worker owns ONE Chromium process; rotations swap contexts, not browsers
+- Workers lease isolated contexts from a shared BrowserPool (a few Chromium
+  processes and one display); rotations swap contexts, not browsers
 - Cookie jars persist per-domain across context rotations
-- Adaptive per-domain throttle backs off on 429s, speeds up on 200s
-- Task queue uses asyncio.Lock to prevent race conditions
+- Adaptive per-domain throttle backs off on 429s, speeds up on 200s; each
+  domain has its own reservation slot so domains never wait on each other
+- Task queue interleaves domains, dispatching from whichever domain's
+  throttle slot opens soonest (an asyncio.Condition guards dispatch)
+- Failed URLs retry after exponential backoff with jitter on a delayed lane
+  that holds no worker
 - Fast DOM extraction by default; AI extraction opt-in
+- Each finished URL is appended to ``<job_id>.jsonl`` (and ``.csv``) as it
+  lands; final JSON/MD outputs are streamed from that file, so results never
+  pile up in memory
+- Every task transition is journalled to an append-only checkpoint log
+  (fsync-batched, compacted periodically) so a killed job resumes with only
+  its in-flight URLs left to redo
 """
 
 import asyncio
+import csv
+import functools
+import heapq
+import io
+import itertools
 import json
+import random
+import textwrap
 import time
 import uuid
 import logging
-from dataclasses import dataclass, field
+import os
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Any, Callable, Coroutine
+from typing import Any, Callable, Coroutine, Iterator
 from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup
 
+from backend.antibot_classifier import classify_page
 from backend.browser_controller import BrowserController
+from backend.browser_pool import BrowserPool
 from backend.fingerprint_profile import generate_profile
-from backend.proxy_manager import SmartProxyManager
+from backend.proxy_manager import SmartProxyManager, get_shared_proxy_manager
+from backend.page_readiness import wait_for_ready
 from backend.config import GHOST_MODE_ENABLED
 
 logger = logging.getLogger(__name__)
 
 OUTPUT_DIR = Path("outputs")
 
-_BLOCK_SIGNALS = frozenset([
-    "access denied", "blocked", "captcha", "challenge",
-    "verify you are human", "pardon our interruption",
-    "please turn javascript on", "checking your browser",
-])
-
-
 class URLStatus(Enum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
@@ -46,8 +61,9 @@ class URLStatus(Enum):
     SKIPPED = "skipped"
 
 
-@dataclass
+@dataclass(slots=True)
 class URLTask:
+    # slots: million-URL jobs keep one of these per URL, so skip the per-instance __dict__
     url: str
     status: URLStatus = URLStatus.PENDING
     result: dict | None = None
@@ -70,6 +86,21 @@ class BulkJobConfig:
     rotation_interval: int = 10
     use_ai_extraction: bool = False
     block_resources: bool = True
+    retry_backoff_s: float = 2.0
+    retry_backoff_max_s: float = 60.0
+    retry_jitter: float = 0.5
+
+
+def retry_delay(attempts: int, config: BulkJobConfig, rng: random.Random | None = None) -> float:
+    """Exponential backoff with jitter for a task that has failed ``attempts`` times.
+
+    ``retry_backoff_s * 2**(attempts-1)``, capped at ``retry_backoff_max_s``,
+    then scaled by a random factor in ``[1 - retry_jitter, 1 + retry_jitter]``
+    so retries of a burst of failures don't all land on the same instant.
+    """
+    base = min(config.retry_backoff_s * (2 ** max(attempts - 1, 0)), config.retry_backoff_max_s)
+    jitter = min(max(config.retry_jitter, 0.0), 1.0)
+    return max(0.0, base * (rng or random).uniform(1 - jitter, 1 + jitter))
 
 
 @dataclass
@@ -80,6 +111,33 @@ class BulkJobState:
     started_at: float = 0.0
     finished_at: float | None = None
     cancelled: bool = False
+    # Per-status task counts, kept current by transition() so progress is O(1).
+    _counts: Counter = field(default_factory=Counter, init=False, repr=False)
+    _counted: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self):
+        self.recount()
+
+    def recount(self) -> None:
+        """Rebuild the status counters with one pass over ``tasks``."""
+        self._counts = Counter(t.status for t in self.tasks)
+        self._counted = len(self.tasks)
+
+    def _status_counts(self) -> Counter:
+        # Tasks appended or swapped in wholesale (checkpoint load, tests) bypass
+        # transition(); a length mismatch is the cheap signal to recount.
+        if self._counted != len(self.tasks):
+            self.recount()
+        return self._counts
+
+    def transition(self, task: URLTask, status: URLStatus) -> None:
+        """Move ``task`` to ``status``. All status changes go through here."""
+        counts = self._status_counts()
+        if task.status is status:
+            return
+        counts[task.status] -= 1
+        counts[status] += 1
+        task.status = status
 
     @property
     def total(self) -> int:
@@ -87,67 +145,88 @@ class BulkJobState:
 
     @property
     def done(self) -> int:
-        return sum(1 for t in self.tasks if t.status == URLStatus.DONE)
+        return self._status_counts()[URLStatus.DONE]
 
     @property
     def failed(self) -> int:
-        return sum(1 for t in self.tasks if t.status == URLStatus.FAILED)
+        return self._status_counts()[URLStatus.FAILED]
 
     @property
     def pending(self) -> int:
-        return sum(1 for t in self.tasks if t.status in (URLStatus.PENDING, URLStatus.IN_PROGRESS))
+        counts = self._status_counts()
+        return counts[URLStatus.PENDING] + counts[URLStatus.IN_PROGRESS]
 
     @property
     def progress(self) -> dict:
         elapsed = time.time() - self.started_at if self.started_at else 0
+        done = self.done
         return {
             "job_id": self.job_id,
             "total": self.total,
-            "done": self.done,
+            "done": done,
             "failed": self.failed,
             "pending": self.pending,
             "cancelled": self.cancelled,
             "elapsed_s": round(elapsed, 1),
-            "pages_per_min": round(self.done / max(elapsed / 60, 0.01), 1) if self.started_at else 0,
+            "pages_per_min": round(done / max(elapsed / 60, 0.01), 1) if self.started_at else 0,
         }
 
 
 # ── Adaptive per-domain throttle ────────────────────────────────────────────
 
 class DomainThrottle:
-    """Per-domain rate limiter with adaptive backoff on 429/block."""
+    """Per-domain rate limiter with adaptive backoff on 429/block.
+
+    Each domain owns a reservation slot: ``wait`` books the next free slot for
+    its domain and sleeps outside of any lock, so a worker waiting on one
+    domain never holds up workers headed to other domains. Concurrent waiters
+    on the same domain get consecutive slots ``delay`` seconds apart.
+    """
 
     def __init__(self, default_delay: float = 2.0):
         self._default_delay = default_delay
         self._domain_delay: dict[str, float] = {}
-        self._last_request: dict[str, float] = {}
-        self._lock = asyncio.Lock()
+        self._next_slot: dict[str, float] = {}
 
     def _get_domain(self, url: str) -> str:
         return urlparse(url).netloc
 
-    async def wait(self, url: str) -> None:
+    def ready_at(self, domain: str) -> float:
+        """Monotonic time at which ``domain``'s next slot opens (0 if never used)."""
+        return self._next_slot.get(domain, 0.0)
+
+    def reserve(self, url: str) -> float:
+        """Book the next slot for the URL's domain and return how long to sleep.
+
+        Synchronous on purpose: with no await between read and write, the
+        reservation is atomic on the event loop without needing a lock.
+        """
         domain = self._get_domain(url)
-        async with self._lock:
-            delay = self._domain_delay.get(domain, self._default_delay)
-            last = self._last_request.get(domain, 0)
-            elapsed = time.time() - last
-            if elapsed < delay:
-                await asyncio.sleep(delay - elapsed)
-            self._last_request[domain] = time.time()
+        now = time.monotonic()
+        delay = self._domain_delay.get(domain, self._default_delay)
+        slot = max(now, self._next_slot.get(domain, now))
+        self._next_slot[domain] = slot + delay
+        return slot - now
+
+    async def wait(self, url: str) -> None:
+        sleep_s = self.reserve(url)
+        if sleep_s > 0:
+            await asyncio.sleep(sleep_s)
 
     async def report_success(self, url: str) -> None:
         domain = self._get_domain(url)
-        async with self._lock:
-            current = self._domain_delay.get(domain, self._default_delay)
-            self._domain_delay[domain] = max(self._default_delay, current * 0.8)
+        current = self._domain_delay.get(domain, self._default_delay)
+        self._domain_delay[domain] = max(self._default_delay, current * 0.8)
 
     async def report_rate_limit(self, url: str) -> None:
         domain = self._get_domain(url)
-        async with self._lock:
-            current = self._domain_delay.get(domain, self._default_delay)
-            self._domain_delay[domain] = min(current * 2, 30.0)
-            logger.warning("Throttle backoff for %s: %.1fs", domain, self._domain_delay[domain])
+        current = self._domain_delay.get(domain, self._default_delay)
+        self._domain_delay[domain] = min(current * 2, 30.0)
+        # Push the domain's next slot out so the backoff applies immediately,
+        # not only after the already-booked slot.
+        now = time.monotonic()
+        self._next_slot[domain] = max(self._next_slot.get(domain, now), now + self._domain_delay[domain])
+        logger.warning("Throttle backoff for %s: %.1fs", domain, self._domain_delay[domain])
 
 
 # ── Shared block intelligence ────────────────────────────────────────────────
@@ -187,32 +266,140 @@ class CookieJar:
             return self._cookies.get(domain, [])
 
 
-# ── Task queue (thread-safe) ─────────────────────────────────────────────────
+def _set_status(task: URLTask, status: URLStatus) -> None:
+    task.status = status
+
+
+# ── Task queue (domain-interleaving scheduler) ──────────────────────────────
 
 class TaskQueue:
-    """Concurrency-safe task dispatcher backed by asyncio.Lock."""
+    """Concurrency-safe task dispatcher that interleaves domains.
 
-    def __init__(self, tasks: list[URLTask]):
-        self._tasks = tasks
-        self._index = 0
-        self._lock = asyncio.Lock()
+    Ready tasks are grouped into one FIFO lane (deque) per domain. ``next``
+    picks the lane whose throttle slot opens soonest (a heap keyed by the
+    domain's next-allowed time), books that slot and sleeps it out before
+    returning, so a worker only sleeps when every domain with work left is
+    still cooling down. Without a throttle, lanes are served round-robin.
 
-    async def next(self, worker_id: int) -> URLTask | None:
-        async with self._lock:
-            while self._index < len(self._tasks):
-                task = self._tasks[self._index]
-                self._index += 1
-                if task.status == URLStatus.PENDING:
-                    task.status = URLStatus.IN_PROGRESS
-                    task.worker_id = worker_id
-                    return task
-            return None
+    Heap keys are lazy: a domain's next-allowed time only ever moves forward,
+    so a stale key is a lower bound and is refreshed when it reaches the top.
 
-    async def requeue(self, task: URLTask) -> None:
-        async with self._lock:
-            task.status = URLStatus.PENDING
+    Retries go back in O(1): immediately to the front of their lane, or with a
+    delay onto a retry heap keyed by due time that ``next`` promotes from.
+    Finished tasks are never revisited. ``next`` returns None only once both
+    the ready lanes and the retry heap are empty.
+    """
+
+    def __init__(
+        self,
+        tasks: list[URLTask],
+        throttle: DomainThrottle | None = None,
+        transition: Callable[[URLTask, URLStatus], None] | None = None,
+    ):
+        self._throttle = throttle
+        self._transition = transition or _set_status
+        self._lanes: dict[str, deque[URLTask]] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._delayed: list[tuple[float, int, URLTask]] = []
+        self._seq = itertools.count()
+        self._cond = asyncio.Condition()
+        for task in tasks:
+            if task.status == URLStatus.PENDING:
+                self._lanes.setdefault(urlparse(task.url).netloc, deque()).append(task)
+        for domain in self._lanes:
+            self._push(domain)
+
+    def _ready_at(self, domain: str) -> float:
+        return self._throttle.ready_at(domain) if self._throttle else 0.0
+
+    def _push(self, domain: str) -> None:
+        heapq.heappush(self._heap, (self._ready_at(domain), next(self._seq), domain))
+
+    def _enqueue(self, task: URLTask, front: bool = False) -> None:
+        domain = urlparse(task.url).netloc
+        lane = self._lanes.get(domain)
+        if lane is None:
+            self._lanes[domain] = deque([task])
+            self._push(domain)
+        elif front:
+            lane.appendleft(task)
+        else:
+            lane.append(task)
+
+    def _promote_due(self) -> None:
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, task = heapq.heappop(self._delayed)
+            self._enqueue(task)
+
+    def _pop_ready(self) -> URLTask | None:
+        while self._heap:
+            key, _, domain = self._heap[0]
+            current = self._ready_at(domain)
+            if current > key:
+                heapq.heapreplace(self._heap, (current, next(self._seq), domain))
+                continue
+            heapq.heappop(self._heap)
+            lane = self._lanes[domain]
+            task = None
+            while lane and task is None:
+                candidate = lane.popleft()
+                if candidate.status == URLStatus.PENDING:
+                    task = candidate
+            if lane:
+                self._push(domain)
+            else:
+                del self._lanes[domain]
+            if task is not None:
+                return task
+        return None
+
+    async def next(
+        self, worker_id: int, skip: Callable[[URLTask], Coroutine[Any, Any, str | None]] | None = None,
+    ) -> URLTask | None:
+        """Hand out the next task once its domain's throttle slot opens.
+
+        ``skip`` is asked about each task before a slot is booked for it; a
+        returned reason marks the task SKIPPED with that error instead, so a
+        task the worker won't fetch never holds up its domain.
+        """
+        async with self._cond:
+            while True:
+                self._promote_due()
+                task = self._pop_ready()
+                if task is not None:
+                    reason = await skip(task) if skip else None
+                    if not reason:
+                        break
+                    task.error = reason
+                    self._transition(task, URLStatus.SKIPPED)
+                    continue
+                if not self._delayed:
+                    return None
+                # Only delayed retries are left: sleep until the first is due,
+                # or until a requeue changes the picture.
+                timeout = max(0.0, self._delayed[0][0] - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._transition(task, URLStatus.IN_PROGRESS)
+            task.worker_id = worker_id
+            sleep_s = self._throttle.reserve(task.url) if self._throttle else 0.0
+        if sleep_s > 0:
+            await asyncio.sleep(sleep_s)
+        return task
+
+    async def requeue(self, task: URLTask, delay_s: float = 0.0) -> None:
+        """Put ``task`` back: at the front of its lane, or on the retry heap after ``delay_s``."""
+        async with self._cond:
+            self._transition(task, URLStatus.PENDING)
             task.worker_id = None
-            self._index = min(self._index, self._tasks.index(task))
+            if delay_s > 0:
+                heapq.heappush(self._delayed, (time.monotonic() + delay_s, next(self._seq), task))
+            else:
+                self._enqueue(task, front=True)
+            self._cond.notify_all()
 
 
 # ── Fast DOM extraction (no AI) ─────────────────────────────────────────────
@@ -277,18 +464,235 @@ def extract_dom(html: str, url: str, title: str) -> dict:
     }
 
 
+# ── Streaming result sink ───────────────────────────────────────────────────
+
+def task_record(task: URLTask) -> dict | None:
+    """The output record for a finished task, or None if it hasn't finished."""
+    if task.status == URLStatus.DONE and task.result:
+        return task.result
+    if task.status in (URLStatus.FAILED, URLStatus.SKIPPED):
+        return {
+            "url": task.url,
+            "status": task.status.value,
+            "error": task.error,
+            "attempts": task.attempts,
+        }
+    return None
+
+
+class ResultSink:
+    """Appends one JSON line per finished URL (and optionally a CSV row).
+
+    Lines are flushed as they are written so the file can be tailed while the
+    job runs. Opened in append mode: a resumed job keeps adding to the same file.
+    """
+
+    CSV_FIELDS = ("url", "title", "status", "error", "attempts", "extracted", "scraped_at")
+
+    def __init__(self, path: Path, csv_path: Path | None = None):
+        self.path = path
+        self.csv_path = csv_path
+        self.written = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._csv_file = None
+        self._csv: csv.DictWriter | None = None
+        if csv_path:
+            fresh = not csv_path.exists() or csv_path.stat().st_size == 0
+            self._csv_file = open(csv_path, "a", encoding="utf-8", newline="")
+            self._csv = csv.DictWriter(self._csv_file, fieldnames=self.CSV_FIELDS, extrasaction="ignore")
+            if fresh:
+                self._csv.writeheader()
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self._csv:
+            self._csv.writerow({k: str(v)[:500] for k, v in record.items() if v is not None})
+            self._csv_file.flush()
+        self.written += 1
+
+    def close(self) -> None:
+        self._file.close()
+        if self._csv_file:
+            self._csv_file.close()
+
+
+def iter_results(path: Path) -> Iterator[dict]:
+    """Stream records back out of a result JSONL file, one line at a time."""
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_results(path: Path, offset: int = 0, limit: int = 100) -> tuple[list[dict], int]:
+    """Read up to ``limit`` records starting at byte ``offset`` of a result JSONL file.
+
+    Returns the records and the byte offset to pass next time. A trailing line
+    that is still being written is left for the next call. An ``offset`` that
+    falls inside a line skips ahead to the start of the next one.
+    """
+    records: list[dict] = []
+    if not path.exists():
+        return records, offset
+    with open(path, "rb") as f:
+        if offset:
+            f.seek(offset - 1)
+            if f.read(1) not in (b"\n", b""):
+                rest = f.readline()
+                if not rest.endswith(b"\n"):
+                    return records, offset
+                offset += len(rest)
+        f.seek(offset)
+        while len(records) < limit:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                records.append(json.loads(line))
+    return records, offset
+
+
+# ── Checkpoint log (write-ahead journal of task transitions) ────────────────
+
+class CheckpointLog:
+    """Append-only journal of a job's task transitions.
+
+    The first line is the job header (id + config); every later line is one
+    task's ``{"i": index, "s": status, "a": attempts, "e": error}``. Lines are
+    handed to the OS as they are written, so a ``kill -9`` loses nothing;
+    ``fsync`` is batched every ``fsync_every`` records or ``fsync_interval_s``.
+    Once the journal has grown by ``max(compact_min, len(tasks))`` records it is
+    rewritten as a snapshot (header + one line per task that has left its
+    initial state), which keeps replay cost proportional to the job, not to
+    its history.
+    """
+
+    def __init__(
+        self, path: Path, state: BulkJobState,
+        fsync_every: int = 64, fsync_interval_s: float = 1.0, compact_min: int = 1000,
+    ):
+        self.path = path
+        self._state = state
+        self._index = {id(t): i for i, t in enumerate(state.tasks)}
+        self._fsync_every = fsync_every
+        self._fsync_interval_s = fsync_interval_s
+        self._compact_min = compact_min
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._since_compact = 0
+        self._file = None
+        self.compact()
+
+    @staticmethod
+    def _task_line(i: int, task: URLTask) -> str:
+        return json.dumps({"i": i, "s": task.status.value, "a": task.attempts, "e": task.error}) + "\n"
+
+    def append(self, task: URLTask) -> None:
+        i = self._index.get(id(task))
+        if i is None or self._file is None:
+            return
+        self._file.write(self._task_line(i, task))
+        self._file.flush()
+        self._unsynced += 1
+        self._since_compact += 1
+        if self._since_compact >= max(self._compact_min, len(self._state.tasks)):
+            self.compact()
+        elif (self._unsynced >= self._fsync_every
+              or time.monotonic() - self._last_sync >= self._fsync_interval_s):
+            self.sync()
+
+    def sync(self) -> None:
+        if self._file is None or not self._unsynced:
+            return
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self) -> None:
+        """Atomically replace the journal with a snapshot of the current state."""
+        if self._file is not None:
+            self._file.close()
+        write_snapshot(self.path, self._state)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._since_compact = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+
+def write_snapshot(path: Path, state: BulkJobState) -> None:
+    """Write ``state`` as a compacted checkpoint log via a temp file + rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"job_id": state.job_id, "config": asdict(state.config)}) + "\n")
+        for i, task in enumerate(state.tasks):
+            if task.status != URLStatus.PENDING or task.attempts or task.error:
+                f.write(CheckpointLog._task_line(i, task))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def replay_checkpoint_log(path: Path) -> BulkJobState | None:
+    """Rebuild a job from its checkpoint log; the last record per task wins.
+
+    A torn final line (the process died mid-write) is ignored.
+    """
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        header = f.readline()
+        try:
+            head = json.loads(header)
+        except json.JSONDecodeError:
+            return None
+        config = BulkJobConfig(**head["config"])
+        state = BulkJobState(job_id=head["job_id"], config=config,
+                             tasks=[URLTask(url=u) for u in config.urls])
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            task = state.tasks[rec["i"]]
+            task.status = URLStatus(rec["s"])
+            task.attempts = rec.get("a", 0)
+            task.error = rec.get("e")
+    state.recount()
+    return state
+
+
 # ── Main engine ──────────────────────────────────────────────────────────────
 
 class BulkEngine:
     """Orchestrates concurrent browser workers for bulk URL scraping."""
 
-    def __init__(self, proxy_manager: SmartProxyManager | None = None):
-        self._proxy_manager = proxy_manager or SmartProxyManager()
+    def __init__(self, proxy_manager: SmartProxyManager | None = None,
+                 browser_pool: BrowserPool | None = None):
+        self._proxy_manager = proxy_manager or get_shared_proxy_manager()
+        # An injected pool is shared with the rest of the app and outlives jobs;
+        # our own is shut down whenever the last running job finishes.
+        self._owns_pool = browser_pool is None
+        self._pool = browser_pool or BrowserPool()
         self._jobs: dict[str, BulkJobState] = {}
         self._throttle = DomainThrottle()
         self._blocklist = BlockList()
         self._cookie_jar = CookieJar()
         self._broadcast: Callable[[str, dict], Coroutine] | None = None
+        self._sinks: dict[str, ResultSink] = {}
+        self._journals: dict[str, CheckpointLog] = {}
 
     def set_broadcast(self, fn: Callable[[str, dict], Coroutine]) -> None:
         self._broadcast = fn
@@ -316,25 +720,30 @@ class BulkEngine:
 
         await self._emit(job_id, {"type": "bulk_started", **state.progress})
 
-        queue = TaskQueue(state.tasks)
+        journal = self._journals[job_id] = CheckpointLog(self._checkpoint_path(job_id), state)
+        queue = TaskQueue(state.tasks, throttle=self._throttle,
+                          transition=functools.partial(self._transition, state))
+        csv_path = OUTPUT_DIR / f"{job_id}.csv" if state.config.output_format == "csv" else None
+        sink = self._sinks[job_id] = ResultSink(self.results_path(job_id), csv_path=csv_path)
 
-        workers = []
-        n_workers = min(state.config.max_workers, len(state.tasks))
-        for i in range(n_workers):
-            workers.append(asyncio.create_task(self._worker(state, i, queue)))
+        try:
+            workers = []
+            n_workers = min(state.config.max_workers, len(state.tasks))
+            for i in range(n_workers):
+                workers.append(asyncio.create_task(self._worker(state, i, queue)))
 
-        await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            sink.close()
+            del self._sinks[job_id]
+            journal.close()
+            del self._journals[job_id]
+            if self._owns_pool and not self._sinks:
+                await self._pool.close()
 
         state.finished_at = time.time()
 
-        results = self._aggregate(state)
-        output_path = OUTPUT_DIR / f"{job_id}.{state.config.output_format}"
-        OUTPUT_DIR.mkdir(exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            if state.config.output_format == "json":
-                json.dump(results, f, indent=2, ensure_ascii=False)
-            else:
-                f.write(self._format_results(results, state.config.output_format))
+        output_path = self._write_output(job_id, state.config.output_format)
 
         await self._emit(job_id, {
             "type": "bulk_finished",
@@ -348,6 +757,10 @@ class BulkEngine:
     def get_job(self, job_id: str) -> BulkJobState | None:
         return self._jobs.get(job_id)
 
+    def results_path(self, job_id: str) -> Path:
+        """The JSONL file finished URLs are appended to while ``job_id`` runs."""
+        return OUTPUT_DIR / f"{job_id}.jsonl"
+
     def cancel_job(self, job_id: str) -> bool:
         state = self._jobs.get(job_id)
         if not state:
@@ -365,9 +778,9 @@ class BulkEngine:
 
         for task in state.tasks:
             if task.status == URLStatus.IN_PROGRESS:
-                task.status = URLStatus.PENDING
+                state.transition(task, URLStatus.PENDING)
             if task.status == URLStatus.FAILED and task.attempts < state.config.max_retries:
-                task.status = URLStatus.PENDING
+                state.transition(task, URLStatus.PENDING)
 
         state.cancelled = False
         return await self.run_job(job_id)
@@ -376,7 +789,8 @@ class BulkEngine:
 
     async def _worker(self, state: BulkJobState, worker_id: int, queue: TaskQueue) -> None:
         seed = f"bulk-{state.job_id}-w{worker_id}-{int(time.time())}"
-        proxy_info = self._proxy_manager.get_best_proxy()
+        # A lease, so concurrent workers spread over the pool instead of piling onto the top proxy
+        proxy_info = await self._proxy_manager.acquire_proxy()
         proxy = proxy_info.to_playwright_dict() if proxy_info else None
         proxy_server = proxy.get("server") if proxy else None
         proxy_country = proxy_info.location if proxy_info else None
@@ -387,18 +801,21 @@ class BulkEngine:
         try:
             bc = await self._launch_browser(seed, proxy, proxy_country, state.config.block_resources)
 
+            async def blocked(task: URLTask) -> str | None:
+                domain = urlparse(task.url).netloc
+                if await self._blocklist.is_blocked(domain, proxy_server):
+                    return f"blocked combo: {domain} + {proxy_server}"
+                return None
+
             while not state.cancelled:
-                task = await queue.next(worker_id)
+                # next() skips blocked combos, then books and waits out the
+                # task's domain throttle slot
+                task = await queue.next(worker_id, skip=blocked)
                 if not task:
                     break
 
                 domain = urlparse(task.url).netloc
 
-                if await self._blocklist.is_blocked(domain, proxy_server):
-                    task.status = URLStatus.SKIPPED
-                    task.error = f"blocked combo: {domain} + {proxy_server}"
-                    continue
-
                 # Context rotation: swap fingerprint, keep browser process alive
                 if pages_on_profile >= state.config.rotation_interval:
                     cookies = await bc.get_cookies()
@@ -411,19 +828,17 @@ class BulkEngine:
                     pages_on_profile = 0
                     logger.info("Worker %d rotated context after %d pages", worker_id, state.config.rotation_interval)
 
-                await self._throttle.wait(task.url)
-
                 try:
                     result = await self._scrape_url(bc, task, state.config)
-                    task.status = URLStatus.DONE
                     task.result = result
                     task.finished_at = time.time()
+                    self._transition(state, task, URLStatus.DONE)
                     pages_on_profile += 1
 
                     await self._throttle.report_success(task.url)
 
                     if proxy_info:
-                        self._proxy_manager.mark_proxy_success(proxy_info, time.time() - (task.started_at or time.time()))
+                        self._proxy_manager.mark_proxy_success(proxy_info, time.time() - (task.started_at or time.time()), domain)
 
                     await self._emit(state.job_id, {
                         "type": "bulk_progress",
@@ -436,45 +851,58 @@ class BulkEngine:
                 except BotDetectedError as e:
                     task.attempts += 1
                     task.error = str(e)
-                    await self._blocklist.mark_blocked(domain, proxy_server)
                     await self._throttle.report_rate_limit(task.url)
-
-                    if proxy_info:
-                        self._proxy_manager.mark_proxy_failure(proxy_info, domain, str(e))
-
+                    # A 429 is the site pacing us: slow the domain down and retry later.
+                    # Only a challenge or block page burns the (domain, proxy) combo.
+                    rate_limited = e.detection_type == "rate_limit"
+                    if not rate_limited:
+                        await self._blocklist.mark_blocked(domain, proxy_server)
+                        if proxy_info:
+                            self._proxy_manager.mark_proxy_failure(proxy_info, domain, e.detection_type)
+
+                    retry_in = None
                     if task.attempts >= state.config.max_retries:
-                        task.status = URLStatus.FAILED
                         task.finished_at = time.time()
+                        self._transition(state, task, URLStatus.FAILED)
                     else:
-                        await queue.requeue(task)
-
-                    # Full browser restart on bot detection (new IP needed)
-                    await self._close_browser(bc)
-                    seed = f"bulk-{state.job_id}-w{worker_id}-retry-{int(time.time())}"
-                    proxy_info = self._proxy_manager.get_best_proxy()
-                    proxy = proxy_info.to_playwright_dict() if proxy_info else None
-                    proxy_server = proxy.get("server") if proxy else None
-                    proxy_country = proxy_info.location if proxy_info else None
-                    bc = await self._launch_browser(seed, proxy, proxy_country, state.config.block_resources)
-                    pages_on_profile = 0
+                        retry_in = retry_delay(task.attempts, state.config)
+                        await queue.requeue(task, delay_s=retry_in)
+
+                    if not rate_limited:
+                        # New context on a new proxy after bot detection (new IP needed)
+                        await self._close_browser(bc)
+                        seed = f"bulk-{state.job_id}-w{worker_id}-retry-{int(time.time())}"
+                        self._proxy_manager.release_proxy(proxy_info)
+                        proxy_info = None  # released: not again in finally if the next acquire is cancelled
+                        proxy_info = await self._proxy_manager.acquire_proxy(domain=domain)
+                        proxy = proxy_info.to_playwright_dict() if proxy_info else None
+                        proxy_server = proxy.get("server") if proxy else None
+                        proxy_country = proxy_info.location if proxy_info else None
+                        bc = await self._launch_browser(seed, proxy, proxy_country, state.config.block_resources)
+                        pages_on_profile = 0
 
                     await self._emit(state.job_id, {
                         "type": "bulk_progress",
                         "url": task.url,
-                        "status": "blocked",
+                        "status": "rate_limited" if rate_limited else "blocked",
                         "worker_id": worker_id,
                         "error": str(e),
+                        "retry_in_s": round(retry_in, 1) if retry_in is not None else None,
                         **state.progress,
                     })
 
                 except Exception as e:
                     task.attempts += 1
                     task.error = str(e)
+                    retry_in = None
                     if task.attempts >= state.config.max_retries:
-                        task.status = URLStatus.FAILED
                         task.finished_at = time.time()
+                        self._transition(state, task, URLStatus.FAILED)
                     else:
-                        await queue.requeue(task)
+                        # Back off instead of retrying into the same transient failure;
+                        # the worker moves on to other ready work meanwhile.
+                        retry_in = retry_delay(task.attempts, state.config)
+                        await queue.requeue(task, delay_s=retry_in)
 
                     await self._emit(state.job_id, {
                         "type": "bulk_progress",
@@ -482,32 +910,30 @@ class BulkEngine:
                         "status": "error",
                         "worker_id": worker_id,
                         "error": str(e),
+                        "retry_in_s": round(retry_in, 1) if retry_in is not None else None,
                         **state.progress,
                     })
 
         finally:
             if bc:
                 await self._close_browser(bc)
+            self._proxy_manager.release_proxy(proxy_info)
 
-    # ── browser lifecycle ────────────────────────────────────────────────────
+    # ── browser lifecycle (leased contexts) ──────────────────────────────────
 
     async def _launch_browser(
         self, seed: str, proxy: dict | None, proxy_country: str | None,
         block_resources: bool = True,
     ) -> BrowserController:
-        bc = BrowserController(
-            headless=False, proxy=proxy, proxy_country=proxy_country,
+        """Lease a fresh context (new fingerprint + proxy) from the shared pool."""
+        profile = generate_profile(seed=seed, proxy_country=proxy_country) if GHOST_MODE_ENABLED else generate_profile()
+        return await self._pool.lease(
+            proxy=proxy, proxy_country=proxy_country, profile=profile,
             block_resources=block_resources,
         )
-        bc._profile = generate_profile(seed=seed, proxy_country=proxy_country) if GHOST_MODE_ENABLED else generate_profile()
-        await bc.__aenter__()
-        return bc
 
     async def _close_browser(self, bc: BrowserController) -> None:
-        try:
-            await bc.__aexit__(None, None, None)
-        except Exception:
-            pass
+        await self._pool.release(bc)
 
     # ── page scraping ────────────────────────────────────────────────────────
 
@@ -522,24 +948,21 @@ class BulkEngine:
         timeout_ms = int(config.page_timeout_s * 1000)
 
         resp = await page.goto(task.url, wait_until="domcontentloaded", timeout=timeout_ms)
-        await page.wait_for_timeout(1500)
+        await wait_for_ready(page, max_wait_s=1.5)
 
         status = resp.status if resp else 0
 
-        if status in (403, 429):
-            html = await page.content()
-            lower = html.lower()
-            if any(s in lower for s in _BLOCK_SIGNALS):
-                raise BotDetectedError(f"HTTP {status} with block signals on {task.url}")
-
         title = await page.title()
+        html = await page.content()
+        verdict = classify_page(status, resp.headers if resp else None, (), html, title)
+        if verdict.is_anti_bot:
+            raise BotDetectedError(f"{verdict.detection_type} on {task.url}: {verdict.reason}", verdict.detection_type)
 
         if config.use_ai_extraction:
             from backend.universal_extractor import UniversalExtractor
             extractor = UniversalExtractor()
             extracted = await extractor.extract_intelligent_content(bc, config.prompt, "json", task.url)
         else:
-            html = await page.content()
             extracted = extract_dom(html, task.url, title)
 
         return {
@@ -555,33 +978,61 @@ class BulkEngine:
     def _next_task(self, state: BulkJobState, worker_id: int) -> URLTask | None:
         for task in state.tasks:
             if task.status == URLStatus.PENDING:
-                task.status = URLStatus.IN_PROGRESS
+                state.transition(task, URLStatus.IN_PROGRESS)
                 task.worker_id = worker_id
                 return task
         return None
 
     # ── output ───────────────────────────────────────────────────────────────
 
+    def _record(self, state: BulkJobState, task: URLTask) -> None:
+        """Append a finished task to the job's result sink and drop its result from memory."""
+        sink = self._sinks.get(state.job_id)
+        if sink is None:
+            return
+        record = task_record(task)
+        if record is not None:
+            sink.write(record)
+        task.result = None
+
     def _aggregate(self, state: BulkJobState) -> list[dict]:
-        results = []
-        for task in state.tasks:
-            if task.status == URLStatus.DONE and task.result:
-                results.append(task.result)
-            elif task.status in (URLStatus.FAILED, URLStatus.SKIPPED):
-                results.append({
-                    "url": task.url,
-                    "status": task.status.value,
-                    "error": task.error,
-                    "attempts": task.attempts,
-                })
-        return results
+        return [r for r in map(task_record, state.tasks) if r is not None]
+
+    def _write_output(self, job_id: str, fmt: str) -> Path:
+        """Produce the final output file by streaming over the job's result JSONL.
+
+        CSV is already written row by row by the sink; JSON and Markdown are
+        rendered one record at a time so memory stays flat for large jobs.
+        """
+        src = self.results_path(job_id)
+        output_path = OUTPUT_DIR / f"{job_id}.{fmt}"
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        if fmt == "csv":
+            return output_path
+        with open(output_path, "w", encoding="utf-8") as f:
+            if fmt == "md":
+                total = sum(1 for _ in iter_results(src))
+                f.write(f"# Bulk Scrape Results\n\nTotal: {total} pages\n")
+                for r in iter_results(src):
+                    f.write(f"\n## {r.get('title', r.get('url', 'Unknown'))}\n")
+                    f.write(f"\nURL: {r.get('url', 'N/A')}\n")
+                    if r.get("extracted"):
+                        f.write(f"\n```\n{str(r['extracted'])[:1000]}\n```\n")
+                return output_path
+            # Byte-for-byte what json.dump(results, indent=2) would produce.
+            f.write("[")
+            n = 0
+            for r in iter_results(src):
+                f.write(",\n" if n else "\n")
+                f.write(textwrap.indent(json.dumps(r, indent=2, ensure_ascii=False), "  "))
+                n += 1
+            f.write("\n]" if n else "]")
+        return output_path
 
     def _format_results(self, results: list[dict], fmt: str) -> str:
         if fmt == "csv":
             if not results:
                 return ""
-            import csv
-            import io
             buf = io.StringIO()
             writer = csv.DictWriter(buf, fieldnames=results[0].keys())
             writer.writeheader()
@@ -600,38 +1051,36 @@ class BulkEngine:
 
     # ── checkpointing ────────────────────────────────────────────────────────
 
+    def _checkpoint_path(self, job_id: str) -> Path:
+        return OUTPUT_DIR / "checkpoints" / f"{job_id}.log"
+
+    def _transition(self, state: BulkJobState, task: URLTask, status: URLStatus) -> None:
+        """``state.transition`` plus a journal record, so the change survives a crash.
+
+        A finished task's result is written to the result sink *before* the
+        journal marks it finished: a crash in between re-does the URL (at
+        worst a duplicate result line) rather than losing its result.
+        """
+        state.transition(task, status)
+        if status in (URLStatus.DONE, URLStatus.FAILED, URLStatus.SKIPPED):
+            self._record(state, task)
+        journal = self._journals.get(state.job_id)
+        if journal:
+            journal.append(task)
+
     def _save_checkpoint(self, state: BulkJobState) -> None:
-        cp_dir = OUTPUT_DIR / "checkpoints"
-        cp_dir.mkdir(parents=True, exist_ok=True)
-        cp = {
-            "job_id": state.job_id,
-            "config": {
-                "urls": state.config.urls,
-                "prompt": state.config.prompt,
-                "output_format": state.config.output_format,
-                "max_workers": state.config.max_workers,
-                "max_retries": state.config.max_retries,
-                "per_domain_delay_s": state.config.per_domain_delay_s,
-                "page_timeout_s": state.config.page_timeout_s,
-                "rotation_interval": state.config.rotation_interval,
-                "use_ai_extraction": state.config.use_ai_extraction,
-                "block_resources": state.config.block_resources,
-            },
-            "tasks": [
-                {
-                    "url": t.url,
-                    "status": t.status.value,
-                    "error": t.error,
-                    "attempts": t.attempts,
-                    "result": t.result,
-                }
-                for t in state.tasks
-            ],
-        }
-        with open(cp_dir / f"{state.job_id}.json", "w") as f:
-            json.dump(cp, f, indent=2)
+        """Compact the job's checkpoint log down to a snapshot of ``state``.
+
+        Results are not part of the checkpoint: they live in the job's result
+        JSONL (see ``ResultSink``).
+        """
+        write_snapshot(self._checkpoint_path(state.job_id), state)
 
     def _load_checkpoint(self, job_id: str) -> BulkJobState | None:
+        state = replay_checkpoint_log(self._checkpoint_path(job_id))
+        if state is not None:
+            return state
+        # Checkpoints written before the journal existed: one JSON document.
         cp_path = OUTPUT_DIR / "checkpoints" / f"{job_id}.json"
         if not cp_path.exists():
             return None
@@ -646,8 +1095,24 @@ class BulkEngine:
             task.attempts = t.get("attempts", 0)
             task.result = t.get("result")
             state.tasks.append(task)
+        state.recount()
+        # Their results lived in the checkpoint; move them into the result sink
+        # that the results endpoint and the final output read from.
+        if not self.results_path(job_id).exists():
+            csv_path = OUTPUT_DIR / f"{job_id}.csv" if config.output_format == "csv" else None
+            sink = ResultSink(self.results_path(job_id), csv_path=csv_path)
+            try:
+                for task in state.tasks:
+                    record = task_record(task)
+                    if record is not None:
+                        sink.write(record)
+                    task.result = None
+            finally:
+                sink.close()
         return state
 
 
 class BotDetectedError(Exception):
-    pass
+    def __init__(self, message: str, detection_type: str = "unknown"):
+        super().__init__(message)
+        self.detection_type = detection_type
@@ -114,8 +114,30 @@ INTERACTION_DELAY_S: float = float(os.getenv("INTERACTION_DELAY_S", "0.5"))
 STREAM_POLL_INTERVAL_S: float = float(os.getenv("STREAM_POLL_INTERVAL_S", "0.1"))
 PROXY_ROTATION_DELAY_S: float = float(os.getenv("PROXY_ROTATION_DELAY_S", "3.0"))
 CAPTCHA_SETTLE_S: float = float(os.getenv("CAPTCHA_SETTLE_S", "3.0"))
+# The *_SETTLE_S values above cap page-readiness waits (see page_readiness.py):
+# a page counts as ready once it has had at most READY_MAX_INFLIGHT requests in
+# flight for READY_NETWORK_QUIET_S and no DOM mutations for READY_DOM_QUIET_S.
+READY_NETWORK_QUIET_S: float = float(os.getenv("READY_NETWORK_QUIET_S", "0.25"))
+READY_DOM_QUIET_S: float = float(os.getenv("READY_DOM_QUIET_S", "0.15"))
+READY_MAX_INFLIGHT: int = int(os.getenv("READY_MAX_INFLIGHT", "0"))
 STREAM_SESSION_TIMEOUT_S: float = float(os.getenv("STREAM_SESSION_TIMEOUT_S", "30.0"))
 
+# ── Page state ────────────────────────────────────────────────────────────────
+# How get_page_state finds elements: "js" walks the DOM in the page, "snapshot"
+# takes one CDP DOMSnapshot.captureSnapshot and parses it in Python (dom_snapshot.py).
+PAGE_STATE_ENGINE: str = os.getenv("PAGE_STATE_ENGINE", "js").lower()
+# One JPEG per step (BrowserController.capture_frame), shared by the decision
+# model, anti-bot checks, CAPTCHA solving and stream polling.
+FRAME_JPEG_QUALITY: int = int(os.getenv("FRAME_JPEG_QUALITY", "75"))
+FRAME_MAX_WIDTH: int = int(os.getenv("FRAME_MAX_WIDTH", "1280"))
+FRAME_MAX_HEIGHT: int = int(os.getenv("FRAME_MAX_HEIGHT", "800"))
+
+# ── Agent prompt ──────────────────────────────────────────────────────────────
+# Elements shown to the model per step: the most goal-relevant ones (see
+# element_ranking.py), at most AGENT_MAX_ELEMENTS and ~AGENT_ELEMENT_TOKEN_BUDGET tokens.
+AGENT_MAX_ELEMENTS: int = int(os.getenv("AGENT_MAX_ELEMENTS", "30"))
+AGENT_ELEMENT_TOKEN_BUDGET: int = int(os.getenv("AGENT_ELEMENT_TOKEN_BUDGET", "1500"))
+
 # ── Human behavior ────────────────────────────────────────────────────────────
 HUMAN_TYPING_WPM_MIN: int = int(os.getenv("HUMAN_TYPING_WPM_MIN", "40"))
 HUMAN_TYPING_WPM_MAX: int = int(os.getenv("HUMAN_TYPING_WPM_MAX", "80"))
@@ -141,6 +163,58 @@ GHOST_MODE_ENABLED: bool = os.getenv("GHOST_MODE_ENABLED", "1") == "1"
 GHOST_MODE_HUMAN_BEHAVIOR: bool = os.getenv("GHOST_MODE_HUMAN_BEHAVIOR", "1") == "1"
 GHOST_MODE_SEED: str = os.getenv("GHOST_MODE_SEED", "")
 
+# ── Browser pool ─────────────────────────────────────────────────────────────
+# A few Chromium processes, each hosting many isolated contexts (see browser_pool.py).
+BROWSER_POOL_PROCESSES: int = int(os.getenv("BROWSER_POOL_PROCESSES", "2"))
+BROWSER_POOL_CONTEXTS_PER_PROCESS: int = int(os.getenv("BROWSER_POOL_CONTEXTS_PER_PROCESS", "8"))
+# Idle proxy-less contexts kept pre-launched for agent jobs / structured scrapes
+# (0 disables; capped below the browser pool capacity, unused when proxies are set).
+# Each serves one job and is then closed and replaced.
+WARM_POOL_SIZE: int = int(os.getenv("WARM_POOL_SIZE", "2"))
+
 # ── Xvfb ─────────────────────────────────────────────────────────────────────
-XVFB_DISPLAY_START: int = int(os.getenv("XVFB_DISPLAY_START", "99"))
-XVFB_DISPLAY_END: int = int(os.getenv("XVFB_DISPLAY_END", "110"))
+# Shared virtual screens for headful browsers (see display_manager.py).
+XVFB_MAX_DISPLAYS: int = int(os.getenv("XVFB_MAX_DISPLAYS", "4"))
+XVFB_BROWSERS_PER_DISPLAY: int = int(os.getenv("XVFB_BROWSERS_PER_DISPLAY", "16"))
+XVFB_SCREEN: str = os.getenv("XVFB_SCREEN", "1920x1080x24")
+
+# ── Anti-bot detection ───────────────────────────────────────────────────────
+# Vision verdicts cached per (domain, screenshot hash, title) (see verdict_cache.py).
+ANTI_BOT_CACHE_SIZE: int = int(os.getenv("ANTI_BOT_CACHE_SIZE", "512"))
+ANTI_BOT_CACHE_TTL_S: float = float(os.getenv("ANTI_BOT_CACHE_TTL_S", "600"))
+# Max differing bits (of 64) for two screenshots to count as the same page.
+ANTI_BOT_CACHE_MAX_DISTANCE: int = int(os.getenv("ANTI_BOT_CACHE_MAX_DISTANCE", "4"))
+
+# ── Proxy scoring ────────────────────────────────────────────────────────────
+# Per-(proxy, domain) Thompson sampling (see proxy_scoring.py): outcomes lose
+# half their weight every PROXY_SCORE_HALF_LIFE_S; each pick samples the proxies
+# already tried on the domain plus the PROXY_SCORE_EXPLORE best-ranked others.
+PROXY_SCORE_HALF_LIFE_S: float = float(os.getenv("PROXY_SCORE_HALF_LIFE_S", "1800"))
+PROXY_SCORE_EXPLORE: int = int(os.getenv("PROXY_SCORE_EXPLORE", "8"))
+PROXY_SCORE_MAX_DOMAINS: int = int(os.getenv("PROXY_SCORE_MAX_DOMAINS", "5000"))
+
+# ── Proxy health checks ──────────────────────────────────────────────────────
+# Background prober (see proxy_health.py); 0 disables it. Each round fetches
+# PROXY_HEALTH_CHECK_URL through every proxy, PROXY_HEALTH_CHECK_CONCURRENCY at a
+# time. FAILED proxies are re-probed (and revived) after PROXY_FAILED_COOLDOWN_S.
+PROXY_HEALTH_CHECK_INTERVAL_S: float = float(os.getenv("PROXY_HEALTH_CHECK_INTERVAL_S", "0"))
+PROXY_HEALTH_CHECK_URL: str = os.getenv("PROXY_HEALTH_CHECK_URL", "https://www.gstatic.com/generate_204")
+PROXY_HEALTH_CHECK_TIMEOUT_S: float = float(os.getenv("PROXY_HEALTH_CHECK_TIMEOUT_S", "10"))
+PROXY_HEALTH_CHECK_CONCURRENCY: int = int(os.getenv("PROXY_HEALTH_CHECK_CONCURRENCY", "20"))
+PROXY_FAILED_COOLDOWN_S: float = float(os.getenv("PROXY_FAILED_COOLDOWN_S", "600"))
+
+# ── Proxy stats store ────────────────────────────────────────────────────────
+# SQLite file the proxy manager saves its counters, health, blocked sites and
+# per-domain scores to every PROXY_STATS_FLUSH_INTERVAL_S, and reloads at
+# startup (see proxy_store.py). Empty disables it.
+PROXY_STATS_DB: str = os.getenv("PROXY_STATS_DB", "outputs/proxy_stats.db")
+PROXY_STATS_FLUSH_INTERVAL_S: float = float(os.getenv("PROXY_STATS_FLUSH_INTERVAL_S", "60"))
+
+# ── Proxy leases ─────────────────────────────────────────────────────────────
+# Jobs and bulk workers lease proxies (see SmartProxyManager.acquire_proxy): at
+# most PROXY_MAX_CONCURRENT holders per proxy. When every proxy is full a lease
+# waits up to PROXY_LEASE_TIMEOUT_S, then doubles up on the least-loaded one.
+# Sticky leases keep a (session, domain) on the same exit for PROXY_STICKY_TTL_S.
+PROXY_MAX_CONCURRENT: int = int(os.getenv("PROXY_MAX_CONCURRENT", "4"))
+PROXY_LEASE_TIMEOUT_S: float = float(os.getenv("PROXY_LEASE_TIMEOUT_S", "30"))
+PROXY_STICKY_TTL_S: float = float(os.getenv("PROXY_STICKY_TTL_S", "600"))
@@ -0,0 +1,169 @@
+"""Process-wide Xvfb display manager — a few large virtual screens shared by many browsers.
+
+Headful Chromium needs an X display. Starting one Xvfb per browser and probing
+``/tmp/.X{n}-lock`` files for a free number caps concurrency at the size of
+the probed range and races when several workers start at once. Instead:
+
+- Xvfb picks its own free display number and reports it over ``-displayfd``,
+  so allocation is atomic even across processes and has no fixed range
+- Each screen is shared by up to ``browsers_per_display`` browsers; a new one is
+  started only when every screen is full, up to ``max_displays``. Past that,
+  browsers double up on the least-loaded screen instead of failing
+- Leases are reference counted; idle screens stay up for reuse and are reaped
+  by ``close()`` (called on app shutdown, and at interpreter exit)
+
+If Xvfb is not installed, ``acquire()`` returns None and callers fall back to
+headless mode.
+
+Usage:
+    from backend.display_manager import display_manager
+    display = await display_manager.acquire()     # ":3", or None
+    browser = await chromium.launch(env={**os.environ, "DISPLAY": display})
+    display_manager.release(display)
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import subprocess
+from dataclasses import dataclass
+
+from backend.config import XVFB_BROWSERS_PER_DISPLAY, XVFB_MAX_DISPLAYS, XVFB_SCREEN
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Screen:
+    display: str
+    process: subprocess.Popen | None
+    users: int = 0
+
+
+class DisplayManager:
+    """Hands out shared Xvfb displays, starting screens on demand."""
+
+    def __init__(
+        self,
+        max_displays: int = XVFB_MAX_DISPLAYS,
+        browsers_per_display: int = XVFB_BROWSERS_PER_DISPLAY,
+        screen: str = XVFB_SCREEN,
+        startup_timeout_s: float = 5.0,
+    ):
+        self.max_displays = max(1, max_displays)
+        self.browsers_per_display = max(1, browsers_per_display)
+        self.screen = screen
+        self.startup_timeout_s = startup_timeout_s
+        self._screens: dict[str, _Screen] = {}
+        self._lock = asyncio.Lock()
+        self._unavailable = False
+        self._atexit_registered = False
+
+    def stats(self) -> dict:
+        return {
+            "displays": len(self._screens),
+            "max_displays": self.max_displays,
+            "browsers": sum(s.users for s in self._screens.values()),
+            "per_display": {d: s.users for d, s in self._screens.items()},
+        }
+
+    async def acquire(self) -> str | None:
+        """Lease a display (e.g. ``":3"``), or None if Xvfb can't be used here."""
+        async with self._lock:
+            self._screens = {d: s for d, s in self._screens.items() if self._alive(s)}
+            live = list(self._screens.values())
+            roomy = [s for s in live if s.users < self.browsers_per_display]
+            if roomy:
+                screen = min(roomy, key=lambda s: s.users)
+            elif len(live) < self.max_displays and not self._unavailable:
+                screen = await self._start_screen()
+                if screen is None:
+                    if not live:
+                        return None
+                    screen = min(live, key=lambda s: s.users)
+            elif live:
+                screen = min(live, key=lambda s: s.users)
+            else:
+                return None
+            screen.users += 1
+            return screen.display
+
+    def release(self, display: str | None) -> None:
+        screen = self._screens.get(display) if display else None
+        if screen:
+            screen.users = max(0, screen.users - 1)
+
+    @staticmethod
+    def _alive(screen: _Screen) -> bool:
+        return screen.process is None or screen.process.poll() is None
+
+    async def _start_screen(self) -> _Screen | None:
+        try:
+            display, process = await self._spawn()
+        except FileNotFoundError:
+            logger.warning("⚠️ Xvfb not available; browsers will fall back to headless mode")
+            self._unavailable = True
+            return None
+        except Exception as e:
+            logger.error("❌ Could not start Xvfb: %s", e)
+            return None
+        if not self._atexit_registered:
+            atexit.register(self._reap)
+            self._atexit_registered = True
+        screen = _Screen(display=display, process=process)
+        self._screens[display] = screen
+        logger.info("🖥️ Started shared Xvfb screen %s (%s)", display, self.screen)
+        return screen
+
+    async def _spawn(self) -> tuple[str, subprocess.Popen]:
+        """Start one Xvfb and return its display once it reports ready via -displayfd."""
+        read_fd, write_fd = os.pipe()
+        try:
+            process = subprocess.Popen(
+                ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", self.screen, "-nolisten", "tcp"],
+                pass_fds=(write_fd,),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        def _read_number() -> str:
+            with os.fdopen(read_fd, "rb") as f:
+                return f.readline().decode().strip()
+
+        try:
+            number = await asyncio.wait_for(asyncio.to_thread(_read_number), self.startup_timeout_s)
+        except asyncio.TimeoutError:
+            number = ""
+        if not number.isdigit():
+            self._terminate(process)
+            raise RuntimeError(f"Xvfb exited before reporting a display (code {process.poll()})")
+        return f":{number}", process
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen | None) -> None:
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def _reap(self) -> None:
+        screens, self._screens = self._screens, {}
+        for screen in screens.values():
+            self._terminate(screen.process)
+
+    async def close(self) -> None:
+        """Stop every Xvfb this manager started."""
+        async with self._lock:
+            self._reap()
+
+
+display_manager = DisplayManager()
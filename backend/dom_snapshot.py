@@ -0,0 +1,257 @@
+"""Page-state extraction from one ``DOMSnapshot.captureSnapshot`` call.
+
+The default engine (``BrowserController._get_dom_extraction_js``) walks every
+element in the page and calls ``getComputedStyle`` / ``getBoundingClientRect``
+on each, forcing style and layout work per node; on heavy pages that walk is
+most of a step's extraction time. ``DOMSnapshot.captureSnapshot`` returns the
+whole tree with the computed styles and layout boxes we need in one CDP call,
+and ``parse_snapshot`` turns it into the same element dicts the JS engine
+returns, so ``get_page_state`` builds ``ElementInfo`` / ``selector_map`` the
+same way for both.
+
+Rules mirror the JS engine, with two known differences:
+
+- a click handler only counts when it is an ``onclick`` attribute (the JS
+  engine also sees ``element.onclick`` assigned from script)
+- an element without a layout box (``display: none`` and its subtree) has no
+  computed cursor, so ``cursor: pointer`` alone never makes it interactive
+
+Select with ``PAGE_STATE_ENGINE=snapshot``.
+"""
+
+import asyncio
+
+# Requested styles; parse_snapshot unpacks them in this order
+COMPUTED_STYLES = ("display", "visibility", "opacity", "cursor")
+
+_ELEMENT_NODE = 1
+_TEXT_NODES = (3, 4)  # text, CDATA
+_FRAGMENT_NODE = 11  # shadow roots and <template> contents: not in querySelectorAll('*')
+_INTERACTIVE_TAGS = frozenset({"a", "button", "input", "select", "textarea", "label"})
+_INPUT_TAGS = frozenset({"input", "textarea", "select"})
+# Elements whose ``.value`` is a string property the JS engine would read
+_VALUE_ATTR_TAGS = frozenset({"button", "option", "data", "output", "param"})
+MAX_TEXT_CHARS = 200
+
+# Marks our overlay nodes, as on the JS engine's labels: each engine clears the
+# other's overlay and neither indexes it
+LABEL_ATTR = "data-browserpilot-label"
+
+# Replace the previous overlay with one outlining every indexed element and
+# labelling it with its index, from viewport rects
+_HIGHLIGHT_JS = """
+(boxes) => {
+    document.querySelectorAll('[data-browserpilot-label]').forEach(node => node.remove());
+    const layer = document.createElement('div');
+    layer.setAttribute('data-browserpilot-label', '');
+    layer.style.cssText = 'position:absolute;top:0;left:0;width:0;height:0;pointer-events:none;z-index:10000';
+    for (const [index, left, top, width, height] of boxes) {
+        const x = left + window.scrollX, y = top + window.scrollY;
+        const box = document.createElement('div');
+        box.style.cssText = `position:absolute;left:${x - 1}px;top:${y - 1}px;width:${width}px;` +
+            `height:${height}px;outline:2px solid red;outline-offset:1px`;
+        const label = document.createElement('div');
+        label.textContent = String(index);
+        label.style.cssText = `position:absolute;left:${x}px;top:${y - 20}px;background:red;color:white;` +
+            'padding:2px 6px;font-size:12px;font-weight:bold;border-radius:3px';
+        for (const node of [box, label]) node.setAttribute('data-browserpilot-label', '');
+        layer.append(box, label);
+    }
+    document.body.appendChild(layer);
+}
+"""
+
+
+def _rare(data: dict | None) -> dict:
+    """RareStringData as {node index: string index}."""
+    if not data:
+        return {}
+    return dict(zip(data.get("index", []), data.get("value", [])))
+
+
+def _attribute(strings: list, attrs: list, node: int, name: str) -> str | None:
+    flat = attrs[node] if node < len(attrs) else []
+    for k in range(0, len(flat) - 1, 2):
+        if strings[flat[k]] == name:
+            return strings[flat[k + 1]]
+    return None
+
+
+def _input_type(tag: str, attributes: dict) -> str | None:
+    """``element.type`` as the JS engine reports it."""
+    if tag == "input":
+        return attributes.get("type", "text").lower() or "text"
+    if tag == "button":
+        return attributes.get("type", "submit").lower() or "submit"
+    if tag == "select":
+        return "select-multiple" if "multiple" in attributes else "select-one"
+    if tag == "textarea":
+        return "textarea"
+    return None
+
+
+def parse_snapshot(snapshot: dict, viewport: dict) -> list[dict]:
+    """Element dicts (camelCase, as the JS engine returns them) for the main
+    document of a ``DOMSnapshot.captureSnapshot`` result taken with
+    ``computedStyles=COMPUTED_STYLES``. ``viewport`` is ``{"width", "height"}``
+    in CSS pixels."""
+    strings = snapshot["strings"]
+    doc = snapshot["documents"][0]
+    nodes = doc["nodes"]
+    parents = nodes["parentIndex"]
+    types = nodes["nodeType"]
+    names = nodes["nodeName"]
+    values = nodes.get("nodeValue", [])
+    attrs = nodes.get("attributes", [])
+    input_values = _rare(nodes.get("inputValue"))
+    selected = set(nodes.get("optionSelected", {}).get("index", []))
+    pseudo = set(nodes.get("pseudoType", {}).get("index", []))
+    n = len(parents)
+
+    def string(i: int) -> str:
+        return strings[i] if i >= 0 else ""
+
+    # Nodes come in document order, so a node's subtree is the contiguous run
+    # after it; end[i] is one past its last descendant.
+    end = list(range(1, n + 1))
+    for i in range(n - 1, 0, -1):
+        p = parents[i]
+        if p >= 0 and end[i] > end[p]:
+            end[p] = end[i]
+
+    layout = doc.get("layout", {})
+    boxes: dict[int, tuple] = {}
+    for node, style, bounds in zip(layout.get("nodeIndex", []), layout.get("styles", []), layout.get("bounds", [])):
+        boxes.setdefault(node, (style, bounds))
+    scroll_x = doc.get("scrollOffsetX", 0)
+    scroll_y = doc.get("scrollOffsetY", 0)
+    vw, vh = viewport["width"], viewport["height"]
+
+    def text_content(i: int) -> str:
+        parts, length = [], 0
+        for j in range(i + 1, end[i]):
+            if types[j] in _TEXT_NODES:
+                piece = string(values[j])
+                parts.append(piece)
+                length += len(piece)
+                # Stop once the trimmed text is certain to fill MAX_TEXT_CHARS
+                if length > 2 * MAX_TEXT_CHARS:
+                    lead = "".join(parts).lstrip()
+                    if lead[MAX_TEXT_CHARS:].strip():
+                        break
+                    parts, length = [lead], len(lead)
+        return "".join(parts).strip()[:MAX_TEXT_CHARS]
+
+    elements = []
+    processed = 0
+    highlight = 0
+    i = 0
+    while i < n:
+        if types[i] == _FRAGMENT_NODE:
+            i = end[i]
+            continue
+        if types[i] != _ELEMENT_NODE or i in pseudo:
+            i += 1
+            continue
+        tag = string(names[i]).lower()
+        flat = attrs[i] if i < len(attrs) else []
+        attributes = {string(flat[k]): string(flat[k + 1]) for k in range(0, len(flat) - 1, 2)}
+        if LABEL_ATTR in attributes:
+            # Last step's highlight overlay, not page content
+            i = end[i]
+            continue
+
+        style, bounds = boxes.get(i, (None, None))
+        display, visibility, opacity, cursor = (strings[s] if s >= 0 else "" for s in style) if style else ("",) * 4
+        x, y, w, h = bounds if bounds else (0.0, 0.0, 0.0, 0.0)
+        left, top = x - scroll_x, y - scroll_y
+
+        editable = attributes.get("contenteditable", "inherit").lower() in ("", "true")
+        is_input = tag in _INPUT_TAGS or editable
+        is_interactive = (
+            tag in _INTERACTIVE_TAGS
+            or bool(attributes.get("onclick"))
+            or attributes.get("role") in ("button", "link")
+            or "tabindex" in attributes
+            or editable
+            or cursor == "pointer"
+        )
+        is_visible = (
+            style is not None and w > 0 and h > 0
+            and visibility != "hidden" and display != "none" and opacity != "0"
+            and top < vh and top + h > 0 and left < vw and left + w > 0
+        )
+        if not is_visible and not is_interactive:
+            i += 1
+            continue
+
+        processed += 1
+        index = None
+        if is_interactive or is_input:
+            index = highlight
+            highlight += 1
+
+        placeholder = attributes.get("placeholder") if tag in ("input", "textarea") else None
+        if tag == "select":
+            # element.value: the first selected option's value (its text if it has none)
+            option = next((j for j in range(i + 1, end[i]) if j in selected), None)
+            value = "" if option is None else _attribute(strings, attrs, option, "value")
+            if option is not None and value is None:
+                value = text_content(option)
+        elif tag in ("input", "textarea"):
+            value = string(input_values.get(i, -1))
+        elif tag in _VALUE_ATTR_TAGS:
+            value = attributes.get("value")
+            if value is None and tag == "option":
+                value = text_content(i)
+        else:
+            value = ""
+        text = text_content(i)
+        if value:
+            text = value
+        elif placeholder:
+            text = placeholder
+        if tag == "img" and attributes.get("alt"):
+            text = attributes["alt"]
+
+        elements.append({
+            "index": index,
+            "id": f"element_{processed}",
+            "tagName": tag,
+            "xpath": "",
+            "cssSelector": "",
+            "text": text[:MAX_TEXT_CHARS],
+            "attributes": attributes,
+            "isClickable": is_interactive,
+            "isInput": is_input,
+            "isVisible": is_visible,
+            "isInViewport": is_visible,
+            "inputType": _input_type(tag, attributes),
+            "placeholder": placeholder or None,
+            "boundingBox": {
+                "x": left, "y": top, "width": w, "height": h,
+                "top": top, "bottom": top + h, "left": left, "right": left + w,
+            },
+            "centerCoordinates": {"x": left + w / 2, "y": top + h / 2},
+        })
+        i += 1
+    return elements
+
+
+async def capture_elements(cdp_session, viewport: dict) -> list[dict]:
+    """Take a snapshot over ``cdp_session`` and parse it (off the event loop)."""
+    snapshot = await cdp_session.send(
+        "DOMSnapshot.captureSnapshot", {"computedStyles": list(COMPUTED_STYLES)}
+    )
+    return await asyncio.to_thread(parse_snapshot, snapshot, viewport)
+
+
+async def highlight_elements(page, elements: list[dict]) -> None:
+    """Draw the JS engine's red outline + index label over every indexed element,
+    replacing the previous step's overlay."""
+    boxes = [
+        [e["index"], e["boundingBox"]["left"], e["boundingBox"]["top"],
+         e["boundingBox"]["width"], e["boundingBox"]["height"]]
+        for e in elements if e["index"] is not None
+    ]
+    await page.evaluate(_HIGHLIGHT_JS, boxes)
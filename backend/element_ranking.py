@@ -0,0 +1,184 @@
+"""Goal-aware ranking of page elements for the decision prompt.
+
+``decide`` can only show the model a few dozen elements. Taking the first N by
+index cuts whatever sits low in the DOM, so on long pages the search box or the
+result link the goal needs was often missing and the agent scrolled to find
+it. Elements are instead ranked by:
+
+- BM25 of the goal's terms against each element's text and descriptive
+  attributes (placeholder, aria-label, title, alt, name, id, class, href path)
+- a viewport prior: on-screen elements first, then the nearest below the fold
+- an element-type prior: inputs, then buttons, then links
+
+and the best ones are kept up to ``AGENT_MAX_ELEMENTS`` and a token budget.
+
+A page's ``PageIndex`` (tokens, document frequencies) is kept per URL. A step
+that returns the same selector map reuses it as is; otherwise only elements
+whose content changed are re-tokenized.
+"""
+
+import json
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Callable
+
+from backend.config import (
+    AGENT_ELEMENT_TOKEN_BUDGET,
+    AGENT_MAX_ELEMENTS,
+    BROWSER_VIEWPORT_HEIGHT,
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Prior weights, on the scale of one strong BM25 term match (~1-3)
+VIEWPORT_WEIGHT = 1.0
+TYPE_PRIORS = {"input": 0.6, "button": 0.4, "link": 0.2}
+# Pages whose index is kept for reuse across steps
+MAX_INDEXED_PAGES = 32
+
+_TEXT_ATTRIBUTES = ("placeholder", "aria-label", "title", "alt", "name", "id", "value", "class", "role", "type")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset({
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "at", "by", "from", "is", "it",
+    "go", "find", "get", "me", "my", "please", "then", "save", "extract", "info", "information",
+    "http", "https", "www", "com",
+})
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOP_WORDS]
+
+
+def _element_key(elem) -> tuple:
+    """What an element's tokens depend on."""
+    attrs = elem.attributes or {}
+    return (elem.tag_name, elem.text, attrs.get("href"), *(attrs.get(a) for a in _TEXT_ATTRIBUTES))
+
+
+def _element_tokens(elem) -> list[str]:
+    attrs = elem.attributes or {}
+    parts = [elem.text or "", elem.tag_name or ""]
+    parts.extend(attrs[a] for a in _TEXT_ATTRIBUTES if attrs.get(a))
+    href = attrs.get("href")
+    if href and not href.startswith("javascript:"):
+        # the path and query carry the words (/products/iphone-15?color=blue)
+        parts.append(href.split("//", 1)[-1].partition("/")[2])
+    return tokenize(" ".join(parts))
+
+
+def _type_prior(elem) -> float:
+    tag = elem.tag_name
+    if elem.is_input or tag in ("input", "textarea", "select"):
+        return TYPE_PRIORS["input"]
+    if tag == "button" or (elem.attributes or {}).get("role") == "button":
+        return TYPE_PRIORS["button"]
+    if tag == "a":
+        return TYPE_PRIORS["link"]
+    return 0.0
+
+
+def _viewport_prior(elem, viewport_height: float) -> float:
+    """1 on screen, halving every viewport height away from it."""
+    center = elem.center_coordinates
+    if not center:
+        return 0.0
+    y = center.get("y", 0)
+    if 0 <= y <= viewport_height:
+        return 1.0
+    distance = -y if y < 0 else y - viewport_height
+    return 0.5 ** (1 + distance / viewport_height)
+
+
+class PageIndex:
+    """BM25 statistics over one page's ``selector_map``."""
+
+    def __init__(self, selector_map: dict, previous: "PageIndex | None" = None):
+        self.selector_map = selector_map
+        reusable = previous._by_key if previous else {}
+        self._by_key: dict[tuple, list[str]] = {}
+        self.tokens: dict[int, Counter] = {}
+        self.lengths: dict[int, int] = {}
+        self.doc_freq: Counter = Counter()
+        self.reused = 0
+        for index, elem in selector_map.items():
+            key = _element_key(elem)
+            tokens = reusable.get(key)
+            if tokens is None:
+                tokens = _element_tokens(elem)
+            else:
+                self.reused += 1
+            self._by_key[key] = tokens
+            counts = Counter(tokens)
+            self.tokens[index] = counts
+            self.lengths[index] = len(tokens)
+            self.doc_freq.update(counts.keys())
+        self.avg_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0.0
+
+    def bm25(self, index: int, terms: list[str]) -> float:
+        counts = self.tokens[index]
+        n = len(self.tokens)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / (self.avg_length or 1))
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term)
+            if not tf:
+                continue
+            df = self.doc_freq[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return score
+
+    def rank(self, goal: str, viewport_height: float = BROWSER_VIEWPORT_HEIGHT) -> list[int]:
+        """Element indices, most relevant to ``goal`` first (ties in index order)."""
+        terms = list(dict.fromkeys(tokenize(goal)))
+        scores = {
+            index: self.bm25(index, terms)
+            + VIEWPORT_WEIGHT * _viewport_prior(elem, viewport_height)
+            + _type_prior(elem)
+            for index, elem in self.selector_map.items()
+        }
+        return sorted(scores, key=lambda i: (-scores[i], i))
+
+
+_indexes: OrderedDict[str, PageIndex] = OrderedDict()
+
+
+def page_index(page_state) -> PageIndex:
+    """The index for ``page_state``, reusing the one built for its URL last step."""
+    previous = _indexes.pop(page_state.url, None)
+    if previous is not None and previous.selector_map is page_state.selector_map:
+        index = previous
+    else:
+        index = PageIndex(page_state.selector_map, previous)
+    _indexes[page_state.url] = index
+    while len(_indexes) > MAX_INDEXED_PAGES:
+        _indexes.popitem(last=False)
+    return index
+
+
+def estimate_tokens(data) -> int:
+    """Rough prompt tokens for a JSON-serialized value (~4 characters per token)."""
+    return len(json.dumps(data)) // 4 + 1
+
+
+def select_elements(
+    page_state,
+    goal: str,
+    describe: Callable[[int, object], dict],
+    max_elements: int = AGENT_MAX_ELEMENTS,
+    token_budget: int = AGENT_ELEMENT_TOKEN_BUDGET,
+) -> list[dict]:
+    """``describe(index, elem)`` for the most relevant elements that fit in
+    ``max_elements`` and ``token_budget``, in index order."""
+    chosen, used = [], 0
+    for index in page_index(page_state).rank(goal):
+        if len(chosen) >= max_elements:
+            break
+        data = describe(index, page_state.selector_map[index])
+        cost = estimate_tokens(data)
+        if used + cost > token_budget:
+            continue
+        chosen.append(data)
+        used += cost
+    return sorted(chosen, key=lambda d: d["index"])
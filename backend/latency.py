@@ -0,0 +1,56 @@
+"""Fixed-bucket latency histograms for hot paths (e.g. one agent decision).
+
+Counts per upper bound in milliseconds, plus a total, so ``/agent/stats`` can
+show the shape of the distribution without keeping every sample.
+Percentiles are read from the buckets, so a reported p95 is the upper bound
+of the bucket that holds it.
+"""
+
+from bisect import bisect_left
+
+DEFAULT_BUCKETS_MS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+class LatencyHistogram:
+    """Counts of observed latencies per bucket (upper bounds in ms; the last bucket is open)."""
+
+    def __init__(self, buckets_ms: tuple = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect_left(self.buckets_ms, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (``max_ms`` for the open bucket)."""
+        n = self.count
+        if not n:
+            return 0.0
+        rank = q * n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def stats(self) -> dict:
+        n = self.count
+        labels = [f"le_{b}ms" for b in self.buckets_ms] + [f"gt_{self.buckets_ms[-1]}ms"]
+        return {
+            "count": n,
+            "mean_ms": round(self.total_ms / n, 1) if n else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
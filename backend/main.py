@@ -1,16 +1,20 @@
 import asyncio, json, os, uuid, shutil, base64, time, functools
+from urllib.parse import urlparse
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks, UploadFile, Form
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from pathlib import Path
 from backend.smart_browser_controller import SmartBrowserController  # Updated import
-from backend.proxy_manager import SmartProxyManager  # Updated import
-from backend.agent import run_agent
+from backend.proxy_manager import get_shared_proxy_manager
+from backend.agent import find_start_url, run_agent
+from backend.vision_model import get_decision_stats
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from backend.config import WS_BASE_URL, STREAM_SESSION_TIMEOUT_S, EXTRACTION_MAX_CHARS
-from backend.bulk_engine import BulkEngine, BulkJobConfig, extract_dom
-from backend.browser_controller import BrowserController
+from backend.config import WS_BASE_URL, STREAM_SESSION_TIMEOUT_S, EXTRACTION_MAX_CHARS, WARM_POOL_SIZE
+from backend.bulk_engine import BulkEngine, BulkJobConfig, extract_dom, read_results
+from backend.browser_pool import BrowserPool, WarmPool
+from backend.display_manager import display_manager
+from backend.page_readiness import wait_for_ready
 from backend.universal_extractor import MODEL
 
 app = FastAPI()
@@ -28,12 +32,22 @@ tasks = {} # job_id → async.Task
 ws_subscribers = {} # job_id → { websocket, … }
 streaming_sessions = {} # job_id → browser_controller
 job_info = {} # job_id → { format, content_type, extension, prompt }
+job_leases = {} # job_id → leased ProxyInfo (swapped when the job rotates proxies)
 
-# Initialize global smart proxy manager
-smart_proxy_manager = SmartProxyManager()
+# Process-wide smart proxy manager, shared with every agent job and bulk worker
+smart_proxy_manager = get_shared_proxy_manager()
+
+# Shared Chromium pool: bulk workers and /scrape/structured lease contexts from it
+browser_pool = BrowserPool()
+
+# Pre-launched idle contexts so agent jobs and structured scrapes start instantly.
+# They are proxy-less; with proxies configured every job leases one and would
+# miss, so none are kept holding pool slots.
+warm_pool = WarmPool(browser_pool, size=0 if smart_proxy_manager.proxies else WARM_POOL_SIZE,
+                     controller_cls=SmartBrowserController)
 
 # Initialize bulk engine
-bulk_engine = BulkEngine(proxy_manager=smart_proxy_manager)
+bulk_engine = BulkEngine(proxy_manager=smart_proxy_manager, browser_pool=browser_pool)
 
 OUTPUT_DIR = Path("outputs")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -49,6 +63,16 @@ async def store_job_info(job_id: str, info: dict):
     job_info[job_id] = info
     print(f"📊 Stored job info for {job_id}: {info}")
 
+async def _run_job(job_id: str, req: JobRequest):
+    """The agent task. The proxy lease is taken here, not in the handler, so POST /job
+    never waits (up to PROXY_LEASE_TIMEOUT_S) for a free proxy before returning."""
+    # Leased for the job's lifetime, picked for the site it starts on
+    job_leases[job_id] = await smart_proxy_manager.acquire_proxy(domain=urlparse(find_start_url(req.prompt)).netloc)
+    proxy_info = job_leases[job_id]
+    print(f"🔄 Selected proxy for {job_id}: {proxy_info.server if proxy_info else 'None'}")
+    await run_agent(job_id, req.prompt, req.format, req.headless, proxy_info, req.enable_streaming,
+                    on_lease_change=functools.partial(job_leases.__setitem__, job_id))
+
 @app.post("/job")
 async def create_job(req: JobRequest):
     # Validate format
@@ -59,24 +83,19 @@ async def create_job(req: JobRequest):
     
     job_id = str(uuid.uuid4())
     
-    # Use smart proxy manager to get the best available proxy
-    proxy_info = smart_proxy_manager.get_best_proxy()
-    proxy = proxy_info.to_playwright_dict() if proxy_info else None
-    
     print(f"🚀 Creating smart job {job_id}")
     print(f"📋 Goal: {req.prompt}")
     print(f"🌐 Format: {req.format}")
     print(f"🖥️ Headless: {req.headless}")
     print(f"📡 Streaming: {req.enable_streaming}")
-    print(f"🔄 Selected proxy: {proxy.get('server', 'None') if proxy else 'None'}")
     
     # Get initial proxy stats
     proxy_stats = smart_proxy_manager.get_proxy_stats()
     print(f"📊 Proxy pool stats: {proxy_stats}")
     
-    # Create the agent task
-    coro = run_agent(job_id, req.prompt, req.format, req.headless, proxy, req.enable_streaming)
-    tasks[job_id] = asyncio.create_task(coro)
+    # Create the agent task; it leases its proxy, the done-callback gives back whichever it holds last
+    tasks[job_id] = asyncio.create_task(_run_job(job_id, req))
+    tasks[job_id].add_done_callback(lambda _: smart_proxy_manager.release_proxy(job_leases.pop(job_id, None)))
     
     response = {
         "job_id": job_id, 
@@ -323,12 +342,21 @@ def get_proxy_stats():
         "timestamp": time.time()
     }
 
+@app.get("/browser-pool/stats")
+def get_browser_pool_stats():
+    """Chromium pool occupancy, warm-pool hit rate / time-to-first-navigation, Xvfb screens."""
+    return {"pool": browser_pool.stats(), "warm": warm_pool.stats(), "displays": display_manager.stats()}
+
+@app.get("/agent/stats")
+def get_agent_stats():
+    """Latency histograms of agent decisions (model call and whole decision)."""
+    return {"decision_latency": get_decision_stats(), "timestamp": time.time()}
+
 @app.post("/proxy/reload")
 def reload_proxies():
     """Reload proxy list from environment"""
     try:
-        global smart_proxy_manager
-        smart_proxy_manager = SmartProxyManager()
+        smart_proxy_manager.reload_proxies()
         stats = smart_proxy_manager.get_proxy_stats()
         return {
             "success": True,
@@ -354,6 +382,9 @@ class BulkJobRequest(BaseModel):
     rotation_interval: int = 10
     use_ai_extraction: bool = False
     block_resources: bool = True
+    retry_backoff_s: float = 2.0
+    retry_backoff_max_s: float = 60.0
+    retry_jitter: float = 0.5
 
 
 @app.post("/bulk")
@@ -369,6 +400,9 @@ async def create_bulk_job(req: BulkJobRequest):
         rotation_interval=req.rotation_interval,
         use_ai_extraction=req.use_ai_extraction,
         block_resources=req.block_resources,
+        retry_backoff_s=req.retry_backoff_s,
+        retry_backoff_max_s=req.retry_backoff_max_s,
+        retry_jitter=req.retry_jitter,
     )
     state = await bulk_engine.create_job(config)
     bulk_engine.set_broadcast(broadcast)
@@ -386,19 +420,34 @@ async def create_bulk_job(req: BulkJobRequest):
 
 
 @app.get("/bulk/{job_id}")
-def get_bulk_progress(job_id: str):
+def get_bulk_progress(job_id: str, offset: int = 0, limit: int | None = None):
+    """Job progress (O(1) counters) plus per-URL task status — all of it, or one
+    page of it when ``limit`` is given."""
     state = bulk_engine.get_job(job_id)
     if not state:
         return {"error": "Job not found"}
+    offset = max(offset, 0)
+    page = state.tasks[offset:] if limit is None else state.tasks[offset: offset + max(limit, 0)]
     return {
         **state.progress,
+        "tasks_offset": offset,
         "tasks": [
             {"url": t.url, "status": t.status.value, "error": t.error, "attempts": t.attempts}
-            for t in state.tasks
+            for t in page
         ],
     }
 
 
+@app.get("/bulk/{job_id}/results")
+def get_bulk_results(job_id: str, offset: int = 0, limit: int = 100):
+    """Tail the job's result JSONL: records from byte ``offset``, plus where to resume."""
+    path = bulk_engine.results_path(job_id)
+    if not path.exists():
+        return {"error": "Job not found"}
+    records, next_offset = read_results(path, max(offset, 0), max(min(limit, 1000), 0))
+    return {"results": records, "offset": offset, "next_offset": next_offset}
+
+
 @app.delete("/bulk/{job_id}")
 def cancel_bulk_job(job_id: str):
     if bulk_engine.cancel_job(job_id):
@@ -418,13 +467,16 @@ async def resume_bulk_job(job_id: str):
 # ── Structured scrape: URLs -> JSON rows for the generative dashboard ─────────
 # Synchronous (awaits and returns rows in the response — not the async job/WS
 # flow). Reuses extract_dom (HTML cleaning) + the configured Gemini MODEL with an
-# array-aware parser, since neither existing path returns row-records. Ghost Mode
-# is on via BrowserController.__aenter__. One bad URL is reported, never fatal.
+# array-aware parser, since neither existing path returns row-records. Each request
+# takes a pre-warmed Ghost Mode context from the warm pool rather than launching
+# its own Chromium. One bad URL is reported, never fatal.
 
 class StructuredScrapeRequest(BaseModel):
     urls: list[str]
     prompt: str
     max_rows: int | None = None
+    # Requests with the same session_id keep the same proxy per site (e.g. logged-in flows)
+    session_id: str | None = None
 
 
 _STRUCTURED_ROWS_PROMPT = (
@@ -455,7 +507,7 @@ def _parse_rows(raw: str) -> list:
 async def _scrape_one_structured(bc, url: str, prompt: str) -> list:
     """Scrape one URL into a list of flat record dicts (reuses extract_dom + Gemini)."""
     await bc.page.goto(url, wait_until="domcontentloaded", timeout=45000)
-    await bc.page.wait_for_timeout(1500)
+    await wait_for_ready(bc.page, max_wait_s=1.5)
     title = await bc.page.title()
     html = await bc.page.content()
     cleaned = extract_dom(html, url, title)
@@ -485,16 +537,18 @@ async def scrape_structured(req: StructuredScrapeRequest):
     if not urls:
         return {"success": False, "rows": [], "source": [], "error": "No URLs provided."}
 
-    proxy_info = smart_proxy_manager.get_best_proxy()
+    # No background task to wait in here, so never queue for a slot: when every
+    # proxy is at its limit, share the least-loaded one (counted as overcommitted)
+    proxy_info = await smart_proxy_manager.acquire_proxy(domain=urlparse(urls[0]).netloc, sticky_key=req.session_id,
+                                                         timeout_s=0)
     proxy = proxy_info.to_playwright_dict() if proxy_info else None
     proxy_country = proxy_info.location if proxy_info else None
 
     rows: list = []
     errors: list = []
-    bc = BrowserController(headless=False, proxy=proxy,
-                           proxy_country=proxy_country, block_resources=True)
+    bc = None
     try:
-        await bc.__aenter__()
+        bc = await warm_pool.acquire(proxy=proxy, proxy_country=proxy_country, block_resources=True)
         for url in urls:
             try:
                 rows.extend(await _scrape_one_structured(bc, url, req.prompt))
@@ -507,10 +561,9 @@ async def scrape_structured(req: StructuredScrapeRequest):
     except Exception as e:
         return {"success": False, "rows": [], "source": urls, "error": f"Browser error: {e}"}
     finally:
-        try:
-            await bc.__aexit__(None, None, None)
-        except Exception:
-            pass
+        if bc is not None:
+            await warm_pool.release(bc)
+        smart_proxy_manager.release_proxy(proxy_info)
 
     return {
         "success": bool(rows),
@@ -564,6 +617,13 @@ async def register_streaming_session(job_id: str, browser_ctrl):
         "streaming": stream_info
     })
 
+@app.on_event("startup")
+async def prewarm_browsers():
+    """Start filling the warm pool in the background; the app doesn't wait for it."""
+    await warm_pool.start()
+    smart_proxy_manager.start_health_checks()
+    smart_proxy_manager.start_stats_flush()
+
 # Cleanup on shutdown
 @app.on_event("shutdown")
 async def cleanup():
@@ -580,6 +640,12 @@ async def cleanup():
     
     streaming_sessions.clear()
     job_info.clear()
+
+    await smart_proxy_manager.stop_health_checks()
+    await smart_proxy_manager.stop_stats_flush()
+    await warm_pool.close()
+    await browser_pool.close()
+    await display_manager.close()
     
     # Print final proxy stats
     final_stats = smart_proxy_manager.get_proxy_stats()
@@ -0,0 +1,158 @@
+"""Event-driven page readiness: wait for quiet, not for a fixed time.
+
+Navigation, clicks and scrolls used to sleep a fixed ``*_SETTLE_S`` after every
+action: fast pages wasted the whole sleep and slow ones could still be mid-load.
+``wait_for_ready`` returns as soon as the page is quiet:
+
+- network: no more than ``READY_MAX_INFLIGHT`` requests in flight for
+  ``network_quiet_s`` (Playwright request events, counted from
+  ``track_network`` so requests the action started before the wait count too)
+- DOM: no mutations for ``dom_quiet_s`` and ``readyState`` past "loading"
+  (a MutationObserver installed in the page on first use)
+
+``max_wait_s`` is a hard cap; callers pass the settle time they used to sleep,
+so a page that never goes quiet (tickers, long polling) costs no more than before.
+"""
+
+import asyncio
+import time
+import weakref
+from dataclasses import dataclass
+
+from backend.config import READY_DOM_QUIET_S, READY_MAX_INFLIGHT, READY_NETWORK_QUIET_S
+
+# Resolves true once the DOM has been quiet for quietMs, false at maxMs. The
+# observer is kept on a non-enumerable property so later waits on the same
+# document reuse its last-mutation time.
+_DOM_QUIET_JS = """
+async ({quietMs, maxMs}) => {
+  const key = Symbol.for('browserpilot.readiness');
+  let state = window[key];
+  if (!state) {
+    state = {last: performance.now()};
+    new MutationObserver(() => { state.last = performance.now(); })
+      .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    Object.defineProperty(window, key, {value: state, enumerable: false});
+  }
+  const start = performance.now();
+  for (;;) {
+    const now = performance.now();
+    if (document.readyState !== 'loading' && now - state.last >= quietMs) return true;
+    if (now - start >= maxMs) return false;
+    await new Promise(r => setTimeout(r, Math.max(10, Math.min(50, quietMs - (now - state.last)))));
+  }
+}
+"""
+
+
+@dataclass(frozen=True)
+class Readiness:
+    waited_s: float
+    timed_out: bool
+
+
+class _NetworkTracker:
+    """In-flight requests of a page, from Playwright's request events."""
+
+    _EVENTS = ("request", "requestfinished", "requestfailed")
+
+    def __init__(self, page):
+        self.page = page
+        self.inflight: set = set()
+        self.last_activity = time.monotonic()
+        self.changed = asyncio.Event()
+        for event, handler in zip(self._EVENTS, (self._started, self._done, self._done)):
+            page.on(event, handler)
+
+    def _started(self, request):
+        self.inflight.add(request)
+        self._touch()
+
+    def _done(self, request):
+        self.inflight.discard(request)
+        self._touch()
+
+    def _touch(self):
+        self.last_activity = time.monotonic()
+        self.changed.set()
+
+    def quiet_in(self, quiet_s: float) -> float | None:
+        """Seconds until the network counts as quiet if nothing else happens; None while busy."""
+        if len(self.inflight) > READY_MAX_INFLIGHT:
+            return None
+        return max(0.0, self.last_activity + quiet_s - time.monotonic())
+
+    async def wait_for_change(self, timeout_s: float):
+        self.changed.clear()
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout_s)
+        except asyncio.TimeoutError:
+            pass
+
+    def detach(self):
+        for event, handler in zip(self._EVENTS, (self._started, self._done, self._done)):
+            self.page.remove_listener(event, handler)
+
+
+_trackers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def track_network(page) -> _NetworkTracker:
+    """Count ``page``'s requests from now on, for every later ``wait_for_ready`` on it.
+
+    Call when the page is opened: a tracker attached by the wait itself only
+    sees requests that start after it, so a slow XHR fired by the click just
+    before would look like a quiet network.
+    """
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = _NetworkTracker(page)
+    return tracker
+
+
+async def wait_for_ready(
+    page,
+    max_wait_s: float,
+    network_quiet_s: float = READY_NETWORK_QUIET_S,
+    dom_quiet_s: float = READY_DOM_QUIET_S,
+) -> Readiness:
+    """Wait until ``page`` is network- and DOM-quiet, at most ``max_wait_s``.
+
+    Uses the page's ``track_network`` tracker; an untracked page gets one for
+    the length of this wait only.
+    """
+    start = time.monotonic()
+    deadline = start + max_wait_s
+    tracker = _trackers.get(page)
+    owned = tracker is None
+    if owned:
+        tracker = _NetworkTracker(page)
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return Readiness(time.monotonic() - start, True)
+            pending = tracker.quiet_in(network_quiet_s)
+            if pending is None:
+                await tracker.wait_for_change(remaining)
+                continue
+            if pending > 0:
+                await asyncio.sleep(min(pending, remaining))
+                continue
+            try:
+                dom_quiet = await page.evaluate(
+                    _DOM_QUIET_JS, {"quietMs": dom_quiet_s * 1000, "maxMs": remaining * 1000}
+                )
+            except Exception:
+                # The document was replaced mid-wait (navigation); watch the new one
+                if page.is_closed():
+                    return Readiness(time.monotonic() - start, False)
+                await asyncio.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+                continue
+            if not dom_quiet:
+                return Readiness(time.monotonic() - start, True)
+            if tracker.quiet_in(network_quiet_s) == 0:
+                return Readiness(time.monotonic() - start, False)
+    finally:
+        if owned:
+            tracker.detach()
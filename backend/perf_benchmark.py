@@ -0,0 +1,394 @@
+"""Performance micro-benchmarks for BrowserPilot internals.
+
+Unlike ``backend.benchmark`` (which drives a real browser against public
+bot-detection sites), these benchmarks exercise the engine's own scheduling and
+bookkeeping with simulated page loads, so they run in seconds, need no browser
+or network, and give numbers that are comparable across commits.
+
+Usage:
+    python -m backend.perf_benchmark scheduler                # grouped URL list, FIFO vs interleaved
+    python -m backend.perf_benchmark scheduler --domains 8 --per-domain 10 --workers 4
+    python -m backend.perf_benchmark queue                    # requeue cost + URLTask memory
+    python -m backend.perf_benchmark progress                 # per-emit progress cost vs job size
+    python -m backend.perf_benchmark proxies                  # proxy selection + lookup vs pool size
+    python -m backend.perf_benchmark bandit                   # global ranking vs per-domain Thompson picks
+
+The simulation helpers are pure asyncio and import-safe so they can be
+unit-tested; nothing here launches Chromium.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Optional
+
+from backend.bulk_engine import (
+    BulkJobConfig, BulkJobState, DomainThrottle, TaskQueue, URLStatus, URLTask,
+)
+from backend.proxy_manager import ProxyHealth, ProxyInfo, SmartProxyManager
+
+
+# ── Shared helpers ───────────────────────────────────────────────────────────
+
+def grouped_urls(domains: int, per_domain: int) -> list[str]:
+    """Build a URL list grouped by domain, the way bulk jobs are usually submitted."""
+    return [
+        f"https://site{d}.example/page/{p}"
+        for d in range(domains)
+        for p in range(per_domain)
+    ]
+
+
+def format_report(title: str, rows: list[dict[str, Any]]) -> str:
+    """Render benchmark rows as a fixed-width table. Pure — safe to snapshot in tests."""
+    if not rows:
+        return title
+    cols = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in cols}
+    header = "  ".join(c.ljust(widths[c]) for c in cols).rstrip()
+    line = "-" * len(header)
+    body = ["  ".join(str(r[c]).ljust(widths[c]) for c in cols).rstrip() for r in rows]
+    return "\n".join([title, line, header, line, *body, line])
+
+
+# ── Scheduler: FIFO dispatch vs domain interleaving ─────────────────────────
+
+class _ListOrderQueue:
+    """The original dispatcher: list order, and requeue rewinds a shared index."""
+
+    def __init__(self, tasks: list[URLTask]):
+        self._tasks = tasks
+        self._index = 0
+        self._lock = asyncio.Lock()
+
+    async def next(self, worker_id: int) -> Optional[URLTask]:
+        async with self._lock:
+            while self._index < len(self._tasks):
+                task = self._tasks[self._index]
+                self._index += 1
+                if task.status == URLStatus.PENDING:
+                    task.status = URLStatus.IN_PROGRESS
+                    task.worker_id = worker_id
+                    return task
+            return None
+
+    async def requeue(self, task: URLTask) -> None:
+        async with self._lock:
+            task.status = URLStatus.PENDING
+            task.worker_id = None
+            self._index = min(self._index, self._tasks.index(task))
+
+
+async def simulate_scheduler(
+    urls: list[str], interleave: bool, workers: int = 3,
+    delay_s: float = 0.2, page_s: float = 0.05,
+) -> dict[str, Any]:
+    """Run ``workers`` simulated workers over ``urls`` and measure throughput.
+
+    Each page "load" is an ``asyncio.sleep(page_s)``; the per-domain politeness
+    delay is enforced by a real ``DomainThrottle``.
+    """
+    tasks = [URLTask(url=u) for u in urls]
+    throttle = DomainThrottle(default_delay=delay_s)
+    queue: Any = TaskQueue(tasks, throttle=throttle) if interleave else _ListOrderQueue(tasks)
+
+    async def worker(worker_id: int) -> None:
+        while True:
+            task = await queue.next(worker_id)
+            if task is None:
+                return
+            if not interleave:
+                await throttle.wait(task.url)
+            await asyncio.sleep(page_s)
+            task.status = URLStatus.DONE
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(workers)))
+    elapsed = time.perf_counter() - start
+    return {
+        "scheduler": "interleaved" if interleave else "fifo",
+        "pages": len(tasks),
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_min": round(len(tasks) / max(elapsed / 60, 1e-9), 1),
+    }
+
+
+async def bench_scheduler(domains: int, per_domain: int, workers: int,
+                          delay_s: float, page_s: float) -> list[dict[str, Any]]:
+    urls = grouped_urls(domains, per_domain)
+    return [
+        await simulate_scheduler(urls, interleave=False, workers=workers, delay_s=delay_s, page_s=page_s),
+        await simulate_scheduler(urls, interleave=True, workers=workers, delay_s=delay_s, page_s=page_s),
+    ]
+
+
+# ── Queue: requeue-heavy dispatch cost and per-task memory ──────────────────
+
+async def drain_with_retries(queue: Any, retry_every: int) -> float:
+    """Drain ``queue`` on one worker, requeueing every ``retry_every``-th task once.
+
+    Returns wall-clock seconds. No throttle and no simulated page load, so the
+    figure is pure dispatcher overhead.
+    """
+    retried: set[int] = set()
+    n = 0
+    start = time.perf_counter()
+    while True:
+        task = await queue.next(0)
+        if task is None:
+            break
+        n += 1
+        if n % retry_every == 0 and id(task) not in retried:
+            retried.add(id(task))
+            await queue.requeue(task)
+        else:
+            task.status = URLStatus.DONE
+    return time.perf_counter() - start
+
+
+def task_bytes(n: int) -> float:
+    """Average traced allocation per ``URLTask`` (object only, URL string excluded)."""
+    import tracemalloc
+
+    urls = [f"https://site{i % 50}.example/p/{i}" for i in range(n)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [URLTask(url=u) for u in urls]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del tasks
+    return total / n
+
+
+async def bench_queue(sizes: list[int], retry_every: int) -> list[dict[str, Any]]:
+    rows = []
+    for n in sizes:
+        urls = [f"https://site{i % 50}.example/p/{i}" for i in range(n)]
+        old = await drain_with_retries(_ListOrderQueue([URLTask(url=u) for u in urls]), retry_every)
+        new = await drain_with_retries(TaskQueue([URLTask(url=u) for u in urls]), retry_every)
+        rows.append({
+            "tasks": n,
+            "list_index_s": round(old, 3),
+            "lanes_s": round(new, 3),
+            "speedup": f"{old / max(new, 1e-9):.1f}x",
+        })
+    return rows
+
+
+# ── Progress: per-emit cost as job size grows ──────────────────────────────
+
+def _scan_progress(state: BulkJobState) -> dict[str, int]:
+    """The original progress computation: one full walk of the task list per counter."""
+    return {
+        "done": sum(1 for t in state.tasks if t.status == URLStatus.DONE),
+        "failed": sum(1 for t in state.tasks if t.status == URLStatus.FAILED),
+        "pending": sum(1 for t in state.tasks if t.status in (URLStatus.PENDING, URLStatus.IN_PROGRESS)),
+    }
+
+
+def time_progress(n_tasks: int, emits: int = 200) -> dict[str, Any]:
+    """Microseconds per progress snapshot for a half-finished job of ``n_tasks`` URLs."""
+    urls = [f"https://site{i % 50}.example/p/{i}" for i in range(n_tasks)]
+    state = BulkJobState(job_id="bench", config=BulkJobConfig(urls=urls, prompt=""),
+                         tasks=[URLTask(url=u) for u in urls])
+    state.started_at = time.time()
+    for task in state.tasks[: n_tasks // 2]:
+        state.transition(task, URLStatus.DONE)
+
+    start = time.perf_counter()
+    for _ in range(emits):
+        _scan_progress(state)
+    scan = (time.perf_counter() - start) / emits
+
+    start = time.perf_counter()
+    for _ in range(emits):
+        _ = {"type": "bulk_progress", **state.progress}
+    counters = (time.perf_counter() - start) / emits
+    return {
+        "tasks": n_tasks,
+        "scan_us": round(scan * 1e6, 1),
+        "counters_us": round(counters * 1e6, 2),
+    }
+
+
+# ── Proxies: per-navigation selection and lookup cost vs pool size ──────────
+
+def _sorted_best(manager: SmartProxyManager, exclude_blocked_for: Optional[str] = None) -> Optional[ProxyInfo]:
+    """The original get_best_proxy: filter the whole pool, then sort it."""
+    available = [
+        p for p in manager.proxies
+        if p.health != ProxyHealth.FAILED
+        and p.consecutive_failures < manager.max_consecutive_failures
+        and (not exclude_blocked_for or exclude_blocked_for not in p.blocked_sites)
+    ]
+    if not available:
+        return None
+    return sorted(available, key=lambda p: (p.success_rate, -p.response_time, -p.last_used), reverse=True)[0]
+
+
+def _scan_lookup(manager: SmartProxyManager, proxy: dict) -> Optional[ProxyInfo]:
+    """The original current-proxy lookup in SmartBrowserController."""
+    return next((p for p in manager.proxies if p.to_playwright_dict() == proxy), None)
+
+
+def _navigate(manager: SmartProxyManager, select: Any, lookup: Any, i: int) -> None:
+    """One simulated navigation: pick a proxy, find it again by dict, record the outcome."""
+    domain = f"site{i % 20}.example"
+    proxy = select(manager, domain)
+    if proxy is None:
+        return
+    info = lookup(manager, proxy.to_playwright_dict())
+    if i % 7 == 0:
+        manager.mark_proxy_failure(info, domain, "cloudflare" if i % 21 == 0 else None)
+    else:
+        manager.mark_proxy_success(info, response_time=(i % 13) / 10)
+
+
+def time_proxy_selection(n_proxies: int, navigations: int = 300) -> dict[str, Any]:
+    """Microseconds per navigation with ``n_proxies`` proxies: full sort + scan vs the index."""
+    def pool() -> list[ProxyInfo]:
+        return [ProxyInfo(server=f"10.0.{i // 250}.{i % 250}:8080", username=f"u{i}") for i in range(n_proxies)]
+
+    old = SmartProxyManager(proxies=pool())
+    for p in old.proxies:
+        object.__setattr__(p, "_on_change", None)  # the original had no index to notify
+    start = time.perf_counter()
+    for i in range(navigations):
+        _navigate(old, lambda m, d: _sorted_best(m, d), _scan_lookup, i)
+    scan = (time.perf_counter() - start) / navigations
+
+    new = SmartProxyManager(proxies=pool())
+    start = time.perf_counter()
+    for i in range(navigations):
+        _navigate(new, lambda m, d: m.get_best_proxy(exclude_blocked_for=d), SmartProxyManager.find_proxy, i)
+    indexed = (time.perf_counter() - start) / navigations
+    return {
+        "proxies": n_proxies,
+        "sort_scan_us": round(scan * 1e6, 1),
+        "indexed_us": round(indexed * 1e6, 1),
+        "speedup": f"{scan / max(indexed, 1e-9):.1f}x",
+    }
+
+
+# ── Bandit: how fast proxy picks converge per target domain ─────────────────
+
+def simulate_proxy_picks(policy: str, n_proxies: int = 30, domains: int = 5,
+                         navigations: int = 1500, seed: int = 7) -> dict[str, Any]:
+    """Simulate ``navigations`` picks over a pool whose quality differs per domain.
+
+    Every (proxy, domain) pair gets a hidden success probability and latency;
+    a third of the pairs are bans (reported as a Cloudflare block). ``policy``
+    is ``"global"`` (the original lifetime-success-rate ranking) or
+    ``"bandit"`` (get_best_proxy with the domain). Every attempt costs its
+    latency, so ``ok_per_min`` is the throughput a worker would see. Figures
+    cover the second half, after the learning phase.
+    """
+    rng = random.Random(seed)
+    quality = {
+        (p, d): (0.0 if rng.random() < 0.33 else rng.uniform(0.5, 1.0), rng.uniform(0.3, 4.0))
+        for p in range(n_proxies) for d in range(domains)
+    }
+    proxies = [ProxyInfo(server=f"10.1.0.{p}:8080") for p in range(n_proxies)]
+    index = {id(p): i for i, p in enumerate(proxies)}
+    manager = SmartProxyManager(proxies=proxies)
+    manager.scorer._rng = random.Random(seed)
+    outcomes = random.Random(seed + 1)
+
+    ok = counted = 0
+    spent_s = 0.0
+    for i in range(navigations):
+        d = i % domains
+        domain = f"site{d}.example"
+        if policy == "global":
+            proxy = _sorted_best(manager, domain)
+        else:
+            proxy = manager.get_best_proxy(exclude_blocked_for=domain)
+        if proxy is None:
+            continue
+        success_p, latency = quality[(index[id(proxy)], d)]
+        success = outcomes.random() < success_p
+        if success:
+            manager.mark_proxy_success(proxy, response_time=latency, domain=domain)
+        else:
+            manager.mark_proxy_failure(proxy, domain, "cloudflare" if success_p == 0 else None)
+        if i >= navigations // 2:
+            counted += 1
+            ok += success
+            spent_s += latency
+    return {
+        "policy": policy,
+        "success_rate": round(ok / max(counted, 1), 3),
+        "ok_per_min": round(ok / max(spent_s / 60, 1e-9), 1),
+    }
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="python -m backend.perf_benchmark",
+        description="Browser-free performance micro-benchmarks for BrowserPilot internals.",
+    )
+    sub = p.add_subparsers(dest="bench", required=True)
+
+    s = sub.add_parser("scheduler", help="Bulk task dispatch on a domain-grouped URL list")
+    s.add_argument("--domains", type=int, default=5)
+    s.add_argument("--per-domain", type=int, default=6)
+    s.add_argument("--workers", type=int, default=3)
+    s.add_argument("--delay", type=float, default=0.2, help="Per-domain delay (s)")
+    s.add_argument("--page", type=float, default=0.05, help="Simulated page load (s)")
+
+    q = sub.add_parser("queue", help="Requeue-heavy dispatch cost and URLTask memory")
+    q.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000])
+    q.add_argument("--retry-every", type=int, default=5, help="Requeue every Nth dispatched task once")
+
+    pr = sub.add_parser("progress", help="Per-emit progress cost as job size grows")
+    pr.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    pr.add_argument("--emits", type=int, default=200)
+
+    px = sub.add_parser("proxies", help="Per-navigation proxy selection + lookup cost as the pool grows")
+    px.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    px.add_argument("--navigations", type=int, default=300)
+
+    b = sub.add_parser("bandit", help="Simulated pick quality: global ranking vs per-domain Thompson sampling")
+    b.add_argument("--proxies", type=int, default=30)
+    b.add_argument("--domains", type=int, default=5)
+    b.add_argument("--navigations", type=int, default=1500)
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.bench == "scheduler":
+        rows = asyncio.run(bench_scheduler(args.domains, args.per_domain, args.workers,
+                                           args.delay, args.page))
+        print(format_report(
+            f"Bulk scheduler — {args.domains} domains x {args.per_domain} URLs, "
+            f"{args.workers} workers, {args.delay}s/domain", rows))
+    elif args.bench == "queue":
+        rows = asyncio.run(bench_queue(args.sizes, args.retry_every))
+        print(format_report(f"Task queue — requeue every {args.retry_every}th task once", rows))
+        print(f"\nURLTask size: {task_bytes(10000):.0f} bytes/task (excluding the URL string)")
+    elif args.bench == "progress":
+        rows = [time_progress(n, args.emits) for n in args.sizes]
+        print(format_report("Bulk progress snapshot — cost per emit", rows))
+    elif args.bench == "proxies":
+        logging.getLogger("backend.proxy_manager").setLevel(logging.ERROR)  # quiet the simulated blocks
+        rows = [time_proxy_selection(n, args.navigations) for n in args.sizes]
+        print(format_report("Proxy selection — cost per navigation", rows))
+    elif args.bench == "bandit":
+        logging.getLogger("backend.proxy_manager").setLevel(logging.ERROR)
+        rows = [simulate_proxy_picks(policy, args.proxies, args.domains, args.navigations)
+                for policy in ("global", "bandit")]
+        print(format_report(
+            f"Proxy picks — {args.proxies} proxies x {args.domains} domains, "
+            f"second half of {args.navigations} navigations", rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
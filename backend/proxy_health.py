@@ -0,0 +1,68 @@
+"""Active proxy health probes.
+
+Without probes a proxy is only found dead when a real job fails on it, after a
+full navigation timeout. ``probe_proxy`` fetches a small endpoint through the
+proxy instead: an HTTPS endpoint makes the proxy open a CONNECT tunnel (the
+same path Chromium uses), a plain HTTP one is forwarded. It returns the
+latency, or raises ``ProbeError``.
+
+``SmartProxyManager.start_health_checks`` runs these on an interval for the
+whole pool; see ``PROXY_HEALTH_CHECK_*`` in config.py.
+"""
+
+import time
+from urllib.parse import quote, urlparse
+
+import aiohttp
+
+from backend.config import PROXY_HEALTH_CHECK_TIMEOUT_S, PROXY_HEALTH_CHECK_URL
+
+_PROBE_SCHEMES = ("http", "https")
+
+
+class ProbeError(Exception):
+    """The proxy could not fetch the probe URL (refused, timed out, auth, bad status)."""
+
+
+def can_probe(proxy) -> bool:
+    """SOCKS proxies aren't supported by the HTTP client; they are left to real traffic."""
+    return urlparse(proxy.to_playwright_dict()["server"]).scheme in _PROBE_SCHEMES
+
+
+async def probe_proxy(
+    proxy,
+    url: str = PROXY_HEALTH_CHECK_URL,
+    timeout_s: float = PROXY_HEALTH_CHECK_TIMEOUT_S,
+    session: aiohttp.ClientSession | None = None,
+) -> float:
+    """Fetch ``url`` through ``proxy`` (a ProxyInfo); returns seconds taken."""
+    if not can_probe(proxy):
+        raise ProbeError(f"cannot probe {proxy.server}: unsupported scheme")
+    server = proxy.to_playwright_dict()["server"]
+    if proxy.username:
+        # credentials in the URL are sent on CONNECT and on forwarded requests alike
+        parts = urlparse(server)
+        creds = f"{quote(proxy.username, safe='')}:{quote(proxy.password or '', safe='')}"
+        server = parts._replace(netloc=f"{creds}@{parts.netloc}").geturl()
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession()
+    start = time.perf_counter()
+    try:
+        async with session.get(
+            url,
+            proxy=server,
+            timeout=aiohttp.ClientTimeout(total=timeout_s),
+            allow_redirects=False,
+        ) as resp:
+            await resp.read()
+            if resp.status >= 400:
+                raise ProbeError(f"probe through {proxy.server} returned HTTP {resp.status}")
+    except ProbeError:
+        raise
+    except Exception as e:
+        raise ProbeError(f"probe through {proxy.server} failed: {e.__class__.__name__}: {e}") from e
+    finally:
+        if own_session:
+            await session.close()
+    return time.perf_counter() - start
@@ -1,9 +1,26 @@
 import os, json, random, time, asyncio, logging
+from collections import OrderedDict
+from bisect import bisect_left, insort
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from urllib.parse import urlparse
 import base64
 
+import aiohttp
+
+from backend.antibot_classifier import Verdict, classify_live_page
+from backend.config import (
+    PROXY_SCORE_EXPLORE, PROXY_HEALTH_CHECK_INTERVAL_S, PROXY_HEALTH_CHECK_URL,
+    PROXY_HEALTH_CHECK_TIMEOUT_S, PROXY_HEALTH_CHECK_CONCURRENCY, PROXY_FAILED_COOLDOWN_S,
+    PROXY_STATS_DB, PROXY_STATS_FLUSH_INTERVAL_S,
+    PROXY_MAX_CONCURRENT, PROXY_LEASE_TIMEOUT_S, PROXY_STICKY_TTL_S,
+)
+from backend.proxy_health import ProbeError, can_probe, probe_proxy
+from backend.proxy_scoring import ArmStats, ProxyScorer
+from backend.proxy_store import PROXY_FIELDS, ProxyStore
+from backend.verdict_cache import VerdictCache, perceptual_hash
+
 logger = logging.getLogger(__name__)
 
 class ProxyHealth(Enum):
@@ -12,6 +29,11 @@ class ProxyHealth(Enum):
     BLOCKED = "blocked"
     FAILED = "failed"
 
+# ProxyInfo fields that decide availability or ranking in get_best_proxy
+_RANKING_FIELDS = frozenset({
+    "health", "success_count", "failure_count", "last_used", "response_time", "consecutive_failures",
+})
+
 @dataclass
 class ProxyInfo:
     server: str
@@ -25,11 +47,28 @@ class ProxyInfo:
     blocked_sites: set = None
     response_time: float = 0
     consecutive_failures: int = 0
+    failed_at: float = 0
+    last_probed: float = 0
+    probe_latency: float = 0
+    probe_failures: int = 0
     
     def __post_init__(self):
         if self.blocked_sites is None:
             self.blocked_sites = set()
     
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        # Let the owning manager re-rank us, however the field was changed
+        if name in _RANKING_FIELDS:
+            on_change = self.__dict__.get("_on_change")
+            if on_change:
+                on_change(self)
+    
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        """(normalized server, username): identifies the proxy behind a Playwright proxy dict"""
+        return self.to_playwright_dict()["server"], self.username
+    
     @property
     def success_rate(self) -> float:
         total = self.success_count + self.failure_count
@@ -66,14 +105,41 @@ def get_locale_for_country(country_code: str) -> tuple:
     return _COUNTRY_LOCALE_MAP.get(code, ("en-US", "America/New_York"))
 
 class SmartProxyManager:
-    def __init__(self, vision_model=None):
+    # One instance is shared by every job in the process (get_shared_proxy_manager).
+    # State is only changed by synchronous code on the event loop, so concurrent
+    # jobs never see a half-applied update and no lock is needed; the only work
+    # handed to a thread (the SQLite flush) gets a snapshot.
+
+    def __init__(self, vision_model=None, proxies: Optional[List[ProxyInfo]] = None,
+                 store: Optional[ProxyStore] = None):
         self.proxies: List[ProxyInfo] = []
         self.current_proxy_index = 0
         self.vision_model = vision_model
         self.max_proxy_retries = 5
         self.max_consecutive_failures = 3
+        # navigations checked by detect_anti_bot, and how each was decided
+        self.anti_bot_counts = {"navigations": 0, "heuristic_clean": 0, "heuristic_blocked": 0, "escalated": 0}
+        self.verdict_cache = VerdictCache()
+        self.scorer = ProxyScorer()
+        self._health_task: Optional[asyncio.Task] = None
+        self.health_check_counts = {"rounds": 0, "probed": 0, "failed_probes": 0, "revived": 0}
+        self.store = store
+        self._flush_task: Optional[asyncio.Task] = None
+        self.last_flushed = 0.0
+        # Leases: holders per proxy (by id), and (sticky key, domain) -> (proxy, expires_at)
+        self.max_concurrent_per_proxy = max(1, PROXY_MAX_CONCURRENT)
+        self._leases: Dict[int, int] = {}
+        self._sticky: "OrderedDict[tuple, Tuple[ProxyInfo, float]]" = OrderedDict()
+        self._lease_freed = asyncio.Event()
+        self.lease_counts = {"acquired": 0, "waited": 0, "overcommitted": 0, "sticky_hits": 0}
         
-        self._load_proxies()
+        if proxies is None:
+            self._load_proxies()
+        else:
+            self.proxies = list(proxies)
+        if store is not None:
+            self._restore_stats()
+        self._rebuild_index()
     
     def _load_proxies(self):
         """Load proxies from environment or config"""
@@ -98,86 +164,261 @@ class SmartProxyManager:
         
         logger.info(f"Loaded {len(self.proxies)} proxies for smart rotation")
     
+    def reload_proxies(self):
+        """Re-read SCRAPER_PROXIES in place, keeping what was learned about proxies still listed"""
+        known = {p.key: p for p in self.proxies}
+        self.proxies = []
+        self._load_proxies()
+        self.proxies = [known.get(p.key, p) for p in self.proxies]
+        self._rebuild_index()
+    
+    # ── proxy index ──────────────────────────────────────────────────────────
+    # Available proxies (not FAILED, under the consecutive-failure limit) are kept
+    # sorted best-first, so get_best_proxy walks from the front instead of
+    # filtering and sorting the whole pool per call. ProxyInfo reports ranking
+    # field changes through _on_change; affected entries are re-sorted lazily.
+
+    def _rebuild_index(self):
+        self._order: List[tuple] = []
+        self._entries: Dict[int, tuple] = {}
+        self._positions: Dict[int, int] = {}
+        self._dirty: Dict[int, ProxyInfo] = {}
+        self._by_key: Dict[Tuple[str, Optional[str]], ProxyInfo] = {}
+        for position, proxy in enumerate(self.proxies):
+            object.__setattr__(proxy, "_on_change", self._mark_dirty)
+            self._positions[id(proxy)] = position
+            self._by_key.setdefault(proxy.key, proxy)
+            self._reindex(proxy)
+        self._indexed = (self.proxies, len(self.proxies))
+
+    def _mark_dirty(self, proxy: ProxyInfo):
+        self._dirty[id(proxy)] = proxy
+
+    def _reindex(self, proxy: ProxyInfo):
+        entry = self._entries.pop(id(proxy), None)
+        if entry is not None:
+            del self._order[bisect_left(self._order, entry)]
+        if proxy.health != ProxyHealth.FAILED and proxy.consecutive_failures < self.max_consecutive_failures:
+            # Highest success rate, then fastest, then least recently used; ties keep load order
+            entry = (-proxy.success_rate, proxy.response_time, proxy.last_used, self._positions[id(proxy)], proxy)
+            self._entries[id(proxy)] = entry
+            insort(self._order, entry)
+
+    def _sync_index(self):
+        indexed = getattr(self, "_indexed", None)
+        if indexed is None or indexed[0] is not self.proxies or indexed[1] != len(self.proxies):
+            self._rebuild_index()
+            return
+        while self._dirty:
+            _, proxy = self._dirty.popitem()
+            self._reindex(proxy)
+
+    def _sample_for_domain(self, domain: str, usable=None) -> Optional[ProxyInfo]:
+        """Thompson pick among proxies tried on ``domain`` plus the best few untried ones"""
+        candidates: Dict[int, ProxyInfo] = {}
+        for key in self.scorer.tried(domain):
+            proxy = self._by_key.get(key)
+            if (proxy is not None and id(proxy) in self._entries and domain not in proxy.blocked_sites
+                    and (usable is None or usable(proxy))):
+                candidates[id(proxy)] = proxy
+        explored = 0
+        for entry in self._order:
+            if explored >= PROXY_SCORE_EXPLORE:
+                break
+            proxy = entry[-1]
+            if id(proxy) not in candidates and domain not in proxy.blocked_sites and (usable is None or usable(proxy)):
+                candidates[id(proxy)] = proxy
+                explored += 1
+        if not candidates:
+            return None
+        return max(candidates.values(), key=lambda p: self.scorer.sample(p.key, domain))
+
+    def _record_outcome(self, proxy: ProxyInfo, domain: Optional[str], success: bool, latency_s: float = 0):
+        scorer = getattr(self, "scorer", None)
+        if scorer is not None and domain:
+            scorer.record(proxy.key, domain, success, latency_s or None)
+
+    def find_proxy(self, proxy: Optional[Dict]) -> Optional[ProxyInfo]:
+        """The ProxyInfo behind a Playwright proxy dict (as returned by to_playwright_dict)"""
+        if not proxy:
+            return None
+        self._sync_index()
+        return self._by_key.get((proxy.get("server"), proxy.get("username")))
+
+    def _select(self, domain: Optional[str], usable=None) -> Optional[ProxyInfo]:
+        """Best available proxy not blocked for ``domain`` (and passing ``usable``), or None"""
+        if domain:
+            best = self._sample_for_domain(domain, usable)
+            if best is not None:
+                return best
+        for entry in self._order:
+            proxy = entry[-1]
+            if (not domain or domain not in proxy.blocked_sites) and (usable is None or usable(proxy)):
+                return proxy
+        return None
+
     def get_best_proxy(self, exclude_blocked_for: str = None) -> Optional[ProxyInfo]:
-        """Get the best available proxy based on performance metrics"""
+        """Get the best available proxy based on performance metrics.
+
+        With a domain, picks by Thompson sampling over that domain's decayed
+        (proxy, domain) history; otherwise takes the top of the global ranking.
+        """
         if not self.proxies:
             return None
         
-        # Filter out failed and heavily blocked proxies
-        available_proxies = [
-            p for p in self.proxies 
-            if p.health != ProxyHealth.FAILED and 
-            p.consecutive_failures < self.max_consecutive_failures and
-            (not exclude_blocked_for or exclude_blocked_for not in p.blocked_sites)
-        ]
-        
-        if not available_proxies:
-            # Reset consecutive failures and try again
-            for proxy in self.proxies:
-                proxy.consecutive_failures = 0
-            available_proxies = [p for p in self.proxies if p.health != ProxyHealth.FAILED]
+        self._sync_index()
+        best = self._select(exclude_blocked_for)
+        if best is not None:
+            return best
         
-        if not available_proxies:
+        # Reset consecutive failures and try again
+        for proxy in self.proxies:
+            proxy.consecutive_failures = 0
+        self._sync_index()
+        if not self._order:
             logger.error("No available proxies found!")
             return None
         
-        # Sort by success rate and response time
-        sorted_proxies = sorted(
-            available_proxies,
-            key=lambda p: (p.success_rate, -p.response_time, -p.last_used),
-            reverse=True
-        )
-        
-        return sorted_proxies[0]
+        return self._order[0][-1]
     
-    async def detect_anti_bot_with_vision(self, page, goal: str) -> Tuple[bool, str, Optional[str]]:
+    # ── leases ────────────────────────────────────────────────────────────────
+    # get_best_proxy hands the same top proxy to every caller; jobs and workers
+    # lease instead, so no exit carries more than max_concurrent_per_proxy of them.
+
+    def _has_capacity(self, proxy: ProxyInfo) -> bool:
+        return self._leases.get(id(proxy), 0) < self.max_concurrent_per_proxy
+
+    def _pinned(self, pin: Optional[tuple]) -> Optional[ProxyInfo]:
+        """The live sticky proxy for ``pin``, if it is still usable for its domain"""
+        now = time.time()
+        while self._sticky and next(iter(self._sticky.values()))[1] <= now:
+            self._sticky.popitem(last=False)
+        entry = self._sticky.get(pin) if pin else None
+        if entry is None:
+            return None
+        proxy, domain = entry[0], pin[1]
+        if id(proxy) in self._entries and domain not in proxy.blocked_sites and self._has_capacity(proxy):
+            return proxy
+        return None
+
+    async def acquire_proxy(
+        self,
+        domain: Optional[str] = None,
+        sticky_key: Optional[str] = None,
+        timeout_s: float = PROXY_LEASE_TIMEOUT_S,
+    ) -> Optional[ProxyInfo]:
+        """Lease the best proxy with a free slot (for ``domain``, if given); pair with release_proxy.
+
+        With ``sticky_key``, the same (sticky_key, domain) gets the same proxy
+        again while it stays usable. If every proxy is at its limit this waits
+        up to ``timeout_s`` for a release, then shares the least-loaded one.
+        """
+        if not self.proxies:
+            return None
+        pin = (sticky_key, domain or "") if sticky_key else None
+        deadline = time.monotonic() + timeout_s
+        waited = False
+        while True:
+            self._sync_index()
+            proxy = self._pinned(pin)
+            if proxy is not None:
+                self.lease_counts["sticky_hits"] += 1
+                break
+            proxy = self._select(domain, self._has_capacity)
+            if proxy is not None:
+                break
+            if self._order and not any(self._has_capacity(entry[-1]) for entry in self._order):
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    waited = True
+                    self._lease_freed.clear()
+                    try:
+                        await asyncio.wait_for(self._lease_freed.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                proxy = min(self._order, key=lambda entry: self._leases.get(id(entry[-1]), 0))[-1]
+                self.lease_counts["overcommitted"] += 1
+                logger.warning(f"⚠️ All proxies at {self.max_concurrent_per_proxy} leases; sharing {proxy.server}")
+                break
+            # Free slots only on proxies blocked for the domain, or no proxy available: as get_best_proxy
+            proxy = self.get_best_proxy(exclude_blocked_for=domain)
+            break
+        if proxy is None:
+            return None
+        self._leases[id(proxy)] = self._leases.get(id(proxy), 0) + 1
+        self.lease_counts["acquired"] += 1
+        self.lease_counts["waited"] += waited
+        if pin:
+            self._sticky[pin] = (proxy, time.time() + PROXY_STICKY_TTL_S)
+            self._sticky.move_to_end(pin)
+        return proxy
+
+    def release_proxy(self, proxy: Optional[ProxyInfo]):
+        """Give back a lease from acquire_proxy (None is ignored)"""
+        if proxy is None:
+            return
+        held = self._leases.get(id(proxy), 0)
+        if held <= 1:
+            self._leases.pop(id(proxy), None)
+        else:
+            self._leases[id(proxy)] = held - 1
+        self._lease_freed.set()
+
+    def _lease_stats(self) -> Dict:
+        return {"active": sum(self._leases.values()), "max_per_proxy": self.max_concurrent_per_proxy,
+                "sticky_sessions": len(self._sticky), **self.lease_counts}
+
+    async def detect_anti_bot(self, page, goal: str, response=None, capture=None) -> Tuple[bool, str, Optional[str]]:
+        """Detect anti-bot pages, asking the vision model only when the local heuristics can't tell.
+        ``capture`` is an async callable returning the page screenshot (default: a new PNG)."""
+        counts = self.anti_bot_counts
+        counts["navigations"] += 1
+        verdict = await classify_live_page(page, response)
+
+        if verdict.verdict is Verdict.BLOCKED:
+            counts["heuristic_blocked"] += 1
+            logger.warning(f"🚫 Anti-bot detected locally: {verdict.detection_type} ({verdict.reason})")
+            return True, verdict.detection_type, verdict.suggested_action
+        if verdict.verdict is Verdict.CLEAN or not self.vision_model:
+            counts["heuristic_clean"] += 1
+            return False, "", None
+
+        counts["escalated"] += 1
+        logger.debug(f"🔍 Ambiguous page ({verdict.reason}); escalating to vision model")
+        return await self.detect_anti_bot_with_vision(page, goal, capture)
+
+    def get_anti_bot_stats(self) -> Dict:
+        """Counters for detect_anti_bot, incl. the share of navigations that skipped the LLM"""
+        counts = self.anti_bot_counts
+        total = counts["navigations"]
+        return {
+            **counts,
+            "llm_avoided_rate": round(1 - counts["escalated"] / total, 3) if total else 0.0,
+            "verdict_cache": self.verdict_cache.stats(),
+        }
+
+    async def detect_anti_bot_with_vision(self, page, goal: str, capture=None) -> Tuple[bool, str, Optional[str]]:
         """Use vision model to detect anti-bot systems"""
         if not self.vision_model:
             return False, "", None
         
         try:
-            # Take screenshot for vision analysis
-            screenshot_bytes = await page.screenshot(type='png')
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+            # Screenshot for vision analysis (the controller's shared frame when given)
+            screenshot_bytes = await capture() if capture else await page.screenshot(type='png')
             
             # Get page content for context
             page_title = await page.title()
             page_url = page.url
             
-            # Create anti-bot detection prompt
-            detection_prompt = f"""
-            ANTI-BOT DETECTION TASK:
-            
-            You are analyzing a webpage screenshot to detect if we've encountered an anti-bot system, CAPTCHA, or access restriction.
-            
-            Current URL: {page_url}
-            Page Title: {page_title}
-            Original Goal: {goal}
-            
-            Look for these indicators:
-            1. **Cloudflare protection pages** - "Checking your browser", "Please wait", security checks
-            2. **CAPTCHA challenges** - Image puzzles, reCAPTCHA, hCaptcha, text verification
-            3. **Access denied pages** - "Access Denied", "Blocked", "Rate Limited"
-            4. **Bot detection warnings** - "Automated traffic detected", "Unusual activity"
-            5. **Verification pages** - Phone verification, email verification, identity checks
-            6. **Error pages** - 403 Forbidden, 429 Rate Limited, 503 Service Unavailable
-            7. **Loading/waiting pages** - Indefinite loading, "Please wait while we verify"
-            
-            Respond with JSON:
-            {{
-                "is_anti_bot": true/false,
-                "detection_type": "cloudflare|captcha|access_denied|rate_limit|verification|error|none",
-                "confidence": 0.0-1.0,
-                "description": "Brief description of what you see",
-                "can_solve": true/false,
-                "suggested_action": "rotate_proxy|solve_captcha|wait|retry|abort"
-            }}
-            """
-            
-            # Use vision model to analyze
-            result = await self.vision_model.analyze_anti_bot_page(
-                screenshot_b64, detection_prompt, page_url
-            )
+            # Same challenge page seen recently on this domain? Reuse its verdict
+            domain = urlparse(page_url).netloc
+            phash = perceptual_hash(screenshot_bytes)
+            result = self.verdict_cache.get(domain, page_title, phash) if phash is not None else None
+            if result is None:
+                result = await self._analyze_with_vision(screenshot_bytes, page_url, page_title, goal)
+                if phash is not None and result.get("confidence", 0) > 0:
+                    self.verdict_cache.put(domain, page_title, phash, result)
             
             if result.get("is_anti_bot", False):
                 detection_type = result.get("detection_type", "unknown")
@@ -193,8 +434,47 @@ class SmartProxyManager:
             logger.error(f"Error in vision-based anti-bot detection: {e}")
             return False, "", None
     
-    def mark_proxy_success(self, proxy: ProxyInfo, response_time: float = 0):
-        """Mark proxy as successful"""
+    async def _analyze_with_vision(self, screenshot_bytes: bytes, page_url: str, page_title: str, goal: str) -> Dict:
+        """Run the vision model on a screenshot; returns its raw verdict dict"""
+        screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+        # Create anti-bot detection prompt
+        detection_prompt = f"""
+        ANTI-BOT DETECTION TASK:
+        
+        You are analyzing a webpage screenshot to detect if we've encountered an anti-bot system, CAPTCHA, or access restriction.
+        
+        Current URL: {page_url}
+        Page Title: {page_title}
+        Original Goal: {goal}
+        
+        Look for these indicators:
+        1. **Cloudflare protection pages** - "Checking your browser", "Please wait", security checks
+        2. **CAPTCHA challenges** - Image puzzles, reCAPTCHA, hCaptcha, text verification
+        3. **Access denied pages** - "Access Denied", "Blocked", "Rate Limited"
+        4. **Bot detection warnings** - "Automated traffic detected", "Unusual activity"
+        5. **Verification pages** - Phone verification, email verification, identity checks
+        6. **Error pages** - 403 Forbidden, 429 Rate Limited, 503 Service Unavailable
+        7. **Loading/waiting pages** - Indefinite loading, "Please wait while we verify"
+        
+        Respond with JSON:
+        {{
+            "is_anti_bot": true/false,
+            "detection_type": "cloudflare|captcha|access_denied|rate_limit|verification|error|none",
+            "confidence": 0.0-1.0,
+            "description": "Brief description of what you see",
+            "can_solve": true/false,
+            "suggested_action": "rotate_proxy|solve_captcha|wait|retry|abort"
+        }}
+        """
+        
+        # Use vision model to analyze
+        return await self.vision_model.analyze_anti_bot_page(
+            screenshot_b64, detection_prompt, page_url
+        )
+    
+    def mark_proxy_success(self, proxy: ProxyInfo, response_time: float = 0, domain: str = None):
+        """Mark proxy as successful (for ``domain``, if given)"""
+        self._record_outcome(proxy, domain, True, response_time)
         proxy.success_count += 1
         proxy.consecutive_failures = 0
         proxy.last_used = time.time()
@@ -204,25 +484,219 @@ class SmartProxyManager:
     
     def mark_proxy_failure(self, proxy: ProxyInfo, site_url: str = None, detection_type: str = None):
         """Mark proxy as failed"""
+        self._record_outcome(proxy, site_url, False)
         proxy.failure_count += 1
-        proxy.consecutive_failures += 1
         
-        if detection_type in ["cloudflare", "rate_limit"]:
+        if detection_type in ["cloudflare", "rate_limit"] and site_url:
+            # One site's verdict on this exit: exclude it there, don't count it toward retiring the proxy
             proxy.blocked_sites.add(site_url)
             proxy.health = ProxyHealth.BLOCKED
             logger.warning(f"🚫 Proxy {proxy.server} blocked by {detection_type} for {site_url}")
         else:
+            proxy.consecutive_failures += 1
             proxy.health = ProxyHealth.DEGRADED
         
         # Mark as completely failed if too many consecutive failures
         if proxy.consecutive_failures >= self.max_consecutive_failures:
             proxy.health = ProxyHealth.FAILED
+            proxy.failed_at = time.time()
             logger.error(f"❌ Proxy {proxy.server} marked as failed after {proxy.consecutive_failures} consecutive failures")
     
+    # ── background health checks ─────────────────────────────────────────────
+
+    def start_health_checks(self, interval_s: float = PROXY_HEALTH_CHECK_INTERVAL_S):
+        """Probe the pool every ``interval_s`` seconds in the background (no-op if <= 0)"""
+        if interval_s <= 0 or not self.proxies or (self._health_task and not self._health_task.done()):
+            return
+        self._health_task = asyncio.create_task(self._health_loop(interval_s))
+        logger.info(f"🩺 Proxy health checks every {interval_s:.0f}s for {len(self.proxies)} proxies")
+
+    async def stop_health_checks(self):
+        task, self._health_task = self._health_task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _health_loop(self, interval_s: float):
+        while True:
+            try:
+                await self.probe_proxies()
+            except Exception as e:
+                logger.error(f"Proxy health check round failed: {e}")
+            await asyncio.sleep(interval_s)
+
+    async def probe_proxies(
+        self,
+        url: str = PROXY_HEALTH_CHECK_URL,
+        timeout_s: float = PROXY_HEALTH_CHECK_TIMEOUT_S,
+        concurrency: int = PROXY_HEALTH_CHECK_CONCURRENCY,
+        cooldown_s: float = PROXY_FAILED_COOLDOWN_S,
+    ) -> Dict:
+        """Probe every due proxy once, ``concurrency`` at a time, and update its health.
+
+        FAILED proxies are due once ``cooldown_s`` has passed since they failed;
+        a successful probe revives them.
+        """
+        now = time.time()
+        due = [
+            p for p in self.proxies
+            if can_probe(p) and (p.health != ProxyHealth.FAILED or now - p.failed_at >= cooldown_s)
+        ]
+        sem = asyncio.Semaphore(max(1, concurrency))
+        counts = self.health_check_counts
+        healthy = revived = 0
+
+        async with aiohttp.ClientSession() as session:
+            async def check(proxy: ProxyInfo):
+                nonlocal healthy, revived
+                async with sem:
+                    try:
+                        latency = await probe_proxy(proxy, url, timeout_s, session)
+                    except ProbeError as e:
+                        logger.debug(f"🩺 {e}")
+                        self._mark_probe_failure(proxy)
+                        return
+                healthy += 1
+                revived += self._mark_probe_success(proxy, latency)
+
+            await asyncio.gather(*(check(p) for p in due))
+
+        counts["rounds"] += 1
+        counts["probed"] += len(due)
+        counts["failed_probes"] += len(due) - healthy
+        counts["revived"] += revived
+        return {"probed": len(due), "healthy": healthy, "revived": revived}
+
+    def _mark_probe_success(self, proxy: ProxyInfo, latency: float) -> int:
+        """Record a good probe; returns 1 if it brought a FAILED proxy back"""
+        proxy.last_probed = time.time()
+        proxy.probe_latency = latency
+        proxy.probe_failures = 0
+        if proxy.success_count == 0:
+            # No navigation history yet: the probe is the best speed estimate for ranking
+            proxy.response_time = latency
+        was_failed = proxy.health == ProxyHealth.FAILED
+        if proxy.health in (ProxyHealth.FAILED, ProxyHealth.DEGRADED):
+            proxy.consecutive_failures = 0
+            proxy.health = ProxyHealth.HEALTHY
+            if was_failed:
+                logger.info(f"♻️ Proxy {proxy.server} revived by health check")
+        return int(was_failed)
+
+    def _mark_probe_failure(self, proxy: ProxyInfo):
+        proxy.last_probed = time.time()
+        proxy.probe_failures += 1
+        if proxy.health == ProxyHealth.FAILED:
+            proxy.failed_at = proxy.last_probed  # restart the cooldown
+        elif proxy.probe_failures >= 2:
+            proxy.health = ProxyHealth.FAILED
+            proxy.failed_at = proxy.last_probed
+            logger.warning(f"❌ Proxy {proxy.server} failed {proxy.probe_failures} health checks in a row")
+        elif proxy.health == ProxyHealth.HEALTHY:
+            proxy.health = ProxyHealth.DEGRADED
+
+    def _health_check_stats(self) -> Dict:
+        return {"running": bool(self._health_task and not self._health_task.done()), **self.health_check_counts}
+
+    # ── persisted stats ─────────────────────────────────────────────────────────
+
+    def _restore_stats(self):
+        """Apply what the store knows about the configured proxies (and all saved scores)"""
+        try:
+            saved, scores = self.store.load()
+        except Exception as e:
+            logger.error(f"Could not load proxy stats from {self.store.path}: {e}")
+            return
+        restored = 0
+        for proxy in self.proxies:
+            state = saved.get(proxy.key)
+            if state is None:
+                continue
+            for field in PROXY_FIELDS:
+                setattr(proxy, field, ProxyHealth(state[field]) if field == "health" else state[field])
+            proxy.blocked_sites = set(state["blocked_sites"])
+            if proxy.health == ProxyHealth.FAILED:
+                self._restore_failed(proxy)
+            restored += 1
+        for server, username, domain, successes, failures, latency_s, updated_at in scores:
+            self.scorer.restore((server, username), domain, ArmStats(successes, failures, latency_s, updated_at))
+        logger.info(f"Restored stats for {restored}/{len(self.proxies)} proxies from {self.store.path}")
+
+    def _restore_failed(self, proxy: ProxyInfo):
+        """A proxy saved as FAILED stays FAILED only while the health checker will
+        re-probe it. Past its cooldown, or with health checks off (nothing would
+        ever revive it), it comes back on probation: DEGRADED, one failure from FAILED."""
+        if PROXY_HEALTH_CHECK_INTERVAL_S > 0 and time.time() - proxy.failed_at < PROXY_FAILED_COOLDOWN_S:
+            return
+        proxy.health = ProxyHealth.DEGRADED
+        proxy.consecutive_failures = self.max_consecutive_failures - 1
+        logger.info(f"🔁 Proxy {proxy.server} restored on probation (saved as failed)")
+
+    def _stats_snapshot(self) -> Tuple[List[Dict], List[tuple]]:
+        proxies = []
+        for proxy in self.proxies:
+            server, username = proxy.key
+            row = {field: getattr(proxy, field) for field in PROXY_FIELDS}
+            row.update(server=server, username=username, health=proxy.health.value,
+                       blocked_sites=set(proxy.blocked_sites))
+            proxies.append(row)
+        scores = [
+            (*key, domain, arm.successes, arm.failures, arm.latency_s, arm.updated_at)
+            for key, domain, arm in self.scorer.export()
+        ]
+        return proxies, scores
+
+    def save_stats(self):
+        """Write the current proxy stats to the store now (no-op without one)"""
+        if self.store is not None:
+            self.store.save(*self._stats_snapshot())
+            self.last_flushed = time.time()
+
+    async def flush_stats(self):
+        """``save_stats`` with the SQLite write off the event loop"""
+        if self.store is None:
+            return
+        snapshot = self._stats_snapshot()
+        await asyncio.to_thread(self.store.save, *snapshot)
+        self.last_flushed = time.time()
+
+    def start_stats_flush(self, interval_s: float = PROXY_STATS_FLUSH_INTERVAL_S):
+        """Save stats every ``interval_s`` seconds in the background (no-op without a store)"""
+        if self.store is None or interval_s <= 0 or (self._flush_task and not self._flush_task.done()):
+            return
+        self._flush_task = asyncio.create_task(self._flush_loop(interval_s))
+
+    async def stop_stats_flush(self):
+        """Stop the background saves and save once more"""
+        task, self._flush_task = self._flush_task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush_stats()
+        except Exception as e:
+            logger.error(f"Final proxy stats flush failed: {e}")
+
+    async def _flush_loop(self, interval_s: float):
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.flush_stats()
+            except Exception as e:
+                logger.error(f"Proxy stats flush failed: {e}")
+
     def get_proxy_stats(self) -> Dict:
         """Get comprehensive proxy statistics"""
         if not self.proxies:
-            return {"total": 0, "healthy": 0, "blocked": 0, "failed": 0, "available": 0}
+            return {"total": 0, "healthy": 0, "blocked": 0, "failed": 0, "available": 0,
+                    "anti_bot": self.get_anti_bot_stats(), "scoring": self.scorer.stats(),
+                    "health_checks": self._health_check_stats(), "leases": self._lease_stats()}
         
         stats = {
             "total": len(self.proxies),
@@ -230,6 +704,25 @@ class SmartProxyManager:
             "degraded": len([p for p in self.proxies if p.health == ProxyHealth.DEGRADED]),
             "blocked": len([p for p in self.proxies if p.health == ProxyHealth.BLOCKED]),
             "failed": len([p for p in self.proxies if p.health == ProxyHealth.FAILED]),
-            "available": len([p for p in self.proxies if p.health != ProxyHealth.FAILED and p.consecutive_failures < self.max_consecutive_failures])
+            "available": len([p for p in self.proxies if p.health != ProxyHealth.FAILED and p.consecutive_failures < self.max_consecutive_failures]),
+            "anti_bot": self.get_anti_bot_stats(),
+            "scoring": self.scorer.stats(),
+            "health_checks": self._health_check_stats(),
+            "leases": self._lease_stats(),
         }
         return stats
+
+
+_shared_manager: Optional[SmartProxyManager] = None
+
+
+def get_shared_proxy_manager() -> SmartProxyManager:
+    """The process-wide proxy manager (with the shared vision model and stats store), created on first use"""
+    global _shared_manager
+    if _shared_manager is None:
+        from backend.anti_bot_detection import get_shared_vision_model
+        _shared_manager = SmartProxyManager(
+            vision_model=get_shared_vision_model(),
+            store=ProxyStore(PROXY_STATS_DB) if PROXY_STATS_DB else None,
+        )
+    return _shared_manager
@@ -0,0 +1,136 @@
+"""Per-(proxy, domain) proxy scores: Thompson sampling with time decay.
+
+A proxy's lifetime success rate says little about one target: an exit can be
+fast on one site and banned on the next, and a week-old failure streak should
+not outweigh the last hour. ``ProxyScorer`` keeps, for every (proxy, domain)
+pair it has seen:
+
+- decayed success / failure counts (both halve every ``half_life_s``)
+- an exponentially weighted average latency
+
+``sample()`` draws a success probability from Beta(1 + successes, 1 + failures)
+and divides it by the expected latency, so proven fast exits win most draws
+while rarely tried ones still get explored. A proxy's record across all domains
+is blended in at ``PRIOR_WEIGHT`` as a prior for domains it hasn't seen.
+"""
+
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Iterable
+
+from backend.config import PROXY_SCORE_HALF_LIFE_S, PROXY_SCORE_MAX_DOMAINS
+
+# How much a proxy's all-domain record counts toward a domain it hasn't been tried on
+PRIOR_WEIGHT = 0.25
+# Latency assumed for a proxy with no measurement yet, and added to every estimate
+DEFAULT_LATENCY_S = 2.0
+LATENCY_FLOOR_S = 0.25
+LATENCY_EWMA_ALPHA = 0.3
+
+
+@dataclass(slots=True)
+class ArmStats:
+    successes: float = 0.0
+    failures: float = 0.0
+    latency_s: float | None = None
+    updated_at: float = 0.0
+
+    def decayed(self, now: float, half_life_s: float) -> tuple[float, float]:
+        if half_life_s <= 0 or not self.updated_at:
+            return self.successes, self.failures
+        factor = 0.5 ** (max(0.0, now - self.updated_at) / half_life_s)
+        return self.successes * factor, self.failures * factor
+
+
+class ProxyScorer:
+    """Decayed outcome statistics per (proxy key, domain), sampled Thompson-style."""
+
+    def __init__(
+        self,
+        half_life_s: float = PROXY_SCORE_HALF_LIFE_S,
+        max_domains: int = PROXY_SCORE_MAX_DOMAINS,
+        clock=time.time,
+        rng: random.Random | None = None,
+    ):
+        self.half_life_s = half_life_s
+        self.max_domains = max(1, max_domains)
+        self._clock = clock
+        self._rng = rng or random.Random()
+        # domain -> {proxy key -> stats}; least recently updated domain first
+        self._domains: OrderedDict[str, dict[Hashable, ArmStats]] = OrderedDict()
+        self._all: dict[Hashable, ArmStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._domains)
+
+    def _touch(self, domain: str) -> dict[Hashable, ArmStats]:
+        """The arms for ``domain``, marked most recently used (evicting the oldest domain if new)"""
+        arms = self._domains.get(domain)
+        if arms is None:
+            arms = self._domains[domain] = {}
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+        else:
+            self._domains.move_to_end(domain)
+        return arms
+
+    def record(self, key: Hashable, domain: str, success: bool, latency_s: float | None = None) -> None:
+        """Fold one navigation outcome into the proxy's stats for ``domain`` (and overall)."""
+        now = self._clock()
+        arms = self._touch(domain)
+        for arm in (arms.setdefault(key, ArmStats()), self._all.setdefault(key, ArmStats())):
+            arm.successes, arm.failures = arm.decayed(now, self.half_life_s)
+            arm.updated_at = now
+            if success:
+                arm.successes += 1
+                if latency_s is not None and latency_s > 0:
+                    arm.latency_s = latency_s if arm.latency_s is None else (
+                        LATENCY_EWMA_ALPHA * latency_s + (1 - LATENCY_EWMA_ALPHA) * arm.latency_s
+                    )
+            else:
+                arm.failures += 1
+
+    def tried(self, domain: str) -> Iterable[Hashable]:
+        """Proxy keys with any recorded outcome on ``domain``."""
+        return self._domains.get(domain, {}).keys()
+
+    def sample(self, key: Hashable, domain: str) -> float:
+        """One Thompson draw: sampled success probability per second of expected latency."""
+        now = self._clock()
+        successes = failures = 0.0
+        latency = None
+        for arm, weight in ((self._domains.get(domain, {}).get(key), 1.0), (self._all.get(key), PRIOR_WEIGHT)):
+            if arm is None:
+                continue
+            s, f = arm.decayed(now, self.half_life_s)
+            successes += weight * s
+            failures += weight * f
+            if latency is None:
+                latency = arm.latency_s
+        theta = self._rng.betavariate(1 + successes, 1 + failures)
+        return theta / ((latency if latency is not None else DEFAULT_LATENCY_S) + LATENCY_FLOOR_S)
+
+    def export(self) -> Iterable[tuple[Hashable, str, ArmStats]]:
+        """Every arm as (key, domain, stats), least recently updated domain first;
+        the all-domain record has domain ``""``."""
+        for key, arm in self._all.items():
+            yield key, "", arm
+        for domain, arms in self._domains.items():
+            for key, arm in arms.items():
+                yield key, domain, arm
+
+    def restore(self, key: Hashable, domain: str, arm: ArmStats) -> None:
+        """Put back an arm from ``export()`` (e.g. loaded from disk); call oldest domain first."""
+        if not domain:
+            self._all[key] = arm
+        else:
+            self._touch(domain)[key] = arm
+
+    def stats(self) -> dict:
+        return {
+            "domains": len(self._domains),
+            "arms": sum(len(arms) for arms in self._domains.values()),
+            "half_life_s": self.half_life_s,
+        }
@@ -0,0 +1,107 @@
+"""SQLite store for what the proxy manager has learned, kept across restarts.
+
+Proxies are rebuilt from ``SCRAPER_PROXIES`` at every boot; without a store
+their counters, health, blocked sites and per-domain scores start blank and the
+first jobs after a deploy repeat choices already known to fail. The store holds:
+
+- ``proxies``: one row of ``ProxyInfo`` state per (server, username)
+- ``proxy_scores``: ``ProxyScorer`` arms per (server, username, domain); the
+  all-domain record is kept under domain ``""``
+
+Each call opens its own connection, so ``save`` can run in a worker thread.
+Proxy rows for proxies no longer configured are left alone (the proxy may come
+back); scores are replaced wholesale, since the scorer holds every loaded row.
+"""
+
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proxies (
+    server TEXT NOT NULL,
+    username TEXT NOT NULL,
+    health TEXT NOT NULL,
+    success_count INTEGER NOT NULL,
+    failure_count INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    response_time REAL NOT NULL,
+    consecutive_failures INTEGER NOT NULL,
+    failed_at REAL NOT NULL,
+    last_probed REAL NOT NULL,
+    probe_latency REAL NOT NULL,
+    probe_failures INTEGER NOT NULL,
+    blocked_sites TEXT NOT NULL,
+    PRIMARY KEY (server, username)
+);
+CREATE TABLE IF NOT EXISTS proxy_scores (
+    server TEXT NOT NULL,
+    username TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    successes REAL NOT NULL,
+    failures REAL NOT NULL,
+    latency_s REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (server, username, domain)
+);
+"""
+
+# ProxyInfo fields stored as plain columns, in table order after (server, username)
+PROXY_FIELDS = (
+    "health", "success_count", "failure_count", "last_used", "response_time", "consecutive_failures",
+    "failed_at", "last_probed", "probe_latency", "probe_failures",
+)
+
+
+class ProxyStore:
+    """Proxy state and scores in one SQLite file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def save(self, proxies: Iterable[dict], scores: Iterable[tuple]) -> None:
+        """Upsert proxy rows (dicts of ``PROXY_FIELDS`` plus server, username,
+        blocked_sites) and score rows (server, username, domain, successes,
+        failures, latency_s, updated_at) in one transaction. ``scores`` replaces
+        every stored score."""
+        columns = ("server", "username", *PROXY_FIELDS, "blocked_sites")
+        proxy_rows = [
+            (p["server"], p["username"] or "", *(p[f] for f in PROXY_FIELDS), json.dumps(sorted(p["blocked_sites"])))
+            for p in proxies
+        ]
+        score_rows = [(server, username or "", *rest) for server, username, *rest in scores]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO proxies ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                proxy_rows,
+            )
+            conn.execute("DELETE FROM proxy_scores")
+            conn.executemany("INSERT INTO proxy_scores VALUES (?, ?, ?, ?, ?, ?, ?)", score_rows)
+
+    def load(self) -> tuple[dict, list]:
+        """``({(server, username): proxy row dict}, [score rows, oldest first])``;
+        username is None when unset."""
+        if not self.path.exists():
+            return {}, []
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            proxies = {}
+            for row in conn.execute("SELECT * FROM proxies"):
+                state = dict(row)
+                state["username"] = state["username"] or None
+                state["blocked_sites"] = set(json.loads(state["blocked_sites"]))
+                proxies[(state["server"], state["username"])] = state
+            scores = [
+                (r["server"], r["username"] or None, r["domain"], r["successes"], r["failures"],
+                 r["latency_s"], r["updated_at"])
+                for r in conn.execute("SELECT * FROM proxy_scores ORDER BY updated_at")
+            ]
+        return proxies, scores
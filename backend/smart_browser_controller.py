@@ -2,33 +2,40 @@
 
 import asyncio
 import time
+from typing import Callable
 from urllib.parse import urlparse
 from backend.browser_controller import BrowserController
-from backend.proxy_manager import SmartProxyManager
-from backend.anti_bot_detection import AntiBotVisionModel
+from backend.proxy_manager import ProxyInfo, SmartProxyManager, get_shared_proxy_manager
+from backend.anti_bot_detection import AntiBotVisionModel, get_shared_vision_model
 import logging
-import base64
 from backend.config import (
     MAX_PROXY_RETRIES, MAX_CAPTCHA_ATTEMPTS,
     PROXY_ROTATION_DELAY_S, CAPTCHA_SETTLE_S, NAVIGATION_SETTLE_S,
-    get_random_ua,
+    GHOST_MODE_ENABLED, get_random_ua,
 )
-from backend.stealth_engine import get_ua_headers
-from backend.config import BROWSER_VIEWPORT_WIDTH, BROWSER_VIEWPORT_HEIGHT
+from backend.fingerprint_profile import FingerprintProfile, generate_profile
 logger = logging.getLogger(__name__)
 
 class SmartBrowserController(BrowserController):
-    def __init__(self, headless: bool, proxy: dict | None, enable_streaming: bool = False):
-        super().__init__(headless, proxy, enable_streaming)
+    def __init__(self, headless: bool, proxy: dict | None, enable_streaming: bool = False,
+                 proxy_manager: SmartProxyManager | None = None,
+                 vision_model: AntiBotVisionModel | None = None, **kwargs):
+        super().__init__(headless, proxy, enable_streaming, **kwargs)
         
-        # Initialize smart proxy management
-        self.vision_model = AntiBotVisionModel()
-        self.proxy_manager = SmartProxyManager(self.vision_model)
+        # Proxy health and anti-bot verdicts are shared process-wide unless injected
+        self.proxy_manager = proxy_manager or get_shared_proxy_manager()
+        self.vision_model = vision_model or self.proxy_manager.vision_model or get_shared_vision_model()
         self.current_proxy = proxy
+        # The proxy lease this controller navigates on. Rotation swaps it and reports
+        # the new one to on_lease_change, whose owner (the job) releases the last one;
+        # without an owner the controller releases it on exit.
+        self.proxy_lease: ProxyInfo | None = None
+        self.on_lease_change: Callable[[ProxyInfo | None], None] | None = None
         self.max_proxy_retries = MAX_PROXY_RETRIES
         self.proxy_retry_count = 0
         self.max_captcha_solve_attempts = MAX_CAPTCHA_ATTEMPTS
         self.captcha_solve_count = 0
+        self.rotation_times_ms: list[float] = []
     
     async def smart_navigate(self, url: str, wait_until: str = "domcontentloaded", timeout: int = 30000) -> bool:
         """Navigate with intelligent anti-bot detection and proxy rotation"""
@@ -43,12 +50,12 @@ class SmartBrowserController(BrowserController):
                 response = await self.page.goto(url, wait_until=wait_until, timeout=timeout)
                 response_time = time.time() - start_time
                 
-                # Wait a moment for page to fully load
-                await asyncio.sleep(NAVIGATION_SETTLE_S)
+                # Let the page settle (returns as soon as it goes quiet)
+                await self.wait_until_ready(NAVIGATION_SETTLE_S)
                 
-                # Use vision model to detect anti-bot systems
-                is_antibot, detection_type, suggested_action = await self.proxy_manager.detect_anti_bot_with_vision(
-                    self.page, f"navigate to {url}"
+                # Local heuristics first; only ambiguous pages go to the vision model
+                is_antibot, detection_type, suggested_action = await self.proxy_manager.detect_anti_bot(
+                    self.page, f"navigate to {url}", response, capture=self._frame_jpeg
                 )
                 
                 if is_antibot:
@@ -60,9 +67,9 @@ class SmartBrowserController(BrowserController):
                         if success:
                             logger.info("✅ CAPTCHA solved successfully!")
                             if self.current_proxy:
-                                proxy_info = next((p for p in self.proxy_manager.proxies if p.to_playwright_dict() == self.current_proxy), None)
+                                proxy_info = self.proxy_manager.find_proxy(self.current_proxy)
                                 if proxy_info:
-                                    self.proxy_manager.mark_proxy_success(proxy_info, response_time)
+                                    self.proxy_manager.mark_proxy_success(proxy_info, response_time, site_domain)
                             return True
                         else:
                             self.captcha_solve_count += 1
@@ -70,17 +77,17 @@ class SmartBrowserController(BrowserController):
                     if suggested_action in ["rotate_proxy", "retry"] or self.captcha_solve_count >= self.max_captcha_solve_attempts:
                         # Mark current proxy as failed
                         if self.current_proxy:
-                            proxy_info = next((p for p in self.proxy_manager.proxies if p.to_playwright_dict() == self.current_proxy), None)
+                            proxy_info = self.proxy_manager.find_proxy(self.current_proxy)
                             if proxy_info:
                                 self.proxy_manager.mark_proxy_failure(proxy_info, site_domain, detection_type)
                         
                         # Try with new proxy
                         if attempt < self.max_proxy_retries - 1:
-                            new_proxy_info = self.proxy_manager.get_best_proxy(exclude_blocked_for=site_domain)
+                            new_proxy_info = await self._rotate_lease(site_domain)
                             if new_proxy_info:
                                 new_proxy = new_proxy_info.to_playwright_dict()
                                 logger.info(f"🔄 Rotating to new proxy: {new_proxy['server']}")
-                                await self._restart_browser_with_proxy(new_proxy)
+                                await self._restart_browser_with_proxy(new_proxy, new_proxy_info.location)
                                 await asyncio.sleep(PROXY_ROTATION_DELAY_S)  # Wait before retry
                                 continue
                             else:
@@ -95,9 +102,9 @@ class SmartBrowserController(BrowserController):
                     # Success! No anti-bot detected
                     logger.info(f"✅ Successfully navigated to: {url}")
                     if self.current_proxy:
-                        proxy_info = next((p for p in self.proxy_manager.proxies if p.to_playwright_dict() == self.current_proxy), None)
+                        proxy_info = self.proxy_manager.find_proxy(self.current_proxy)
                         if proxy_info:
-                            self.proxy_manager.mark_proxy_success(proxy_info, response_time)
+                            self.proxy_manager.mark_proxy_success(proxy_info, response_time, site_domain)
                     self.proxy_retry_count = 0
                     self.captcha_solve_count = 0
                     return True
@@ -107,33 +114,56 @@ class SmartBrowserController(BrowserController):
                 
                 # Mark proxy failure and try another
                 if self.current_proxy:
-                    proxy_info = next((p for p in self.proxy_manager.proxies if p.to_playwright_dict() == self.current_proxy), None)
+                    proxy_info = self.proxy_manager.find_proxy(self.current_proxy)
                     if proxy_info:
                         self.proxy_manager.mark_proxy_failure(proxy_info, site_domain, "connection_error")
                 
                 if attempt < self.max_proxy_retries - 1:
-                    new_proxy_info = self.proxy_manager.get_best_proxy(exclude_blocked_for=site_domain)
+                    new_proxy_info = await self._rotate_lease(site_domain)
                     if new_proxy_info:
                         new_proxy = new_proxy_info.to_playwright_dict()
                         logger.info(f"🔄 Retrying with new proxy due to connection error")
-                        await self._restart_browser_with_proxy(new_proxy)
+                        await self._restart_browser_with_proxy(new_proxy, new_proxy_info.location)
                         await asyncio.sleep(PROXY_ROTATION_DELAY_S)
                         continue
         
         logger.error(f"❌ Failed to navigate to {url} after all retries")
         return False
     
+    def _set_lease(self, lease: ProxyInfo | None):
+        self.proxy_lease = lease
+        if self.on_lease_change:
+            self.on_lease_change(lease)
+
+    async def _rotate_lease(self, site_domain: str) -> ProxyInfo | None:
+        """Give back the current lease and lease the best proxy for ``site_domain``
+        (subject to the same per-proxy limit as every other job)"""
+        self.proxy_manager.release_proxy(self.proxy_lease)
+        self._set_lease(None)  # released: not again by the owner if the acquire is cancelled
+        self._set_lease(await self.proxy_manager.acquire_proxy(domain=site_domain))
+        return self.proxy_lease
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await super().__aexit__(exc_type, exc, tb)
+        finally:
+            if self.on_lease_change is None:
+                self.proxy_manager.release_proxy(self.proxy_lease)
+                self.proxy_lease = None
+
+    async def _frame_jpeg(self) -> bytes:
+        return (await self.capture_frame()).jpeg
+
     async def _attempt_captcha_solve(self, url: str, detection_type: str) -> bool:
         """Attempt to solve CAPTCHA using vision model"""
         try:
             logger.info(f"🧩 Attempting to solve {detection_type} CAPTCHA...")
             
-            # Take screenshot for CAPTCHA analysis
-            screenshot_bytes = await self.page.screenshot(type='png')
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+            # Same frame the anti-bot check just looked at, if nothing changed since
+            frame = await self.capture_frame()
             
             # Use vision model to solve CAPTCHA
-            solution = await self.vision_model.solve_captcha(screenshot_b64, url, detection_type)
+            solution = await self.vision_model.solve_captcha(frame.b64, url, detection_type)
             
             if solution.get("can_solve", False) and solution.get("confidence", 0) > 0.7:
                 logger.info(f"🎯 CAPTCHA solution found: {solution.get('solution', 'N/A')}")
@@ -197,52 +227,52 @@ class SmartBrowserController(BrowserController):
             logger.error(f"❌ Error applying CAPTCHA solution: {e}")
             return False
     
-    async def _restart_browser_with_proxy(self, new_proxy: dict):
-        """Restart browser with new proxy"""
+    async def _restart_browser_with_proxy(self, new_proxy: dict, proxy_country: str | None = None):
+        """Switch proxy by opening a new context, with a fresh fingerprint, on the running browser"""
+        started = time.perf_counter()
+        self.current_proxy = new_proxy
+        self.proxy = new_proxy
+        if proxy_country and proxy_country != "unknown":
+            self._proxy_country = proxy_country
         try:
-            # Close current browser
-            if self.browser:
-                await self.browser.close()
-            
-            # Update proxy
-            self.current_proxy = new_proxy
-            
-            # Launch new browser with new proxy
-            launch_options = {
-                "headless": self.headless,
-                "args": self._get_launch_args(),
-            }
+            if self.browser and self.browser.is_connected():
+                # Per-context proxy: the Chromium process (shared or ours) stays warm
+                await self.rotate_context(new_profile=self._rotation_profile())
+            elif self._leased:
+                raise RuntimeError("pooled browser is gone; cannot rotate its context")
+            else:
+                await self._relaunch_browser()
+        except Exception as e:
+            logger.error(f"❌ Failed to switch to new proxy: {e}")
+            raise
+        self.rotation_times_ms.append((time.perf_counter() - started) * 1000)
+        logger.info(f"✅ Switched to new proxy in {self.rotation_times_ms[-1]:.0f}ms")
 
-            if new_proxy:
-                launch_options["proxy"] = new_proxy
+    def _rotation_profile(self) -> FingerprintProfile:
+        """A new identity for the new proxy (never the seeded one, so the two sessions don't link up)"""
+        if GHOST_MODE_ENABLED:
+            return generate_profile(proxy_country=self._proxy_country)
+        return generate_profile(user_agent=get_random_ua())
 
-            self.browser = await self.play.chromium.launch(**launch_options)
-            self._user_agent = get_random_ua()
-            context = await self.browser.new_context(
-                viewport={"width": BROWSER_VIEWPORT_WIDTH, "height": BROWSER_VIEWPORT_HEIGHT},
-                user_agent=self._user_agent,
-                proxy=new_proxy if new_proxy else None,
-            )
-            self.page = await context.new_page()
-            await self.page.set_extra_http_headers(get_ua_headers(self._user_agent))
+    async def _relaunch_browser(self):
+        """Our own Chromium died: launch a new one (same display lease) with a fresh identity"""
+        self.streaming_active = False
+        self.browser = await self.play.chromium.launch(**self._launch_options())
+        self._profile = self._rotation_profile()
+        self._user_agent = self._profile.user_agent
+        await self._open_context()
+        if self.enable_streaming:
+            await self._setup_cdp_streaming()
 
-            # Re-setup CDP streaming if enabled
-            if self.enable_streaming:
-                await self._setup_cdp_streaming()
-            
-            logger.info("✅ Browser restarted with new proxy")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to restart browser with new proxy: {e}")
-            raise
-    
     def get_proxy_stats(self) -> dict:
         """Get current proxy statistics"""
         stats = self.proxy_manager.get_proxy_stats()
         stats.update({
             "current_proxy": self.current_proxy.get("server", "None") if self.current_proxy else "None",
             "retry_count": self.proxy_retry_count,
-            "captcha_solve_count": self.captcha_solve_count
+            "captcha_solve_count": self.captcha_solve_count,
+            "rotations": len(self.rotation_times_ms),
+            "rotation_ms_avg": round(sum(self.rotation_times_ms) / len(self.rotation_times_ms), 1) if self.rotation_times_ms else 0.0,
         })
         return stats
     
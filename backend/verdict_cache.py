@@ -0,0 +1,103 @@
+"""LRU + TTL cache of anti-bot vision verdicts.
+
+A Cloudflare interstitial or DataDome block page looks the same every time it
+is served, but each navigation that lands on one paid for a fresh vision
+analysis. Verdicts are cached under (domain, normalized title, perceptual
+hash of the screenshot):
+
+- The hash is a 64-bit difference hash (dHash). Screenshots within
+  ``max_distance`` bits of a cached one (spinner frame, ray ID) still hit
+- Entries expire after ``ttl_s`` so a site that changes its defences is
+  re-checked, and the least recently used entry is evicted past ``max_entries``
+"""
+
+import io
+import re
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+from backend.config import ANTI_BOT_CACHE_MAX_DISTANCE, ANTI_BOT_CACHE_SIZE, ANTI_BOT_CACHE_TTL_S
+
+_DIGITS_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def perceptual_hash(image_bytes: bytes) -> int | None:
+    """64-bit dHash of an encoded image, or None if it can't be decoded."""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            pixels = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            bits = (bits << 1) | (left > pixels[row * 9 + col + 1])
+    return bits
+
+
+def normalize_title(title: str) -> str:
+    return _SPACE_RE.sub(" ", _DIGITS_RE.sub("#", title or "")).strip().lower()
+
+
+class VerdictCache:
+    """Anti-bot verdicts keyed by (domain, title, screenshot hash)."""
+
+    def __init__(
+        self,
+        max_entries: int = ANTI_BOT_CACHE_SIZE,
+        ttl_s: float = ANTI_BOT_CACHE_TTL_S,
+        max_distance: int = ANTI_BOT_CACHE_MAX_DISTANCE,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.max_distance = max_distance
+        self._clock = clock
+        # (domain, title, hash) -> (expires_at, verdict), oldest first
+        self._entries: OrderedDict[tuple[str, str, int], tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, domain: str, title: str, phash: int) -> dict | None:
+        now = self._clock()
+        title = normalize_title(title)
+        key = (domain, title, phash)
+        if key not in self._entries:
+            key = next(
+                (k for k in self._entries
+                 if k[0] == domain and k[1] == title and (k[2] ^ phash).bit_count() <= self.max_distance),
+                None,
+            )
+        entry = self._entries.get(key) if key else None
+        if entry and entry[0] <= now:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[1])
+
+    def put(self, domain: str, title: str, phash: int, verdict: dict) -> None:
+        key = (domain, normalize_title(title), phash)
+        self._entries[key] = (self._clock() + self.ttl_s, dict(verdict))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
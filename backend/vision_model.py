@@ -5,15 +5,22 @@ from dotenv import load_dotenv
 import json
 import asyncio
 import functools
+import math
+import time
 from PIL import Image
 import io
 from backend.config import GEMINI_MODEL_NAME
+from backend.element_ranking import select_elements
+from backend.latency import LatencyHistogram
 
 load_dotenv()
 
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 MODEL = genai.GenerativeModel(GEMINI_MODEL_NAME)
 
+# Per-decision latency: the model call alone, and all of decide() (see get_decision_stats)
+DECISION_LATENCY = {"model": LatencyHistogram(), "total": LatencyHistogram()}
+
 # Universal system prompt - works for ANY website
 SYSTEM_PROMPT = """
 You are a universal web automation agent that can navigate and interact with ANY website to accomplish user goals.
@@ -80,56 +87,28 @@ EXTRACTION TIMING:
 REMEMBER: Be universal - work with ANY website structure, ANY content type, ANY user goal.
 """
 
-async def decide(img_bytes: bytes, page_state, goal: str) -> dict:
-    """Universal AI decision making for any website"""
+async def decide(img_bytes: bytes, page_state, goal: str, token_estimator=None) -> dict:
+    """Universal AI decision making for any website.
+
+    Exactly one model call: token usage comes from the response's usage
+    metadata. When that is missing it comes from ``token_estimator`` (an async
+    ``content -> prompt tokens`` callable, run alongside the model call) if
+    given, else from ``estimate_prompt_tokens``.
+    """
+    started = time.perf_counter()
     print(f"🤖 Universal AI decision")
     print(f"📊 Image size: {len(img_bytes)} bytes")
     print(f"🎯 Goal: {goal}")
     print(f"🖱️ Interactive elements: {len(page_state.selector_map)}")
     print(f"📍 Current URL: {page_state.url}")
 
+    estimate = None
     try:
-        # Compress image efficiently
-        image = Image.open(io.BytesIO(img_bytes))
-        max_size = (1280, 800)
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        compressed_buffer = io.BytesIO()
-        image.save(compressed_buffer, format='JPEG', quality=75, optimize=True)
-        compressed_image = Image.open(compressed_buffer)
+        compressed_image = prepare_image(img_bytes)
 
-        # Create comprehensive element information (dynamic based on content)
-        interactive_elements = []
-        max_elements = min(20, len(page_state.selector_map))  # Adaptive limit
-        
-        for index in sorted(page_state.selector_map.keys())[:max_elements]:
-            elem = page_state.selector_map[index]
-            
-            # Dynamic element description based on context
-            element_data = {
-                "index": index,
-                "tag": elem.tag_name,
-                "text": elem.text[:60] if elem.text else "",
-                "clickable": elem.is_clickable,
-                "input": elem.is_input,
-            }
-            
-            # Add contextual attributes dynamically
-            if elem.attributes.get("href"):
-                element_data["link"] = elem.attributes["href"][:100]
-            if elem.attributes.get("placeholder"):
-                element_data["placeholder"] = elem.attributes["placeholder"][:30]
-            if elem.attributes.get("type"):
-                element_data["type"] = elem.attributes["type"]
-            if elem.attributes.get("class"):
-                # Extract meaningful class hints
-                classes = elem.attributes["class"].lower()
-                if any(hint in classes for hint in ["search", "login", "submit", "button", "nav", "menu"]):
-                    element_data["class_hint"] = classes[:50]
-            if elem.attributes.get("id"):
-                element_data["id"] = elem.attributes["id"][:30]
-                
-            interactive_elements.append(element_data)
+        # The elements most relevant to the goal, within the prompt budget
+        interactive_elements = select_elements(page_state, goal, describe_element)
+        print(f"🧮 Showing {len(interactive_elements)} of {len(page_state.selector_map)} elements")
 
         # Detect website type dynamically
         website_type = detect_website_type(page_state.url, page_state.title, interactive_elements)
@@ -153,40 +132,124 @@ Consider the website type and adapt your strategy accordingly.
 
         content = [SYSTEM_PROMPT, prompt, compressed_image]
 
-        # Count tokens and send request
-        token_count_response = await asyncio.to_thread(
-            functools.partial(MODEL.count_tokens, content)
-        )
-        input_tokens = token_count_response.total_tokens
-
-        response = await asyncio.to_thread(
-            functools.partial(MODEL.generate_content, content)
-        )
+        # Send request (an optional estimator runs concurrently, never in front of it)
+        estimate = asyncio.ensure_future(token_estimator(content)) if token_estimator else None
+        model_started = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(
+                functools.partial(MODEL.generate_content, content)
+            )
+        finally:
+            model_s = time.perf_counter() - model_started
+            DECISION_LATENCY["model"].observe(model_s)
 
         raw_text = response.text
-        response_tokens = await count_response_tokens(raw_text)
-        total_tokens = input_tokens + response_tokens
 
         # Parse response with validation
         result = parse_ai_response(raw_text, page_state, goal, website_type)
 
         # Add token usage
-        result['token_usage'] = {
-            'prompt_tokens': input_tokens,
-            'response_tokens': response_tokens,
-            'total_tokens': total_tokens
-        }
+        result['token_usage'] = await resolve_token_usage(response, content, raw_text, estimate)
+        result['latency_ms'] = round(model_s * 1000, 1)
         
         print(f"🎯 Universal Result: {result}")
         return result
 
     except Exception as e:
         print(f"❌ Error: {e}")
+        if estimate is not None:
+            estimate.cancel()
         return {
             "action": "done",
             "error": str(e),
             "token_usage": {"prompt_tokens": 0, "response_tokens": 0, "total_tokens": 0}
         }
+    finally:
+        DECISION_LATENCY["total"].observe(time.perf_counter() - started)
+
+def get_decision_stats() -> dict:
+    """Latency histograms of decide(): the model call and the whole decision"""
+    return {name: histogram.stats() for name, histogram in DECISION_LATENCY.items()}
+
+# Gemini bills an image as 258 tokens per 768x768 tile (one tile up to 384px on both sides)
+IMAGE_TILE_PX = 768
+IMAGE_TILE_TOKENS = 258
+
+def estimate_prompt_tokens(content: list) -> int:
+    """Local prompt token estimate: ~4 characters per text token, 258 per image tile"""
+    tokens = 0
+    for part in content:
+        if isinstance(part, str):
+            tokens += math.ceil(len(part) / 4)
+        elif isinstance(part, dict) and "data" in part:
+            width, height = Image.open(io.BytesIO(part["data"])).size
+            if width <= IMAGE_TILE_PX // 2 and height <= IMAGE_TILE_PX // 2:
+                tokens += IMAGE_TILE_TOKENS
+            else:
+                tokens += math.ceil(width / IMAGE_TILE_PX) * math.ceil(height / IMAGE_TILE_PX) * IMAGE_TILE_TOKENS
+    return tokens
+
+async def resolve_token_usage(response, content: list, response_text: str, estimate=None) -> dict:
+    """Token usage from the response metadata; else the estimator's result or a local estimate"""
+    usage = extract_token_usage(response)
+    if usage and usage.get("prompt_tokens"):
+        if estimate is not None:
+            estimate.cancel()
+        return usage
+    prompt_tokens = None
+    if estimate is not None:
+        try:
+            prompt_tokens = await estimate
+        except Exception as e:
+            print(f"❌ Token estimator failed: {e}")
+    if prompt_tokens is None:
+        prompt_tokens = estimate_prompt_tokens(content)
+    response_tokens = math.ceil(len(response_text) / 4)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'response_tokens': response_tokens,
+        'total_tokens': prompt_tokens + response_tokens,
+    }
+
+def prepare_image(img_bytes: bytes, max_size: tuple = (1280, 800)) -> dict:
+    """The screenshot as an inline JPEG part; frames from BrowserController.capture_frame
+    are already JPEG at target size and go through untouched"""
+    image = Image.open(io.BytesIO(img_bytes))  # reads the header only
+    if image.format == 'JPEG' and image.width <= max_size[0] and image.height <= max_size[1]:
+        return {"mime_type": "image/jpeg", "data": img_bytes}
+    
+    # Compress image efficiently
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    compressed_buffer = io.BytesIO()
+    image.convert('RGB').save(compressed_buffer, format='JPEG', quality=75, optimize=True)
+    return {"mime_type": "image/jpeg", "data": compressed_buffer.getvalue()}
+
+def describe_element(index: int, elem) -> dict:
+    """Prompt entry for one interactive element"""
+    # Dynamic element description based on context
+    element_data = {
+        "index": index,
+        "tag": elem.tag_name,
+        "text": elem.text[:60] if elem.text else "",
+        "clickable": elem.is_clickable,
+        "input": elem.is_input,
+    }
+    
+    # Add contextual attributes dynamically
+    if elem.attributes.get("href"):
+        element_data["link"] = elem.attributes["href"][:100]
+    if elem.attributes.get("placeholder"):
+        element_data["placeholder"] = elem.attributes["placeholder"][:30]
+    if elem.attributes.get("type"):
+        element_data["type"] = elem.attributes["type"]
+    if elem.attributes.get("class"):
+        # Extract meaningful class hints
+        classes = elem.attributes["class"].lower()
+        if any(hint in classes for hint in ["search", "login", "submit", "button", "nav", "menu"]):
+            element_data["class_hint"] = classes[:50]
+    if elem.attributes.get("id"):
+        element_data["id"] = elem.attributes["id"][:30]
+    return element_data
 
 def detect_website_type(url: str, title: str, elements: list) -> str:
     """Dynamically detect website type based on URL and content"""
@@ -295,19 +358,6 @@ def extract_search_query(goal: str) -> str:
     query_words = [word for word in words if word.lower() not in stop_words]
     return " ".join(query_words[:6])  # Limit query length
 
-async def count_response_tokens(response_text: str) -> int:
-    """Count tokens in the response text"""
-    try:
-        token_count_response = await asyncio.to_thread(
-            functools.partial(MODEL.count_tokens, response_text)
-        )
-        return token_count_response.total_tokens
-    except Exception as e:
-        print(f"❌ Error counting response tokens: {e}")
-        return len(response_text) // 4
-
-
-## This doesn't work with current response structure or generative model
 # extract token usage
 def extract_token_usage(response):
     """
@@ -0,0 +1,102 @@
+"""Tests for the local anti-bot pre-classifier (backend/antibot_classifier.py)."""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.antibot_classifier import Verdict, classify_live_page, classify_page, visible_text
+
+ARTICLE = "<html><body><h1>News</h1>" + "<p>Plain paragraph of article text.</p>" * 20 + "</body></html>"
+
+
+class TestClassifyPage:
+
+    def test_content_page_is_clean(self):
+        result = classify_page(200, {"content-type": "text/html"}, (), ARTICLE, "News")
+        assert result.verdict is Verdict.CLEAN
+        assert not result.is_anti_bot
+
+    def test_429_is_rate_limit(self):
+        result = classify_page(429, html=ARTICLE)
+        assert result.verdict is Verdict.BLOCKED
+        assert result.detection_type == "rate_limit"
+        assert result.suggested_action == "rotate_proxy"
+
+    def test_cf_mitigated_header(self):
+        result = classify_page(403, {"CF-Mitigated": "challenge"}, (), "<html></html>", "")
+        assert result.detection_type == "cloudflare"
+
+    def test_cloudflare_challenge_title_on_200(self):
+        result = classify_page(200, html="<html><body>...</body></html>", title="Just a moment...")
+        assert result.verdict is Verdict.BLOCKED
+        assert result.detection_type == "cloudflare"
+
+    def test_datadome_captcha_markup(self):
+        html = '<iframe src="https://geo.captcha-delivery.com/captcha/?initialCid=x"></iframe>'
+        result = classify_page(403, html=html)
+        assert result.detection_type == "captcha"
+        assert result.suggested_action == "solve_captcha"
+
+    def test_access_denied_title(self):
+        result = classify_page(403, html="<h1>Access Denied</h1>", title="Access Denied")
+        assert result.detection_type == "access_denied"
+
+    def test_403_with_text_signal(self):
+        result = classify_page(403, html="<p>Please verify you are human</p>", title="Example")
+        assert result.verdict is Verdict.BLOCKED
+
+    def test_403_from_bot_managed_site(self):
+        result = classify_page(403, {}, ["_px3"], "<p>Nope</p>", "Example")
+        assert result.verdict is Verdict.BLOCKED
+
+    def test_bare_403_is_ambiguous(self):
+        assert classify_page(403, html="<p>Nope</p>").verdict is Verdict.AMBIGUOUS
+
+    def test_404_is_clean(self):
+        assert classify_page(404, html="<p>Not found</p>").verdict is Verdict.CLEAN
+
+    def test_tiny_page_is_ambiguous(self):
+        assert classify_page(200, html="<div id='root'></div>").verdict is Verdict.AMBIGUOUS
+
+    def test_short_page_with_weak_signal_is_ambiguous(self):
+        html = "<p>" + "Please turn JavaScript on and reload the page. " * 5 + "</p>"
+        assert classify_page(200, html=html).verdict is Verdict.AMBIGUOUS
+
+    def test_long_article_mentioning_captcha_is_clean(self):
+        html = ARTICLE + "<p>How CAPTCHA challenge systems work.</p>" + ARTICLE * 3
+        assert classify_page(200, html=html, title="Blog").verdict is Verdict.CLEAN
+
+    def test_signal_inside_script_is_ignored(self):
+        html = ARTICLE + "<script>var captcha = 'blocked';</script>"
+        assert classify_page(200, html=html).verdict is Verdict.CLEAN
+
+    def test_cloudflare_js_detections_script_is_clean(self):
+        html = ARTICLE.replace("</body>", '<script src="/cdn-cgi/challenge-platform/h/b/scripts/jsd/'
+                                          'a1b2c3/main.js"></script></body>')
+        assert classify_page(200, html=html * 4, title="News").verdict is Verdict.CLEAN
+
+    def test_article_titled_security_check_is_clean(self):
+        title = "Security check: how airports screen your luggage"
+        assert classify_page(200, html=ARTICLE * 4, title=title).verdict is Verdict.CLEAN
+        assert classify_page(503, html=ARTICLE * 4, title=title).verdict is Verdict.BLOCKED
+
+    def test_cloudflare_interstitial_markup_on_long_page(self):
+        html = ARTICLE * 4 + '<script src="/cdn-cgi/challenge-platform/h/g/orchestrate/chl_page/v1"></script>'
+        assert classify_page(200, html=html).detection_type == "cloudflare"
+
+    def test_visible_text_strips_markup(self):
+        assert visible_text("<style>a{}</style><p>Hi <b>there</b></p><script>x()</script>") == "Hi there"
+
+
+async def test_classify_live_page_reads_page_and_response():
+    page = MagicMock()
+    page.title = AsyncMock(return_value="Attention Required! | Cloudflare")
+    page.content = AsyncMock(return_value="<html></html>")
+    page.context.cookies = AsyncMock(return_value=[{"name": "__cf_bm"}])
+    response = MagicMock(status=403, headers={"server": "cloudflare"})
+    result = await classify_live_page(page, response)
+    assert result.detection_type == "cloudflare"
+
+
+async def test_classify_live_page_errors_are_ambiguous():
+    page = MagicMock()
+    page.title = AsyncMock(side_effect=RuntimeError("page closed"))
+    assert (await classify_live_page(page)).verdict is Verdict.AMBIGUOUS
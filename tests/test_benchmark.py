@@ -7,12 +7,19 @@ from pathlib import Path
 from backend.benchmark import (
     BenchmarkResult,
     BenchmarkTarget,
+    READINESS_PAGES,
     TARGETS,
     build_summary_table,
+    compare_selector_maps,
+    heavy_page_html,
     interpret_evaluation,
+    load_pages,
     parse_args,
+    run_benchmark,
     run_target,
     select_targets,
+    start_readiness_server,
+    time_rotations,
 )
 
 
@@ -93,6 +100,7 @@ def test_parse_args():
     a2 = parse_args(["--dry-run", "--headless", "--only", "sannysoft", "creepjs", "--timeout", "1000"])
     assert a2.dry_run is True and a2.headless is True
     assert a2.only == ["sannysoft", "creepjs"] and a2.timeout == 1000
+    assert a.concurrency == 1 and parse_args(["--concurrency", "3"]).concurrency == 3
 
 
 # ── run_target with a faked browser ──────────────────────────────────────────
@@ -152,3 +160,89 @@ async def test_run_target_evaluator_error_still_saves_artifacts(tmp_path):
     res = await run_target(bc, target, tmp_path)
     assert res.status == "loaded"  # evaluator failed -> artifact-only, not a crash
     assert (tmp_path / "iphey.png").exists()
+
+
+async def test_run_benchmark_leases_one_context_per_target(tmp_path):
+    from contextlib import asynccontextmanager
+
+    class _FakePool:
+        def __init__(self):
+            self.leases = 0
+            self.active = 0
+            self.peak = 0
+
+        @asynccontextmanager
+        async def leased(self):
+            self.leases += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                yield _FakeBC(_FakePage(["text", "text"]))
+            finally:
+                self.active -= 1
+
+    pool = _FakePool()
+    targets = [BenchmarkTarget(f"t{i}", f"https://t{i}.example/", settle_s=0.01) for i in range(4)]
+    results = await run_benchmark(targets, tmp_path, concurrency=2, pool=pool)
+    assert [r.name for r in results] == ["t0", "t1", "t2", "t3"]
+    assert pool.leases == 4 and pool.peak == 2
+
+
+async def test_time_rotations_summarizes_latency():
+    calls = []
+
+    async def rotate():
+        calls.append(1)
+
+    row = await time_rotations(rotate, 5)
+    assert len(calls) == 5 and row["rounds"] == 5
+    assert 0 <= row["p50_ms"] <= row["max_ms"]
+
+
+def test_parse_args_rotation():
+    assert parse_args([]).rotation == 0
+    assert parse_args(["--rotation", "10"]).rotation == 10
+
+
+def test_parse_args_readiness():
+    assert parse_args([]).readiness == 0
+    assert parse_args(["--readiness", "5"]).readiness == 5
+
+
+async def test_readiness_server_serves_every_page():
+    import aiohttp
+
+    runner, base = await start_readiness_server()
+    try:
+        async with aiohttp.ClientSession() as session:
+            for name, html in READINESS_PAGES.items():
+                async with session.get(f"{base}/page/{name}") as resp:
+                    assert resp.status == 200 and await resp.text() == html
+                    assert "id: 'done'" in html
+            async with session.get(f"{base}/api/slow?ms=10") as resp:
+                assert await resp.text() == "loaded"
+    finally:
+        await runner.cleanup()
+
+
+def test_parse_args_page_state():
+    args = parse_args(["--page-state", "3", "--pages", "saved"])
+    assert (args.page_state, args.pages) == (3, "saved")
+    assert parse_args([]).page_state == 0
+
+
+def test_load_pages_saved_and_generated(tmp_path):
+    (tmp_path / "shop.html").write_text("<html>shop</html>")
+    (tmp_path / "notes.txt").write_text("skip")
+    assert load_pages(str(tmp_path)) == {"shop.html": "<html>shop</html>"}
+    generated = load_pages(None)
+    assert list(generated) == ["catalog_200", "catalog_1000", "catalog_3000"]
+    assert heavy_page_html(3).count("Add to cart") == 3
+
+
+def test_compare_selector_maps():
+    js = [{"index": 0, "tagName": "a", "text": "Home"}, {"index": 1, "tagName": "button", "text": "Buy"},
+          {"index": None, "tagName": "p", "text": "x"}]
+    assert compare_selector_maps(js, js) == 1.0
+    assert compare_selector_maps(js, js[:1]) == 0.5
+    assert compare_selector_maps([], []) == 1.0
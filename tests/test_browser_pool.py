@@ -0,0 +1,295 @@
+"""Tests for the shared Chromium process pool (backend/browser_pool.py).
+
+Playwright is replaced by an in-memory fake — no Chromium is launched.
+"""
+import asyncio
+
+import pytest
+
+import backend.browser_pool as browser_pool
+from backend.browser_pool import BrowserPool, WarmPool
+
+
+class _FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = "about:blank"
+        self._once: dict[str, list] = {}
+
+    async def set_extra_http_headers(self, headers):
+        pass
+
+    def once(self, event, fn):
+        self._once.setdefault(event, []).append(fn)
+
+    def on(self, event, fn):
+        pass
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        for fn in self._once.pop("domcontentloaded", []):
+            fn(self)
+
+
+class _FakeContext:
+    def __init__(self, browser, kwargs):
+        self.browser = browser
+        self.kwargs = kwargs
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.routed = True
+
+    async def unroute(self, pattern, handler):
+        self.routed = False
+
+    async def add_cookies(self, cookies):
+        pass
+
+    async def clear_cookies(self):
+        self.cleared = True
+
+    async def new_page(self):
+        return _FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.contexts: list[_FakeContext] = []
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        ctx = _FakeContext(self, kwargs)
+        self.contexts.append(ctx)
+        return ctx
+
+    async def close(self):
+        self.connected = False
+
+
+class _FakePlaywright:
+    def __init__(self):
+        self.browsers: list[_FakeBrowser] = []
+        self.chromium = self
+        self.stopped = False
+
+    async def launch(self, **kwargs):
+        browser = _FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def fake_play(monkeypatch):
+    play = _FakePlaywright()
+
+    class _Starter:
+        async def start(self):
+            return play
+
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: _Starter())
+    return play
+
+
+async def test_spreads_leases_over_a_few_processes(fake_play):
+    pool = BrowserPool(processes=2, contexts_per_process=3, headless=True)
+    leases = [await pool.lease() for _ in range(6)]
+    assert len(fake_play.browsers) == 2
+    assert sorted(len(b.contexts) for b in fake_play.browsers) == [3, 3]
+    assert pool.stats()["leased"] == 6 and pool.stats()["capacity"] == 6
+    for bc in leases:
+        await pool.release(bc)
+    assert pool.stats()["leased"] == 0
+
+
+async def test_lease_waits_for_a_free_slot(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=1, headless=True)
+    first = await pool.lease()
+    waiter = asyncio.create_task(pool.lease())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    await pool.release(first)
+    second = await asyncio.wait_for(waiter, 1)
+    assert len(fake_play.browsers) == 1
+    await pool.release(second)
+
+
+async def test_release_closes_context_not_process(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=2, headless=True)
+    bc = await pool.lease(proxy={"server": "http://p:1"})
+    ctx = bc.page.context
+    assert ctx.kwargs["proxy"] == {"server": "http://p:1"}
+    await pool.release(bc)
+    assert ctx.closed
+    assert fake_play.browsers[0].is_connected()
+
+
+async def test_crashed_process_is_replaced(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=4, headless=True)
+    bc = await pool.lease()
+    fake_play.browsers[0].connected = False
+    again = await pool.lease()
+    assert len(fake_play.browsers) == 2
+    assert again.browser is fake_play.browsers[1]
+    await pool.release(bc)
+    await pool.release(again)
+
+
+async def test_leased_context_manager_and_close(fake_play):
+    pool = BrowserPool(processes=2, contexts_per_process=2, headless=True)
+    async with pool.leased(block_resources=True) as bc:
+        assert bc.page is not None
+    assert pool.stats()["leased"] == 0
+    await pool.lease()
+    await pool.close()
+    assert fake_play.stopped
+    assert all(not b.is_connected() for b in fake_play.browsers)
+    assert pool.stats()["processes"] == 0 and pool.stats()["leased"] == 0
+
+
+# ── WarmPool ─────────────────────────────────────────────────────────────────
+
+async def test_warm_pool_serves_prelaunched_contexts(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=4, headless=True)
+    warm = WarmPool(pool, size=2)
+    await warm.fill()
+    assert warm.stats()["idle"] == 2 and pool.stats()["leased"] == 2
+
+    bc = await warm.acquire()
+    assert warm.hits == 1 and warm.misses == 0
+    await bc.page.goto("https://example.com")
+    stats = warm.stats()
+    assert stats["hit_rate"] == 1.0
+    assert stats["time_to_first_navigation"]["hit"]["count"] == 1
+    await warm.release(bc)
+    await warm.close()
+
+
+async def test_warm_pool_misses_on_other_proxy(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=4, headless=True)
+    warm = WarmPool(pool, size=1)
+    await warm.fill()
+    bc = await warm.acquire(proxy={"server": "http://other:1"}, block_resources=True)
+    assert warm.misses == 1 and warm.stats()["idle"] == 1
+    assert bc.page.context.kwargs["proxy"] == {"server": "http://other:1"}
+    await warm.release(bc)
+    await warm.close()
+
+
+async def test_warm_hit_applies_resource_blocking(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=4, headless=True)
+    warm = WarmPool(pool, size=1)
+    await warm.fill()
+    bc = await warm.acquire(block_resources=True)
+    assert warm.hits == 1 and bc.page.context.routed
+    await warm.close()
+
+
+async def test_released_context_is_closed_not_reused(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=4, headless=True)
+    warm = WarmPool(pool, size=1)
+    await warm.fill()
+
+    bc = await warm.acquire()
+    ctx = bc.page.context
+    await bc.page.goto("https://example.com")
+    await warm.release(bc)
+    assert ctx.closed and warm.stats()["idle"] == 0
+
+    await warm.fill()
+    again = await warm.acquire()
+    assert again is not bc and again.page.context is not ctx
+    assert again.browser is bc.browser  # same warm process
+    await warm.release(again)
+    await warm.close()
+    assert pool.stats()["leased"] == 0
+
+
+async def test_warm_contexts_leave_a_slot_for_cold_leases(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=2, headless=True)
+    warm = WarmPool(pool, size=5)
+    assert warm.size == 1
+    await warm.fill()
+    # A proxied job misses the (proxy-less) warm context but still gets a slot
+    bc = await asyncio.wait_for(warm.acquire(proxy={"server": "http://job:1"}), 1)
+    assert warm.misses == 1 and pool.stats()["leased"] == 2
+    await warm.release(bc)
+    await warm.close()
+
+
+async def test_background_task_replenishes(fake_play):
+    pool = BrowserPool(processes=1, contexts_per_process=4, headless=True)
+    warm = WarmPool(pool, size=2)
+    await warm.start()
+    for _ in range(50):
+        if warm.stats()["idle"] == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert warm.stats()["idle"] == 2
+    await warm.acquire()
+    for _ in range(50):
+        if warm.stats()["idle"] == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert warm.stats()["idle"] == 2
+    await warm.close()
+    assert pool.stats()["leased"] == 1  # only the context still checked out
+
+
+# ── Proxy rotation on a pooled controller ────────────────────────────────────
+
+async def test_proxy_rotation_opens_new_context_on_same_process(fake_play):
+    from backend.smart_browser_controller import SmartBrowserController
+
+    pool = BrowserPool(processes=1, contexts_per_process=2, headless=True)
+    bc = await pool.lease(proxy={"server": "http://a:1"}, controller_cls=SmartBrowserController)
+    old_ctx, old_profile = bc.page.context, bc._profile
+
+    await bc._restart_browser_with_proxy({"server": "http://b:2"}, "DE")
+    assert len(fake_play.browsers) == 1 and fake_play.browsers[0].is_connected()
+    assert old_ctx.closed
+    new_ctx = bc.page.context
+    assert new_ctx.kwargs["proxy"] == {"server": "http://b:2"}
+    assert bc._profile is not old_profile
+    assert new_ctx.kwargs["user_agent"] == bc._profile.user_agent
+    assert bc.get_proxy_stats()["rotations"] == 1
+    await pool.release(bc)
+    await pool.close()
+
+
+async def test_rotation_swaps_the_jobs_proxy_lease(fake_play):
+    from backend.proxy_manager import ProxyInfo, SmartProxyManager
+    from backend.smart_browser_controller import SmartBrowserController
+
+    manager = SmartProxyManager(proxies=[ProxyInfo(server="http://a:1"), ProxyInfo(server="http://b:2")])
+    manager.max_concurrent_per_proxy = 1
+    first = await manager.acquire_proxy()
+    held = {"lease": first}
+    pool = BrowserPool(processes=1, contexts_per_process=2, headless=True)
+    bc = await pool.lease(proxy=first.to_playwright_dict(), controller_cls=SmartBrowserController)
+    bc.proxy_manager, bc.proxy_lease = manager, first
+    bc.on_lease_change = lambda lease: held.update(lease=lease)
+
+    other = await manager.acquire_proxy()  # the other job's lease fills the second proxy
+    rotated = await bc._rotate_lease("shop.example")
+    # our old slot was freed first, so the limit holds: we get it back rather than sharing `other`
+    assert rotated is first and held["lease"] is first and manager.lease_counts["overcommitted"] == 0
+    await pool.release(bc)
+    assert manager._leases == {id(first): 1, id(other): 1}  # the owner, not the controller, releases
+
+    unowned = await pool.lease(controller_cls=SmartBrowserController)
+    unowned.proxy_manager = manager
+    manager.release_proxy(first)
+    await unowned._rotate_lease("shop.example")
+    await pool.release(unowned)
+    assert manager._leases == {id(other): 1}  # no owner: released on exit
+    await pool.close()
@@ -14,13 +14,20 @@ from backend.bulk_engine import (
     BulkEngine,
     BulkJobConfig,
     BulkJobState,
+    CheckpointLog,
     CookieJar,
     DomainThrottle,
+    ResultSink,
     TaskQueue,
     URLStatus,
     URLTask,
     extract_dom,
+    iter_results,
+    read_results,
+    replay_checkpoint_log,
+    retry_delay,
 )
+from backend.proxy_manager import ProxyInfo, SmartProxyManager
 
 
 # ── URLTask ──────────────────────────────────────────────────────────────────
@@ -39,6 +46,12 @@ class TestURLTask:
         t.status = URLStatus.DONE
         assert t.status == URLStatus.DONE
 
+    def test_uses_slots(self):
+        t = URLTask(url="https://example.com")
+        assert not hasattr(t, "__dict__")
+        with pytest.raises(AttributeError):
+            t.unknown_field = 1
+
 
 # ── BulkJobState ─────────────────────────────────────────────────────────────
 
@@ -63,14 +76,44 @@ class TestBulkJobState:
 
     def test_progress_mixed(self):
         state = self._make_state(5)
-        state.tasks[0].status = URLStatus.DONE
-        state.tasks[1].status = URLStatus.DONE
-        state.tasks[2].status = URLStatus.FAILED
-        state.tasks[3].status = URLStatus.IN_PROGRESS
+        state.transition(state.tasks[0], URLStatus.DONE)
+        state.transition(state.tasks[1], URLStatus.DONE)
+        state.transition(state.tasks[2], URLStatus.FAILED)
+        state.transition(state.tasks[3], URLStatus.IN_PROGRESS)
         assert state.done == 2
         assert state.failed == 1
         assert state.pending == 2
 
+    def test_transition_is_idempotent(self):
+        state = self._make_state(2)
+        state.transition(state.tasks[0], URLStatus.DONE)
+        state.transition(state.tasks[0], URLStatus.DONE)
+        assert state.done == 1
+        assert state.pending == 1
+
+    def test_counters_follow_requeue_cycle(self):
+        state = self._make_state(1)
+        task = state.tasks[0]
+        for status in (URLStatus.IN_PROGRESS, URLStatus.PENDING, URLStatus.IN_PROGRESS, URLStatus.FAILED):
+            state.transition(task, status)
+        assert (state.done, state.failed, state.pending) == (0, 1, 0)
+
+    def test_recounts_when_tasks_are_replaced(self):
+        state = self._make_state(0)
+        state.tasks = [URLTask(url="https://a.com", status=URLStatus.DONE), URLTask(url="https://b.com")]
+        assert state.done == 1
+        assert state.pending == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_transitions_update_counters(self):
+        state = self._make_state(3)
+        q = TaskQueue(state.tasks, transition=state.transition)
+        t = await q.next(0)
+        assert state.pending == 3
+        state.transition(t, URLStatus.DONE)
+        await q.requeue(await q.next(0))
+        assert (state.done, state.pending) == (1, 2)
+
     def test_progress_dict(self):
         state = self._make_state(3)
         state.started_at = time.time()
@@ -137,6 +180,35 @@ class TestDomainThrottle:
         await throttle.report_success("https://example.com/x")
         assert throttle._domain_delay["example.com"] == 8.0
 
+    @pytest.mark.asyncio
+    async def test_domains_proceed_in_parallel(self):
+        throttle = DomainThrottle(default_delay=0.3)
+        domains = [f"https://site{i}.com/page" for i in range(5)]
+        for url in domains:
+            await throttle.wait(url)
+        start = time.time()
+        await asyncio.gather(*[throttle.wait(url) for url in domains])
+        elapsed = time.time() - start
+        # Serialized behind one lock this would take ~5 * 0.3s.
+        assert elapsed < 0.6
+
+    @pytest.mark.asyncio
+    async def test_same_domain_waiters_get_consecutive_slots(self):
+        throttle = DomainThrottle(default_delay=0.2)
+        start = time.time()
+        await asyncio.gather(*[throttle.wait("https://example.com/x") for _ in range(3)])
+        elapsed = time.time() - start
+        assert 0.35 <= elapsed < 0.8
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_pushes_next_slot(self):
+        throttle = DomainThrottle(default_delay=0.1)
+        await throttle.wait("https://example.com/x")
+        await throttle.report_rate_limit("https://example.com/x")
+        start = time.time()
+        await throttle.wait("https://example.com/y")
+        assert time.time() - start >= 0.15
+
     @pytest.mark.asyncio
     async def test_success_doesnt_go_below_default(self):
         throttle = DomainThrottle(default_delay=2.0)
@@ -230,6 +302,20 @@ class TestTaskQueue:
         assert t3 is t1
         assert t3.status == URLStatus.IN_PROGRESS
 
+    @pytest.mark.asyncio
+    async def test_skipped_task_books_no_throttle_slot(self):
+        throttle = DomainThrottle(default_delay=5.0)
+        tasks = [URLTask(url="https://a.com/blocked"), URLTask(url="https://a.com/ok")]
+        q = TaskQueue(tasks, throttle=throttle)
+
+        async def skip(task):
+            return "blocked combo" if "blocked" in task.url else None
+
+        start = time.time()
+        t = await q.next(0, skip=skip)
+        assert t.url == "https://a.com/ok" and time.time() - start < 0.5
+        assert tasks[0].status == URLStatus.SKIPPED and tasks[0].error == "blocked combo"
+
     @pytest.mark.asyncio
     async def test_skips_non_pending(self):
         tasks = [
@@ -240,6 +326,68 @@ class TestTaskQueue:
         t = await q.next(0)
         assert t.url == "https://example.com/1"
 
+    @pytest.mark.asyncio
+    async def test_interleaves_grouped_domains(self):
+        urls = [f"https://a.com/{i}" for i in range(3)] + [f"https://b.com/{i}" for i in range(3)]
+        q = TaskQueue([URLTask(url=u) for u in urls])
+        order = [(await q.next(0)).url for _ in range(4)]
+        assert order == ["https://a.com/0", "https://b.com/0", "https://a.com/1", "https://b.com/1"]
+
+    @pytest.mark.asyncio
+    async def test_picks_domain_whose_slot_opens_soonest(self):
+        throttle = DomainThrottle(default_delay=5.0)
+        await throttle.wait("https://a.com/warmup")
+        tasks = [URLTask(url="https://a.com/1"), URLTask(url="https://b.com/1")]
+        q = TaskQueue(tasks, throttle=throttle)
+        start = time.time()
+        t = await q.next(0)
+        assert t.url == "https://b.com/1"
+        assert time.time() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_next_waits_out_throttle_slot(self):
+        throttle = DomainThrottle(default_delay=0.2)
+        tasks = [URLTask(url="https://a.com/1"), URLTask(url="https://a.com/2")]
+        q = TaskQueue(tasks, throttle=throttle)
+        await q.next(0)
+        start = time.time()
+        await q.next(1)
+        assert time.time() - start >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_delayed_requeue_returns_after_delay(self):
+        q = TaskQueue([URLTask(url="https://example.com/0")])
+        t = await q.next(0)
+        await q.requeue(t, delay_s=0.2)
+        assert t.status == URLStatus.PENDING
+        start = time.time()
+        again = await q.next(1)
+        assert again is t
+        assert time.time() - start >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_ready_work_is_served_before_delayed_retry(self):
+        tasks = [URLTask(url="https://a.com/0"), URLTask(url="https://b.com/0")]
+        q = TaskQueue(tasks)
+        t = await q.next(0)
+        await q.requeue(t, delay_s=5.0)
+        start = time.time()
+        other = await q.next(0)
+        assert other is not t
+        assert time.time() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_waiting_worker_wakes_on_requeue(self):
+        q = TaskQueue([URLTask(url="https://a.com/0"), URLTask(url="https://a.com/1")])
+        t0 = await q.next(0)
+        t1 = await q.next(0)
+        await q.requeue(t0, delay_s=5.0)
+        waiter = asyncio.create_task(q.next(1))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await q.requeue(t1)
+        assert await asyncio.wait_for(waiter, 1.0) is t1
+
     @pytest.mark.asyncio
     async def test_concurrent_safety(self):
         tasks = [URLTask(url=f"https://example.com/{i}") for i in range(100)]
@@ -334,6 +482,9 @@ class TestBulkJobConfig:
         assert config.output_format == "json"
         assert config.use_ai_extraction is False
         assert config.block_resources is True
+        assert config.retry_backoff_s == 2.0
+        assert config.retry_backoff_max_s == 60.0
+        assert config.retry_jitter == 0.5
 
     def test_custom_values(self):
         config = BulkJobConfig(
@@ -352,12 +503,33 @@ class TestBulkJobConfig:
         assert config.block_resources is False
 
 
+# ── retry_delay ──────────────────────────────────────────────────────────────
+
+class TestRetryDelay:
+    def test_exponential_without_jitter(self):
+        config = BulkJobConfig(urls=[], prompt="", retry_backoff_s=1.0, retry_jitter=0.0)
+        assert [retry_delay(n, config) for n in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 8.0]
+
+    def test_capped(self):
+        config = BulkJobConfig(urls=[], prompt="", retry_backoff_s=1.0,
+                               retry_backoff_max_s=5.0, retry_jitter=0.0)
+        assert retry_delay(10, config) == 5.0
+
+    def test_jitter_bounds(self):
+        import random
+        config = BulkJobConfig(urls=[], prompt="", retry_backoff_s=4.0, retry_jitter=0.5)
+        rng = random.Random(7)
+        delays = [retry_delay(1, config, rng) for _ in range(200)]
+        assert all(2.0 <= d <= 6.0 for d in delays)
+        assert len(set(delays)) > 1
+
+
 # ── BulkEngine ───────────────────────────────────────────────────────────────
 
 class TestBulkEngine:
     def _mock_proxy_manager(self):
         pm = MagicMock()
-        pm.get_best_proxy.return_value = None
+        pm.acquire_proxy = AsyncMock(return_value=None)
         pm.mark_proxy_success = MagicMock()
         pm.mark_proxy_failure = MagicMock()
         return pm
@@ -446,11 +618,275 @@ class TestBulkEngine:
         assert "# Bulk Scrape Results" in output
         assert "Page A" in output
 
+    @pytest.mark.asyncio
+    async def test_run_job_retries_after_backoff_and_finishes(self, tmp_path):
+        engine = BulkEngine(proxy_manager=self._mock_proxy_manager())
+        config = BulkJobConfig(
+            urls=["https://a.com/1", "https://b.com/1", "https://c.com/1"], prompt="test",
+            max_workers=2, max_retries=3, per_domain_delay_s=0.0,
+            retry_backoff_s=0.2, retry_jitter=0.0,
+        )
+        state = await engine.create_job(config)
+        calls: dict[str, list[float]] = {}
+
+        async def fake_scrape(bc, task, cfg):
+            calls.setdefault(task.url, []).append(time.monotonic())
+            if task.url == "https://a.com/1" and len(calls[task.url]) == 1:
+                raise RuntimeError("transient")
+            return {"url": task.url}
+
+        engine._launch_browser = AsyncMock(return_value=MagicMock())
+        engine._close_browser = AsyncMock()
+        engine._scrape_url = fake_scrape
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            await engine.run_job(state.job_id)
+
+        assert all(t.status == URLStatus.DONE for t in state.tasks)
+        first, second = calls["https://a.com/1"]
+        assert second - first >= 0.15
+        # the failed URL's wait never blocked the other URLs
+        assert max(calls["https://b.com/1"] + calls["https://c.com/1"]) < second
+
+    async def _run_bot_detected_once(self, detection_type, tmp_path):
+        pm = self._mock_proxy_manager()
+        proxy = ProxyInfo(server="http://p:1")
+        pm.acquire_proxy = AsyncMock(return_value=proxy)
+        engine = BulkEngine(proxy_manager=pm)
+        config = BulkJobConfig(
+            urls=["https://a.com/1", "https://a.com/2"], prompt="test", max_workers=1, max_retries=3,
+            per_domain_delay_s=0.0, retry_backoff_s=0.05, retry_jitter=0.0,
+        )
+        state = await engine.create_job(config)
+        seen: list[str] = []
+
+        async def fake_scrape(bc, task, cfg):
+            seen.append(task.url)
+            if len(seen) == 1:
+                raise BotDetectedError(f"{detection_type} on {task.url}", detection_type)
+            return {"url": task.url}
+
+        engine._launch_browser = AsyncMock(return_value=MagicMock())
+        engine._close_browser = AsyncMock()
+        engine._scrape_url = fake_scrape
+        engine._throttle.report_rate_limit = AsyncMock()
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            await engine.run_job(state.job_id)
+        return engine, pm, proxy, state
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_backs_off_without_blocklisting(self, tmp_path):
+        engine, pm, proxy, state = await self._run_bot_detected_once("rate_limit", tmp_path)
+        assert all(t.status == URLStatus.DONE for t in state.tasks)
+        assert not await engine._blocklist.is_blocked("a.com", proxy.server)
+        engine._throttle.report_rate_limit.assert_awaited_once_with("https://a.com/1")
+        pm.mark_proxy_failure.assert_not_called()
+        assert engine._launch_browser.await_count == 1  # same context and proxy
+
+    @pytest.mark.asyncio
+    async def test_block_page_blocklists_and_reports_detection_type(self, tmp_path):
+        engine, pm, proxy, state = await self._run_bot_detected_once("cloudflare", tmp_path)
+        assert await engine._blocklist.is_blocked("a.com", proxy.server)
+        pm.mark_proxy_failure.assert_called_once_with(proxy, "a.com", "cloudflare")
+        assert engine._launch_browser.await_count == 2  # rotated to a new context
+
+    @pytest.mark.asyncio
+    async def test_launch_leases_seeded_context_from_pool(self):
+        pool = MagicMock()
+        pool.lease = AsyncMock(return_value="bc")
+        pool.release = AsyncMock()
+        engine = BulkEngine(proxy_manager=self._mock_proxy_manager(), browser_pool=pool)
+        proxy = {"server": "http://p:1"}
+        bc = await engine._launch_browser("bulk-seed", proxy, "US", block_resources=True)
+        assert bc == "bc"
+        kwargs = pool.lease.call_args.kwargs
+        assert kwargs["proxy"] is proxy and kwargs["block_resources"] is True
+        assert kwargs["profile"] is not None
+        await engine._close_browser(bc)
+        pool.release.assert_awaited_once_with("bc")
+
     def test_format_results_empty(self):
         engine = BulkEngine(proxy_manager=self._mock_proxy_manager())
         assert engine._format_results([], "csv") == ""
 
 
+# ── Result sink ──────────────────────────────────────────────────────────────
+
+class TestResultSink:
+    def test_appends_one_line_per_record(self, tmp_path):
+        sink = ResultSink(tmp_path / "job.jsonl")
+        sink.write({"url": "https://a.com", "title": "A"})
+        sink.write({"url": "https://b.com", "status": "failed"})
+        # readable before close: lines are flushed as they land
+        assert [r["url"] for r in iter_results(tmp_path / "job.jsonl")] == ["https://a.com", "https://b.com"]
+        sink.close()
+        assert sink.written == 2
+
+    def test_reopen_appends(self, tmp_path):
+        for url in ("https://a.com", "https://b.com"):
+            sink = ResultSink(tmp_path / "job.jsonl")
+            sink.write({"url": url})
+            sink.close()
+        assert len(list(iter_results(tmp_path / "job.jsonl"))) == 2
+
+    def test_csv_rows_share_one_header(self, tmp_path):
+        sink = ResultSink(tmp_path / "job.jsonl", csv_path=tmp_path / "job.csv")
+        sink.write({"url": "https://a.com", "status": "failed", "error": "timeout", "attempts": 2})
+        sink.write({"url": "https://b.com", "title": "B", "status": 200, "extracted": {"x": 1}})
+        sink.close()
+        lines = (tmp_path / "job.csv").read_text().splitlines()
+        assert lines[0] == ",".join(ResultSink.CSV_FIELDS)
+        assert len(lines) == 3 and "timeout" in lines[1] and "https://b.com,B" in lines[2]
+
+    def test_read_results_pages_by_byte_offset(self, tmp_path):
+        sink = ResultSink(tmp_path / "job.jsonl")
+        for i in range(5):
+            sink.write({"url": f"https://a.com/{i}"})
+        sink.close()
+        first, offset = read_results(tmp_path / "job.jsonl", 0, limit=3)
+        rest, end = read_results(tmp_path / "job.jsonl", offset, limit=3)
+        assert [r["url"][-1] for r in first + rest] == list("01234")
+        assert read_results(tmp_path / "job.jsonl", end) == ([], end)
+
+    def test_read_results_leaves_partial_line(self, tmp_path):
+        path = tmp_path / "job.jsonl"
+        path.write_text('{"url": "https://a.com"}\n{"url": "https://b')
+        records, offset = read_results(path)
+        assert records == [{"url": "https://a.com"}]
+        with open(path, "a") as f:
+            f.write('.com"}\n')
+        assert read_results(path, offset)[0] == [{"url": "https://b.com"}]
+
+    def test_read_results_missing_file(self, tmp_path):
+        assert read_results(tmp_path / "nope.jsonl", 7) == ([], 7)
+
+    def test_read_results_realigns_mid_line_offset(self, tmp_path):
+        path = tmp_path / "job.jsonl"
+        path.write_text('{"url": "https://a.com"}\n{"url": "https://b.com"}\n{"url": "https://c')
+        records, offset = read_results(path, 5)
+        assert records == [{"url": "https://b.com"}]
+        assert read_results(path, offset + 3) == ([], offset + 3)  # inside the unfinished line
+
+
+class TestBulkProgressEndpoint:
+    def test_lists_every_task_unless_paged(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "test")
+        import backend.main as main
+
+        config = BulkJobConfig(urls=[f"https://a.com/{i}" for i in range(150)], prompt="test")
+        state = BulkJobState(job_id="job", config=config, tasks=[URLTask(url=u) for u in config.urls])
+        monkeypatch.setattr(main.bulk_engine, "get_job", lambda job_id: state)
+
+        assert len(main.get_bulk_progress("job")["tasks"]) == 150
+        page = main.get_bulk_progress("job", offset=140, limit=20)
+        assert page["tasks_offset"] == 140 and [t["url"] for t in page["tasks"]][0] == "https://a.com/140"
+        assert len(page["tasks"]) == 10
+
+
+class TestBulkResultsEndpoint:
+    def test_pages_through_results(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "test")
+        import backend.main as main
+
+        path = tmp_path / "job.jsonl"
+        sink = ResultSink(path)
+        for i in range(3):
+            sink.write({"url": f"https://a.com/{i}"})
+        sink.close()
+        monkeypatch.setattr(main.bulk_engine, "results_path", lambda job_id: path)
+
+        first = main.get_bulk_results("job", offset=0, limit=2)
+        assert [r["url"] for r in first["results"]] == ["https://a.com/0", "https://a.com/1"]
+        rest = main.get_bulk_results("job", offset=first["next_offset"], limit=2)
+        assert [r["url"] for r in rest["results"]] == ["https://a.com/2"]
+        assert rest["next_offset"] == path.stat().st_size
+
+        # An offset that isn't on a line boundary resumes at the next record
+        bad = main.get_bulk_results("job", offset=first["next_offset"] - 3, limit=2)
+        assert [r["url"] for r in bad["results"]] == ["https://a.com/2"]
+
+
+class TestStreamingOutput:
+    def _engine(self):
+        pm = MagicMock()
+        pm.acquire_proxy = AsyncMock(return_value=None)
+        engine = BulkEngine(proxy_manager=pm)
+
+        async def fake_scrape(bc, task, cfg):
+            if "fail" in task.url:
+                raise RuntimeError("boom")
+            return {"url": task.url, "title": task.url[-1], "extracted": {"n": 1}}
+
+        engine._launch_browser = AsyncMock(return_value=MagicMock())
+        engine._close_browser = AsyncMock()
+        engine._scrape_url = fake_scrape
+        return engine
+
+    async def _run(self, tmp_path, fmt):
+        engine = self._engine()
+        config = BulkJobConfig(
+            urls=["https://a.com/1", "https://b.com/fail", "https://c.com/3"], prompt="test",
+            output_format=fmt, max_retries=1, per_domain_delay_s=0.0,
+        )
+        state = await engine.create_job(config)
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            await engine.run_job(state.job_id)
+        return engine, state
+
+    @pytest.mark.asyncio
+    async def test_json_output_matches_json_dump(self, tmp_path):
+        engine, state = await self._run(tmp_path, "json")
+        records = list(iter_results(tmp_path / f"{state.job_id}.jsonl"))
+        assert len(records) == 3
+        output = (tmp_path / f"{state.job_id}.json").read_text()
+        assert output == json.dumps(records, indent=2, ensure_ascii=False)
+        # finished results live on disk, not in the task list
+        assert all(t.result is None for t in state.tasks)
+
+    @pytest.mark.asyncio
+    async def test_md_and_csv_outputs(self, tmp_path):
+        _, state = await self._run(tmp_path, "md")
+        md = (tmp_path / f"{state.job_id}.md").read_text()
+        assert md.startswith("# Bulk Scrape Results\n\nTotal: 3 pages\n")
+        assert "URL: https://b.com/fail" in md
+
+        _, state = await self._run(tmp_path, "csv")
+        rows = (tmp_path / f"{state.job_id}.csv").read_text().splitlines()
+        assert len(rows) == 4 and rows[0].startswith("url,title,status")
+
+    @pytest.mark.asyncio
+    async def test_workers_lease_and_return_proxies(self, tmp_path):
+        manager = SmartProxyManager(proxies=[ProxyInfo(server="http://p0:8080"), ProxyInfo(server="http://p1:8080")])
+        manager.max_concurrent_per_proxy = 1
+        engine = self._engine()
+        engine._proxy_manager = manager
+        launched = []
+
+        async def launch(seed, proxy, country, block_resources=True):
+            launched.append(proxy["server"])
+            return MagicMock()
+
+        async def scrape(bc, task, cfg):
+            await asyncio.sleep(0.01)
+            return {"url": task.url}
+
+        engine._launch_browser = launch
+        engine._scrape_url = scrape
+        config = BulkJobConfig(urls=[f"https://s{i}.com/1" for i in range(4)], prompt="test",
+                               max_workers=2, per_domain_delay_s=0.0)
+        state = await engine.create_job(config)
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            await engine.run_job(state.job_id)
+        # one proxy per worker, all leases returned
+        assert sorted(launched) == ["http://p0:8080", "http://p1:8080"]
+        assert manager.get_proxy_stats()["leases"]["active"] == 0
+
+    def test_write_output_with_no_results(self, tmp_path):
+        engine = self._engine()
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            path = engine._write_output("empty", "json")
+        assert json.loads(path.read_text()) == []
+
+
 # ── Checkpoint ───────────────────────────────────────────────────────────────
 
 class TestCheckpoint:
@@ -480,6 +916,130 @@ class TestCheckpoint:
         with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
             assert engine._load_checkpoint("nonexistent") is None
 
+    def test_load_legacy_json_checkpoint(self, tmp_path):
+        cp = {
+            "job_id": "old",
+            "config": {"urls": ["https://a.com"], "prompt": "test"},
+            "tasks": [{"url": "https://a.com", "status": "done", "result": {"title": "A"}}],
+        }
+        (tmp_path / "checkpoints").mkdir()
+        (tmp_path / "checkpoints" / "old.json").write_text(json.dumps(cp))
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            loaded = BulkEngine(proxy_manager=MagicMock())._load_checkpoint("old")
+        assert loaded.done == 1
+        # the result moved from the checkpoint into the job's result sink
+        assert list(iter_results(tmp_path / "old.jsonl")) == [{"title": "A"}]
+        assert loaded.tasks[0].result is None
+
+
+def _journal_state(n: int = 4) -> BulkJobState:
+    config = BulkJobConfig(urls=[f"https://site{i}.com" for i in range(n)], prompt="test")
+    return BulkJobState(job_id="wal", config=config, tasks=[URLTask(url=u) for u in config.urls])
+
+
+class TestCheckpointLog:
+    def test_replays_unclosed_journal(self, tmp_path):
+        state = _journal_state()
+        log = CheckpointLog(tmp_path / "wal.log", state)
+        t0, t1, t2, _ = state.tasks
+        for task, status in ((t0, URLStatus.IN_PROGRESS), (t0, URLStatus.DONE), (t1, URLStatus.IN_PROGRESS)):
+            state.transition(task, status)
+            log.append(task)
+        t2.attempts, t2.error = 2, "timeout"
+        state.transition(t2, URLStatus.FAILED)
+        log.append(t2)
+        # no close(): as if the process were killed here
+
+        loaded = replay_checkpoint_log(tmp_path / "wal.log")
+        assert [t.status for t in loaded.tasks] == [
+            URLStatus.DONE, URLStatus.IN_PROGRESS, URLStatus.FAILED, URLStatus.PENDING,
+        ]
+        assert loaded.tasks[2].error == "timeout" and loaded.tasks[2].attempts == 2
+        assert loaded.done == 1 and loaded.failed == 1 and loaded.pending == 2
+
+    def test_ignores_torn_last_line(self, tmp_path):
+        state = _journal_state()
+        log = CheckpointLog(tmp_path / "wal.log", state)
+        state.transition(state.tasks[0], URLStatus.DONE)
+        log.append(state.tasks[0])
+        log.close()
+        with open(tmp_path / "wal.log", "a") as f:
+            f.write('{"i": 1, "s": "do')
+        loaded = replay_checkpoint_log(tmp_path / "wal.log")
+        assert loaded.done == 1 and loaded.tasks[1].status == URLStatus.PENDING
+
+    def test_compacts_after_enough_records(self, tmp_path):
+        state = _journal_state(n=3)
+        log = CheckpointLog(tmp_path / "wal.log", state, compact_min=5)
+        task = state.tasks[0]
+        for _ in range(4):
+            state.transition(task, URLStatus.IN_PROGRESS)
+            log.append(task)
+            state.transition(task, URLStatus.PENDING)
+            log.append(task)
+        log.close()
+        lines = (tmp_path / "wal.log").read_text().splitlines()
+        # header + snapshot of task 0 at the 5th record + the 3 records since
+        assert len(lines) == 5
+        assert replay_checkpoint_log(tmp_path / "wal.log").tasks[0].status == URLStatus.PENDING
+
+    def test_fsync_is_batched(self, tmp_path):
+        state = _journal_state()
+        log = CheckpointLog(tmp_path / "wal.log", state, fsync_every=3, fsync_interval_s=60)
+        with patch("backend.bulk_engine.os.fsync") as fsync:
+            for task in state.tasks:
+                state.transition(task, URLStatus.IN_PROGRESS)
+                log.append(task)
+            assert fsync.call_count == 1
+            log.close()
+            assert fsync.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_after_kill_redoes_only_in_flight(self, tmp_path):
+        pm = MagicMock()
+        pm.acquire_proxy = AsyncMock(return_value=None)
+        config = BulkJobConfig(
+            urls=["https://a.com/1", "https://b.com/1", "https://c.com/hang"], prompt="test",
+            max_workers=3, per_domain_delay_s=0.0,
+        )
+        scraped: list[str] = []
+        hang = True
+
+        async def fake_scrape(bc, task, cfg):
+            scraped.append(task.url)
+            if "hang" in task.url and hang:
+                await asyncio.Event().wait()
+            return {"url": task.url}
+
+        engine = BulkEngine(proxy_manager=pm)
+        engine._launch_browser = AsyncMock(return_value=MagicMock())
+        engine._close_browser = AsyncMock()
+        engine._scrape_url = fake_scrape
+        with patch("backend.bulk_engine.OUTPUT_DIR", tmp_path):
+            state = await engine.create_job(config)
+            run = asyncio.create_task(engine.run_job(state.job_id))
+            while state.done < 2:
+                await asyncio.sleep(0.01)
+            # Snapshot the journal as a kill -9 would leave it, then stop the run.
+            log_path = tmp_path / "checkpoints" / f"{state.job_id}.log"
+            (tmp_path / "killed.log").write_bytes(log_path.read_bytes())
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+            log_path.write_bytes((tmp_path / "killed.log").read_bytes())
+
+            hang = False
+            scraped.clear()
+            fresh = BulkEngine(proxy_manager=pm)
+            fresh._launch_browser = AsyncMock(return_value=MagicMock())
+            fresh._close_browser = AsyncMock()
+            fresh._scrape_url = fake_scrape
+            resumed = await fresh.resume_job(state.job_id)
+
+        assert scraped == ["https://c.com/hang"]
+        assert resumed.done == 3
+        results = list(iter_results(tmp_path / f"{state.job_id}.jsonl"))
+        assert sorted(r["url"] for r in results) == sorted(config.urls)
+
 
 # ── BotDetectedError ─────────────────────────────────────────────────────────
 
@@ -488,3 +1048,5 @@ class TestBotDetectedError:
         err = BotDetectedError("blocked by DataDome")
         assert str(err) == "blocked by DataDome"
         assert isinstance(err, Exception)
+        assert err.detection_type == "unknown"
+        assert BotDetectedError("HTTP 429", "rate_limit").detection_type == "rate_limit"
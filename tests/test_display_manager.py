@@ -0,0 +1,94 @@
+"""Tests for the shared Xvfb display manager (backend/display_manager.py).
+
+Xvfb itself is faked — these run on machines without an X server.
+"""
+import asyncio
+from unittest.mock import patch
+
+from backend.display_manager import DisplayManager
+
+
+class _FakeXvfb:
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = 0
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+
+
+class _FakeManager(DisplayManager):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.spawned: list[_FakeXvfb] = []
+
+    async def _spawn(self):
+        await asyncio.sleep(0.01)  # give concurrent acquirers a chance to race
+        proc = _FakeXvfb()
+        self.spawned.append(proc)
+        return f":{len(self.spawned)}", proc
+
+
+async def test_browsers_share_a_screen_until_it_is_full():
+    dm = _FakeManager(max_displays=3, browsers_per_display=2)
+    displays = [await dm.acquire() for _ in range(5)]
+    assert displays == [":1", ":1", ":2", ":2", ":3"]
+    assert dm.stats()["displays"] == 3 and dm.stats()["browsers"] == 5
+
+
+async def test_concurrent_acquires_do_not_overspawn():
+    dm = _FakeManager(max_displays=4, browsers_per_display=10)
+    displays = await asyncio.gather(*(dm.acquire() for _ in range(10)))
+    assert set(displays) == {":1"}
+    assert len(dm.spawned) == 1
+
+
+async def test_past_max_displays_doubles_up_on_least_loaded():
+    dm = _FakeManager(max_displays=2, browsers_per_display=1)
+    assert [await dm.acquire() for _ in range(2)] == [":1", ":2"]
+    dm.release(":2")
+    assert await dm.acquire() == ":2"
+    assert await dm.acquire() in (":1", ":2")
+    assert len(dm.spawned) == 2
+
+
+async def test_release_frees_a_slot_and_idle_screens_are_reused():
+    dm = _FakeManager(max_displays=2, browsers_per_display=1)
+    d = await dm.acquire()
+    dm.release(d)
+    dm.release(d)  # double release is harmless
+    assert dm.stats()["per_display"] == {":1": 0}
+    assert await dm.acquire() == ":1"
+    assert len(dm.spawned) == 1
+
+
+async def test_dead_screen_is_replaced():
+    dm = _FakeManager(max_displays=2, browsers_per_display=4)
+    assert await dm.acquire() == ":1"
+    dm.spawned[0].returncode = 1
+    assert await dm.acquire() == ":2"
+    assert ":1" not in dm.stats()["per_display"]
+
+
+async def test_close_reaps_every_screen():
+    dm = _FakeManager(max_displays=3, browsers_per_display=1)
+    for _ in range(3):
+        await dm.acquire()
+    await dm.close()
+    assert all(p.returncode == 0 for p in dm.spawned)
+    assert dm.stats()["displays"] == 0
+
+
+async def test_missing_xvfb_returns_none():
+    dm = DisplayManager()
+    with patch("backend.display_manager.subprocess.Popen", side_effect=FileNotFoundError):
+        assert await dm.acquire() is None
+        assert await dm.acquire() is None  # remembered; no second attempt
@@ -0,0 +1,201 @@
+"""Tests for the DOMSnapshot page-state engine (backend/dom_snapshot.py)."""
+from backend.browser_controller import BrowserController
+from backend.dom_snapshot import COMPUTED_STYLES, LABEL_ATTR, parse_snapshot
+
+VIEWPORT = {"width": 1280, "height": 800}
+SHOWN = {"display": "block", "visibility": "visible", "opacity": "1", "cursor": "auto"}
+
+
+class _Snapshot:
+    """Builds a captureSnapshot result node by node, in document order."""
+
+    def __init__(self, scroll_y: float = 0):
+        self.strings: list[str] = []
+        self.nodes = {"parentIndex": [], "nodeType": [], "nodeName": [], "nodeValue": [], "attributes": [],
+                      "inputValue": {"index": [], "value": []}, "optionSelected": {"index": []},
+                      "pseudoType": {"index": [], "value": []}}
+        self.layout = {"nodeIndex": [], "styles": [], "bounds": []}
+        self.scroll_y = scroll_y
+        self.add(-1, 9, "#document")
+
+    def s(self, text: str) -> int:
+        self.strings.append(text)
+        return len(self.strings) - 1
+
+    def add(self, parent, node_type, name, value=None, attrs=None, box=None, style=None, **extra) -> int:
+        n = self.nodes
+        i = len(n["parentIndex"])
+        n["parentIndex"].append(parent)
+        n["nodeType"].append(node_type)
+        n["nodeName"].append(self.s(name))
+        n["nodeValue"].append(self.s(value) if value is not None else -1)
+        n["attributes"].append([self.s(x) for kv in (attrs or {}).items() for x in kv])
+        if "input_value" in extra:
+            n["inputValue"]["index"].append(i)
+            n["inputValue"]["value"].append(self.s(extra["input_value"]))
+        if extra.get("selected"):
+            n["optionSelected"]["index"].append(i)
+        if box is not None:
+            styles = {**SHOWN, **(style or {})}
+            self.layout["nodeIndex"].append(i)
+            self.layout["styles"].append([self.s(styles[k]) for k in COMPUTED_STYLES])
+            self.layout["bounds"].append(list(box))
+        return i
+
+    def el(self, parent, tag, text=None, box=(0, 0, 100, 20), **kw) -> int:
+        i = self.add(parent, 1, tag.upper(), box=box, **kw)
+        if text is not None:
+            self.add(i, 3, "#text", value=text)
+        return i
+
+    def build(self) -> dict:
+        return {"strings": self.strings, "documents": [{
+            "nodes": self.nodes, "layout": self.layout, "scrollOffsetX": 0, "scrollOffsetY": self.scroll_y,
+        }]}
+
+
+def _page():
+    snap = _Snapshot()
+    html = snap.el(0, "html", box=(0, 0, 1280, 2000))
+    body = snap.el(html, "body", box=(0, 0, 1280, 2000))
+    return snap, body
+
+
+def test_indexes_interactive_elements_in_document_order():
+    snap, body = _page()
+    snap.el(body, "h1", "  Title  ")
+    snap.el(body, "a", "Home", attrs={"href": "/"})
+    snap.el(body, "div", "Buy", attrs={"role": "button"})
+    snap.el(body, "span", "Open", style={"cursor": "pointer"})
+    snap.el(body, "div", "Menu", attrs={"onclick": "go()"})
+    snap.el(body, "p", "editable", attrs={"contenteditable": ""})
+    elements = parse_snapshot(snap.build(), VIEWPORT)
+
+    assert [e["tagName"] for e in elements] == ["html", "body", "h1", "a", "div", "span", "div", "p"]
+    assert [e["id"] for e in elements][:3] == ["element_1", "element_2", "element_3"]
+    indexed = [(e["index"], e["text"]) for e in elements if e["index"] is not None]
+    assert indexed == [(0, "Home"), (1, "Buy"), (2, "Open"), (3, "Menu"), (4, "editable")]
+    assert elements[2]["text"] == "Title" and elements[2]["index"] is None
+    assert elements[-1]["isInput"] and elements[3]["attributes"] == {"href": "/"}
+
+
+def test_visibility_and_viewport_rects():
+    snap = _Snapshot(scroll_y=500)
+    html = snap.el(0, "html", box=(0, 0, 1280, 3000))
+    snap.el(html, "p", "above", box=(0, 100, 100, 20))
+    snap.el(html, "p", "shown", box=(10, 600, 100, 20))
+    snap.el(html, "p", "hidden", box=(10, 620, 100, 20), style={"visibility": "hidden"})
+    snap.el(html, "p", "clear", box=(10, 640, 100, 20), style={"opacity": "0"})
+    snap.add(html, 1, "BUTTON")  # display: none - no layout box, but still interactive
+    elements = parse_snapshot(snap.build(), VIEWPORT)
+
+    assert [(e["tagName"], e["text"]) for e in elements][1:] == [("p", "shown"), ("button", "")]
+    shown = elements[1]
+    assert shown["boundingBox"]["top"] == 100 and shown["centerCoordinates"] == {"x": 60, "y": 110}
+    button = next(e for e in elements if e["tagName"] == "button")
+    assert not button["isVisible"] and button["index"] == 0 and button["inputType"] == "submit"
+
+
+def test_form_values_override_text():
+    snap, body = _page()
+    snap.el(body, "input", attrs={"type": "Email", "placeholder": "you@x.com"})
+    snap.el(body, "input", attrs={"placeholder": "Search"}, input_value="shoes")
+    snap.el(body, "textarea", input_value="")
+    select = snap.el(body, "select")
+    snap.el(select, "option", "Small", attrs={"value": "s"})
+    snap.el(select, "option", "Large", attrs={"value": "l"}, selected=True)
+    snap.el(body, "button", "Go", attrs={"value": "submit-go", "tabindex": "0"})
+    snap.el(body, "img", attrs={"alt": "Logo"})
+    elements = parse_snapshot(snap.build(), VIEWPORT)
+
+    email, search, textarea, sel, button = [e for e in elements if e["index"] is not None]
+    assert (email["text"], email["inputType"], email["placeholder"]) == ("you@x.com", "email", "you@x.com")
+    assert search["text"] == "shoes" and textarea["inputType"] == "textarea"
+    assert sel["text"] == "l" and sel["inputType"] == "select-one"
+    assert button["text"] == "submit-go"
+    assert elements[-1]["text"] == "Logo" and elements[-1]["index"] is None
+
+
+def test_skips_shadow_trees_pseudo_elements_and_caps_text():
+    snap, body = _page()
+    host = snap.el(body, "div", "x" * 300)
+    shadow = snap.add(host, 11, "#document-fragment")
+    snap.el(shadow, "button", "inside shadow")
+    snap.add(body, 1, "::before", box=(0, 0, 10, 10))
+    snap.nodes["pseudoType"]["index"].append(len(snap.nodes["parentIndex"]) - 1)
+    snap.el(body, "a", "after")
+    elements = parse_snapshot(snap.build(), VIEWPORT)
+
+    assert [e["tagName"] for e in elements] == ["html", "body", "div", "a"]
+    assert elements[2]["text"] == "x" * 200
+    assert elements[3]["index"] == 0
+
+
+def test_skips_the_highlight_overlay():
+    snap, body = _page()
+    snap.el(body, "a", "Home")
+    layer = snap.el(body, "div", attrs={LABEL_ATTR: ""}, box=(0, 0, 0, 0))
+    snap.el(layer, "div", attrs={LABEL_ATTR: ""}, box=(0, 0, 100, 20), style={"cursor": "pointer"})
+    snap.el(layer, "div", "0", attrs={LABEL_ATTR: ""})
+    snap.el(body, "button", "Buy")
+    elements = parse_snapshot(snap.build(), VIEWPORT)
+
+    assert [(e["id"], e["text"], e["index"]) for e in elements][2:] == [
+        ("element_3", "Home", 0), ("element_4", "Buy", 1)]
+
+
+class _Session:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.calls = []
+
+    async def send(self, method, params=None):
+        self.calls.append((method, params))
+        return self.snapshot
+
+
+class _Context:
+    def __init__(self, session):
+        self.session = session
+        self.opened = 0
+
+    async def new_cdp_session(self, page):
+        self.opened += 1
+        return self.session
+
+
+class _Page:
+    def __init__(self, session):
+        self.context = _Context(session)
+        self.viewport_size = VIEWPORT
+        self.evaluated = []
+
+    async def evaluate(self, js, arg):
+        self.evaluated.append(arg)
+        return {"elements": []}
+
+
+async def test_controller_uses_the_snapshot_engine_and_reuses_its_session():
+    snap, body = _page()
+    snap.el(body, "a", "Home")
+    page = _Page(_Session(snap.build()))
+    bc = BrowserController(headless=True, proxy=None)
+    bc.page, bc.page_state_engine = page, "snapshot"
+
+    for _ in range(2):
+        result = await bc._extract_elements(highlight_elements=False)
+    assert [e["text"] for e in result["elements"] if e["index"] is not None] == ["Home"]
+    assert page.context.opened == 1
+    assert page.context.session.calls[0] == ("DOMSnapshot.captureSnapshot", {"computedStyles": list(COMPUTED_STYLES)})
+
+    await bc._extract_elements(highlight_elements=True)
+    assert page.evaluated[-1][0][0] == 0  # one highlight call with [index, left, top, w, h] boxes
+
+
+async def test_controller_falls_back_to_js_when_snapshot_fails():
+    page = _Page(None)
+    bc = BrowserController(headless=True, proxy=None)
+    bc.page, bc.page_state_engine = page, "snapshot"
+    assert await bc._extract_elements(highlight_elements=False) == {"elements": []}
+    assert page.evaluated == [{"doHighlightElements": False, "reset": False}]
+    assert bc._page_session is None
@@ -0,0 +1,63 @@
+"""Tests for goal-aware element ranking (backend/element_ranking.py)."""
+from backend.browser_controller import ElementInfo, PageState
+from backend.element_ranking import PageIndex, estimate_tokens, page_index, select_elements, tokenize
+
+
+def _elem(index, tag="a", text="", y=100, **attributes):
+    return ElementInfo(index=index, id=f"element_{index}", tag_name=tag, xpath="", css_selector="", text=text,
+                       attributes=attributes, is_clickable=True, is_input=tag in ("input", "textarea"),
+                       center_coordinates={"x": 10, "y": y})
+
+
+def _state(elements, url="https://shop.example/"):
+    return PageState(url, "Shop", elements, {e.index: e for e in elements})
+
+
+def _describe(index, elem):
+    return {"index": index, "tag": elem.tag_name, "text": elem.text}
+
+
+def _long_page():
+    nav = [_elem(i, text=f"Category {i}", href=f"/c/{i}") for i in range(40)]
+    results = [_elem(40 + i, text=f"Unrelated product {i}", y=900 + i * 50, href=f"/p/{i}") for i in range(20)]
+    results.append(_elem(60, text="Apple iPhone 15 Pro 256GB", y=4000, href="/p/iphone-15-pro"))
+    search = _elem(61, tag="input", y=3000, placeholder="Search products", type="search")
+    return _state(nav + results + [search])
+
+
+def test_tokenize_drops_stop_words_and_punctuation():
+    assert tokenize("Go to amazon.com and find the price of iPhone-15!") == ["amazon", "price", "iphone", "15"]
+
+
+def test_goal_match_beats_document_order():
+    shown = select_elements(_long_page(), "find the price of the iphone 15 pro", _describe, max_elements=5)
+    assert 60 in [d["index"] for d in shown]
+    shown = select_elements(_long_page(), "search for running shoes", _describe, max_elements=5)
+    assert 61 in [d["index"] for d in shown]
+    assert [d["index"] for d in shown] == sorted(d["index"] for d in shown)
+
+
+def test_priors_order_elements_without_a_match():
+    state = _state([_elem(0, tag="div", text="Footer", y=5000), _elem(1, text="Home", y=4000),
+                    _elem(2, tag="button", text="Menu", y=50), _elem(3, tag="input", y=60)])
+    assert PageIndex(state.selector_map).rank("zzz") == [3, 2, 1, 0]
+
+
+def test_token_budget_limits_the_selection():
+    state = _long_page()
+    per_element = estimate_tokens(_describe(0, state.selector_map[0]))
+    shown = select_elements(state, "category", _describe, max_elements=50, token_budget=per_element * 3)
+    assert 1 <= len(shown) <= 3
+    assert sum(estimate_tokens(d) for d in shown) <= per_element * 3
+
+
+def test_index_is_reused_across_steps():
+    state = _long_page()
+    first = page_index(state)
+    assert page_index(state) is first  # same selector map: no rebuild
+
+    changed = dict(state.selector_map)
+    changed[62] = _elem(62, text="New arrival")
+    second = page_index(PageState(state.url, state.title, list(changed.values()), changed))
+    assert second is not first and second.reused == len(state.selector_map)
+    assert second.tokens[62] == {"new": 1, "arrival": 1}
@@ -0,0 +1,82 @@
+"""Tests for the per-step screenshot frame (BrowserController.capture_frame)."""
+import base64
+
+from backend.browser_controller import BrowserController
+
+
+class _Session:
+    def __init__(self):
+        self.shots = []
+
+    async def send(self, method, params=None):
+        if method == "Page.getLayoutMetrics":
+            return {"cssVisualViewport": {"pageX": 0, "pageY": 300, "clientWidth": 1600, "clientHeight": 1000}}
+        self.shots.append(params)
+        return {"data": base64.b64encode(f"jpeg{len(self.shots)}".encode()).decode()}
+
+
+class _Context:
+    def __init__(self, session):
+        self.session = session
+
+    async def new_cdp_session(self, page):
+        if self.session is None:
+            raise RuntimeError("no CDP")
+        return self.session
+
+
+class _Page:
+    def __init__(self, session=None):
+        self.context = _Context(session)
+        self.url = "https://shop.example/"
+        self.screenshots = []
+
+    async def screenshot(self, **kwargs):
+        self.screenshots.append(kwargs)
+        return b"fallback"
+
+
+def _controller(page):
+    bc = BrowserController(headless=True, proxy=None)
+    bc.page = page
+    return bc
+
+
+async def test_one_capture_per_step_at_target_size():
+    session = _Session()
+    bc = _controller(_Page(session))
+    first = await bc.capture_frame()
+    assert await bc.capture_frame() is first
+    assert first.jpeg == b"jpeg1" and first.b64 == base64.b64encode(b"jpeg1").decode()
+
+    (params,) = session.shots
+    assert params["format"] == "jpeg" and params["clip"]["y"] == 300
+    assert params["clip"]["scale"] == 0.8  # 1600x1000 viewport down to 1280x800
+    assert bc.get_page_state_stats()["frames_captured"] == 1
+    assert bc.get_page_state_stats()["frames_reused"] == 1
+
+
+async def test_actions_and_navigation_invalidate_the_frame():
+    bc = _controller(_Page(_Session()))
+    first = await bc.capture_frame()
+    await bc.press_key("Enter")  # page.keyboard is missing: the press fails, the frame is still dropped
+    second = await bc.capture_frame()
+    assert second is not first
+
+    bc.page.url = "https://shop.example/cart"
+    assert (await bc.capture_frame()).jpeg == b"jpeg3"
+
+
+async def test_max_age_forces_a_new_capture():
+    bc = _controller(_Page(_Session()))
+    first = await bc.capture_frame()
+    first.captured_at -= 1.0
+    assert await bc.capture_frame(max_age_s=5) is first
+    assert await bc.capture_frame(max_age_s=0.5) is not first
+
+
+async def test_falls_back_to_a_playwright_jpeg():
+    page = _Page(None)
+    bc = _controller(page)
+    assert (await bc.capture_frame()).jpeg == b"fallback"
+    assert page.screenshots == [{"type": "jpeg", "quality": 75, "scale": "css"}]
@@ -0,0 +1,25 @@
+"""Tests for fixed-bucket latency histograms (backend/latency.py)."""
+from backend.latency import LatencyHistogram
+
+
+def test_observations_land_in_their_buckets():
+    h = LatencyHistogram(buckets_ms=(100, 1000))
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        h.observe(seconds)
+    stats = h.stats()
+    assert stats["buckets"] == {"le_100ms": 2, "le_1000ms": 1, "gt_1000ms": 1}
+    assert stats["count"] == 4 and stats["mean_ms"] == 662.5 and stats["max_ms"] == 2000.0
+
+
+def test_percentiles_read_bucket_bounds():
+    h = LatencyHistogram(buckets_ms=(100, 1000))
+    for _ in range(19):
+        h.observe(0.05)
+    h.observe(3.0)
+    assert h.percentile(0.5) == 100.0
+    assert h.percentile(0.95) == 100.0
+    assert h.percentile(1.0) == 3000.0  # the open bucket reports the max seen
+
+
+def test_empty_histogram():
+    assert LatencyHistogram().stats()["p95_ms"] == 0.0
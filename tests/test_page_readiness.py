@@ -0,0 +1,93 @@
+"""Tests for event-driven page readiness (backend/page_readiness.py)."""
+import asyncio
+import time
+
+from backend.page_readiness import track_network, wait_for_ready
+
+QUIET = {"network_quiet_s": 0.05, "dom_quiet_s": 0.05}
+
+
+class _Page:
+    """Emits Playwright-style request events; the DOM goes quiet at ``dom_quiet_at``."""
+
+    def __init__(self, dom_busy_s: float = 0.0, navigations: int = 0):
+        self.listeners: dict = {}
+        self.dom_quiet_at = time.monotonic() + dom_busy_s
+        self.navigations = navigations
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    def emit(self, event, request):
+        for handler in list(self.listeners.get(event, [])):
+            handler(request)
+
+    async def evaluate(self, js, arg):
+        if self.navigations:
+            self.navigations -= 1
+            raise RuntimeError("Execution context was destroyed")
+        quiet_at = self.dom_quiet_at + arg["quietMs"] / 1000
+        give_up_at = time.monotonic() + arg["maxMs"] / 1000
+        await asyncio.sleep(max(0.0, min(quiet_at, give_up_at) - time.monotonic()))
+        return time.monotonic() >= quiet_at
+
+    def is_closed(self):
+        return False
+
+
+async def test_quiet_page_returns_well_before_the_cap():
+    page = _Page()
+    ready = await wait_for_ready(page, max_wait_s=2.0, **QUIET)
+    assert not ready.timed_out and ready.waited_s < 0.5
+    assert all(not handlers for handlers in page.listeners.values())
+
+
+async def test_waits_for_requests_in_flight():
+    page = _Page()
+    waiter = asyncio.create_task(wait_for_ready(page, max_wait_s=2.0, **QUIET))
+    await asyncio.sleep(0.01)
+    page.emit("request", "xhr")
+    await asyncio.sleep(0.2)
+    assert not waiter.done()
+    page.emit("requestfinished", "xhr")
+    ready = await waiter
+    assert not ready.timed_out and 0.25 <= ready.waited_s < 1.0
+
+
+async def test_counts_requests_started_before_the_wait():
+    # e.g. a click fired an XHR before wait_until_ready was called
+    page = _Page()
+    track_network(page)
+    page.emit("request", "xhr")
+    await asyncio.sleep(0.1)
+    waiter = asyncio.create_task(wait_for_ready(page, max_wait_s=2.0, **QUIET))
+    await asyncio.sleep(0.2)
+    assert not waiter.done()
+    page.emit("requestfinished", "xhr")
+    ready = await waiter
+    assert not ready.timed_out and 0.2 <= ready.waited_s < 1.0
+    assert page.listeners["request"]  # the page's tracker stays attached for the next wait
+
+
+async def test_hanging_request_is_capped():
+    page = _Page()
+    waiter = asyncio.create_task(wait_for_ready(page, max_wait_s=0.3, **QUIET))
+    await asyncio.sleep(0)
+    page.emit("request", "long-poll")
+    ready = await waiter
+    assert ready.timed_out and 0.3 <= ready.waited_s < 0.5
+
+
+async def test_waits_for_dom_to_stop_changing():
+    ready = await wait_for_ready(_Page(dom_busy_s=0.3), max_wait_s=2.0, **QUIET)
+    assert not ready.timed_out and 0.3 <= ready.waited_s < 1.0
+    ready = await wait_for_ready(_Page(dom_busy_s=5.0), max_wait_s=0.2, **QUIET)
+    assert ready.timed_out
+
+
+async def test_survives_navigation_mid_wait():
+    ready = await wait_for_ready(_Page(navigations=2), max_wait_s=2.0, **QUIET)
+    assert not ready.timed_out
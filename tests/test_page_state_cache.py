@@ -0,0 +1,182 @@
+"""Tests for get_page_state's use of the in-page element cache (BrowserController).
+
+The tests at the end run the extraction script itself in headless Chromium and
+are skipped when it cannot be launched.
+"""
+import pytest
+from patchright.async_api import async_playwright
+
+from backend.browser_controller import BrowserController
+
+
+def _element(index, text):
+    return {"index": index, "id": f"element_{index + 1}", "tagName": "a", "text": text,
+            "attributes": {}, "isClickable": True, "isInput": False, "centerCoordinates": {"x": 1, "y": 2}}
+
+
+class _Page:
+    """Answers the extraction script with queued results and records its arguments."""
+
+    def __init__(self, results, url="https://shop.example/"):
+        self.results = list(results)
+        self.calls = []
+        self.url = url
+
+    async def wait_for_load_state(self, *args, **kwargs):
+        pass
+
+    async def title(self):
+        return "Shop"
+
+    async def evaluate(self, js, arg):
+        self.calls.append(arg)
+        return self.results.pop(0)
+
+
+def _controller(page):
+    bc = BrowserController(headless=True, proxy=None)
+    bc.page = page
+
+    async def ready(max_wait_s):
+        pass
+
+    bc.wait_until_ready = ready
+    return bc
+
+
+def _full(*texts, reused=0):
+    return {"elements": [_element(i, t) for i, t in enumerate(texts)],
+            "stats": {"reused": reused, "extracted": len(texts), "full": not reused}}
+
+
+async def test_unchanged_page_reuses_the_previous_state():
+    page = _Page([_full("Home", "Cart"), {"unchanged": True, "stats": {"reused": 2, "extracted": 0, "full": False}}])
+    bc = _controller(page)
+
+    first = await bc.get_page_state(include_screenshot=False)
+    second = await bc.get_page_state(include_screenshot=False)
+    assert [c["reset"] for c in page.calls] == [True, False]
+    assert second.selector_map is first.selector_map and second.selector_map[1].text == "Cart"
+
+    stats = bc.get_page_state_stats()
+    assert (stats["steps"], stats["full_scans"], stats["unchanged"]) == (2, 1, 1)
+    assert stats["cache_hit_ratio"] == 0.5 and stats["extraction_ms_avg"] >= 0
+
+
+async def test_url_change_resets_the_cache():
+    page = _Page([_full("Home"), _full("Results")])
+    bc = _controller(page)
+    await bc.get_page_state(include_screenshot=False)
+    page.url = "https://shop.example/#/search"
+    state = await bc.get_page_state(include_screenshot=False)
+    assert page.calls[-1]["reset"] is True
+    assert state.selector_map[0].text == "Results"
+
+
+async def test_unchanged_without_a_cached_state_rescans():
+    # e.g. a warm context handed to a new controller: the page kept its cache, we did not
+    page = _Page([{"unchanged": True, "stats": {"reused": 1, "extracted": 0, "full": False}}, _full("Home")])
+    bc = _controller(page)
+    bc._cached_url = page.url
+    state = await bc.get_page_state(include_screenshot=False)
+    assert [c["reset"] for c in page.calls] == [False, True]
+    assert state.selector_map[0].text == "Home"
+
+
+async def test_failed_extraction_drops_the_cache():
+    page = _Page([_full("Home")])
+    bc = _controller(page)
+    await bc.get_page_state(include_screenshot=False)
+    state = await bc.get_page_state(include_screenshot=False)  # evaluate raises: no result queued
+    assert state.selector_map == {} and bc._cached_page_state is None
+
+
+# ── The extraction script in a real page ────────────────────────────────────
+
+@pytest.fixture
+async def chromium_page():
+    async with async_playwright() as play:
+        try:
+            browser = await play.chromium.launch(headless=True)
+        except Exception:
+            pytest.skip("Chromium cannot be launched here")
+        try:
+            yield await browser.new_page()
+        finally:
+            await browser.close()
+
+
+async def _extract(page):
+    js = BrowserController(headless=True, proxy=None).dom_js
+    result = await page.evaluate(js, {"doHighlightElements": False, "reset": False})
+    if result.get("unchanged"):
+        return result, {}
+    return result, {e["attributes"].get("id"): e for e in result["elements"] if e["attributes"].get("id")}
+
+
+async def test_untouched_elements_keep_their_index_when_a_sibling_is_inserted(chromium_page):
+    page = chromium_page
+    await page.set_content('<div id="list"><a id="a" href="#a">One</a><a id="b" href="#b">Two</a></div>')
+    _, before = await _extract(page)
+    assert (before["a"]["index"], before["b"]["index"]) == (0, 1)
+
+    await page.evaluate("""() => {
+        const link = Object.assign(document.createElement('a'), {id: 'new', href: '#new', textContent: 'Zero'});
+        document.getElementById('list').prepend(link);
+    }""")
+    result, after = await _extract(page)
+    assert (after["a"]["index"], after["b"]["index"], after["new"]["index"]) == (0, 1, 2)
+    assert not result["stats"]["full"] and result["stats"]["reused"] >= 2  # a and b came from the cache
+
+    result, _ = await _extract(page)
+    assert result["unchanged"]
+
+
+async def test_ancestor_attribute_change_re_extracts_its_subtree(chromium_page):
+    page = chromium_page
+    await page.set_content('<div id="wrap"><p><a id="link" href="#x">Link</a></p></div><a id="other" href="#y">Y</a>')
+    _, before = await _extract(page)
+    assert before["link"]["isVisible"]
+
+    # Only #wrap's style attribute changes, but its descendants' computed styles follow
+    await page.evaluate("() => { document.getElementById('wrap').style.visibility = 'hidden'; }")
+    result, after = await _extract(page)
+    assert not after["link"]["isVisible"] and after["link"]["index"] == before["link"]["index"]
+    assert after["other"]["isVisible"] and not result["stats"]["full"]
+
+
+async def test_sibling_rule_change_re_extracts_the_following_element(chromium_page):
+    page = chromium_page
+    await page.set_content(
+        '<style>.b { visibility: hidden } .a:checked + .b { visibility: visible }</style>'
+        '<input id="toggle" class="a" type="checkbox"><a id="link" class="b" href="#x">Link</a>'
+    )
+    _, before = await _extract(page)
+    assert not before["link"]["isVisible"]
+
+    # Neither the link nor its ancestors change; only the preceding sibling's state
+    await page.check("#toggle")
+    result, after = await _extract(page)
+    assert after["link"]["isVisible"] and not result["stats"]["full"]
+
+
+async def test_resize_and_late_stylesheet_re_extract_computed_styles(chromium_page):
+    page = chromium_page
+    await page.set_viewport_size({"width": 400, "height": 600})
+    await page.set_content(
+        '<style>#wide { visibility: hidden } @media (min-width: 800px) { #wide { visibility: visible } }</style>'
+        '<a id="wide" href="#w">Wide</a><a id="late" href="#l">Late</a>'
+    )
+    _, before = await _extract(page)
+    assert not before["wide"]["isVisible"] and before["late"]["isVisible"]
+
+    await page.set_viewport_size({"width": 1000, "height": 600})
+    _, after = await _extract(page)
+    assert after["wide"]["isVisible"]
+
+    await page.evaluate("""() => {
+        const style = Object.assign(document.createElement('style'), {textContent: '#late { visibility: hidden }'});
+        document.head.append(style);
+    }""")
+    _, after = await _extract(page)
+    assert not after["late"]["isVisible"]
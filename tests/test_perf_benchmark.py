@@ -0,0 +1,76 @@
+"""Tests for the browser-free performance benchmarks (backend/perf_benchmark.py)."""
+
+from backend.bulk_engine import TaskQueue, URLStatus, URLTask
+from backend.perf_benchmark import (
+    bench_queue,
+    bench_scheduler,
+    drain_with_retries,
+    format_report,
+    grouped_urls,
+    parse_args,
+    simulate_proxy_picks,
+    task_bytes,
+    time_progress,
+    time_proxy_selection,
+)
+
+
+def test_grouped_urls_are_grouped_by_domain():
+    urls = grouped_urls(domains=2, per_domain=3)
+    assert len(urls) == 6
+    assert all("site0." in u for u in urls[:3])
+    assert all("site1." in u for u in urls[3:])
+
+
+def test_format_report():
+    table = format_report("T", [{"scheduler": "fifo", "pages": 4}, {"scheduler": "interleaved", "pages": 4}])
+    assert table.splitlines()[0] == "T"
+    assert "interleaved" in table and "pages" in table
+    assert format_report("empty", []) == "empty"
+
+
+def test_parse_args_scheduler():
+    a = parse_args(["scheduler", "--domains", "2", "--workers", "4"])
+    assert a.bench == "scheduler" and a.domains == 2 and a.workers == 4
+
+
+async def test_interleaved_scheduler_beats_fifo_on_grouped_list():
+    fifo, interleaved = await bench_scheduler(domains=3, per_domain=3, workers=3, delay_s=0.05, page_s=0.005)
+    assert fifo["pages"] == interleaved["pages"] == 9
+    assert interleaved["pages_per_min"] > fifo["pages_per_min"] * 1.5
+
+
+async def test_drain_with_retries_finishes_every_task():
+    tasks = [URLTask(url=f"https://site{i % 3}.example/{i}") for i in range(20)]
+    await drain_with_retries(TaskQueue(tasks), retry_every=4)
+    assert all(t.status == URLStatus.DONE for t in tasks)
+
+
+async def test_bench_queue_rows():
+    rows = await bench_queue([200], retry_every=5)
+    assert rows[0]["tasks"] == 200
+    assert rows[0]["speedup"].endswith("x")
+
+
+def test_task_bytes_is_compact():
+    # a slotted URLTask is well under the ~300 bytes of a __dict__-backed one
+    assert 0 < task_bytes(2000) < 200
+
+
+def test_progress_cost_stays_flat_as_job_grows():
+    small = time_progress(500, emits=50)
+    large = time_progress(50000, emits=50)
+    assert large["scan_us"] > small["scan_us"] * 10
+    # counters are O(1): allow generous noise, but nothing like the 100x of a scan
+    assert large["counters_us"] < small["counters_us"] * 10
+
+
+def test_proxy_index_beats_sort_and_scan_on_large_pool():
+    row = time_proxy_selection(2000, navigations=50)
+    assert row["proxies"] == 2000
+    assert row["indexed_us"] < row["sort_scan_us"]
+
+
+def test_bandit_beats_global_ranking_on_mixed_pool():
+    global_, bandit = (simulate_proxy_picks(p, n_proxies=20, domains=4, navigations=1200) for p in ("global", "bandit"))
+    assert bandit["ok_per_min"] > global_["ok_per_min"]
@@ -1,5 +1,7 @@
+import asyncio
 import json
 import pytest
+from unittest.mock import AsyncMock, MagicMock
 from backend.proxy_manager import ProxyInfo, ProxyHealth, SmartProxyManager
 
 
@@ -164,4 +166,351 @@ class TestSmartProxyManager:
         manager.proxies = [degraded_proxy]
         manager.mark_proxy_success(degraded_proxy)
         assert degraded_proxy.consecutive_failures == 0
-        assert degraded_proxy.health == ProxyHealth.HEALTHY
\ No newline at end of file
+        assert degraded_proxy.health == ProxyHealth.HEALTHY
+
+
+def _page(title, html):
+    page = MagicMock()
+    page.title = AsyncMock(return_value=title)
+    page.content = AsyncMock(return_value=html)
+    page.context.cookies = AsyncMock(return_value=[])
+    return page
+
+
+class TestDetectAntiBot:
+    """Local heuristics decide clear cases; only ambiguous pages reach the vision model."""
+
+    async def test_clean_and_blocked_pages_skip_vision(self, empty_proxy_manager):
+        vision = MagicMock()
+        vision.analyze_anti_bot_page = AsyncMock()
+        empty_proxy_manager.vision_model = vision
+
+        clean = _page("Docs", "<p>" + "Real documentation text. " * 20 + "</p>")
+        assert await empty_proxy_manager.detect_anti_bot(clean, "goal", MagicMock(status=200, headers={})) == (False, "", None)
+        blocked = _page("Just a moment...", "<html></html>")
+        is_bot, kind, action = await empty_proxy_manager.detect_anti_bot(blocked, "goal", MagicMock(status=403, headers={}))
+        assert is_bot and kind == "cloudflare" and action == "rotate_proxy"
+
+        vision.analyze_anti_bot_page.assert_not_called()
+        stats = empty_proxy_manager.get_proxy_stats()["anti_bot"]
+        assert stats["navigations"] == 2 and stats["escalated"] == 0
+        assert stats["llm_avoided_rate"] == 1.0
+
+    async def test_ambiguous_page_escalates_to_vision(self, empty_proxy_manager):
+        vision = MagicMock()
+        vision.analyze_anti_bot_page = AsyncMock(return_value={
+            "is_anti_bot": True, "detection_type": "verification", "suggested_action": "abort",
+        })
+        empty_proxy_manager.vision_model = vision
+        page = _page("Example", "<div id='app'></div>")
+        page.screenshot = AsyncMock(return_value=b"png")
+        page.url = "https://example.com"
+
+        result = await empty_proxy_manager.detect_anti_bot(page, "goal", MagicMock(status=200, headers={}))
+        assert result == (True, "verification", "abort")
+        assert empty_proxy_manager.get_anti_bot_stats()["llm_avoided_rate"] == 0.0
+
+    async def test_escalation_uses_the_callers_frame(self, empty_proxy_manager):
+        vision = MagicMock()
+        vision.analyze_anti_bot_page = AsyncMock(return_value={"is_anti_bot": False})
+        empty_proxy_manager.vision_model = vision
+        page = _page("Example", "<div id='app'></div>")
+        page.screenshot = AsyncMock()
+        page.url = "https://example.com"
+        capture = AsyncMock(return_value=b"jpeg")
+
+        await empty_proxy_manager.detect_anti_bot(page, "goal", capture=capture)
+        capture.assert_awaited_once()
+        page.screenshot.assert_not_called()
+        assert vision.analyze_anti_bot_page.await_args.args[0] == "anBlZw=="
+
+    async def test_without_vision_model_ambiguous_counts_as_clean(self, empty_proxy_manager):
+        page = _page("Example", "<div id='app'></div>")
+        assert await empty_proxy_manager.detect_anti_bot(page, "goal") == (False, "", None)
+        assert empty_proxy_manager.anti_bot_counts["escalated"] == 0
+
+    async def test_repeated_challenge_page_uses_cached_verdict(self, empty_proxy_manager):
+        import io
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 48), "navy").save(buf, format="PNG")
+
+        vision = MagicMock()
+        vision.analyze_anti_bot_page = AsyncMock(return_value={
+            "is_anti_bot": True, "detection_type": "verification", "suggested_action": "abort", "confidence": 0.8,
+        })
+        empty_proxy_manager.vision_model = vision
+        page = _page("Example", "<div id='app'></div>")
+        page.screenshot = AsyncMock(return_value=buf.getvalue())
+        page.url = "https://example.com/a"
+
+        for _ in range(3):
+            assert await empty_proxy_manager.detect_anti_bot(page, "goal") == (True, "verification", "abort")
+        assert vision.analyze_anti_bot_page.await_count == 1
+        cache = empty_proxy_manager.get_proxy_stats()["anti_bot"]["verdict_cache"]
+        assert cache["hits"] == 2 and cache["misses"] == 1
+
+
+class TestProxyIndex:
+    """get_best_proxy / find_proxy stay correct as proxies are marked or edited."""
+
+    def test_find_proxy_by_playwright_dict(self, proxy_manager_with_proxies):
+        target = proxy_manager_with_proxies.proxies[1]
+        assert proxy_manager_with_proxies.find_proxy(target.to_playwright_dict()) is target
+        assert proxy_manager_with_proxies.find_proxy({"server": "http://nope:1"}) is None
+        assert proxy_manager_with_proxies.find_proxy(None) is None
+
+    def test_find_proxy_normalizes_bare_host(self):
+        proxy = ProxyInfo(server="10.0.0.1:8080", username="u")
+        manager = SmartProxyManager(proxies=[proxy])
+        assert manager.find_proxy({"server": "http://10.0.0.1:8080", "username": "u"}) is proxy
+
+    def test_ranking_follows_marks(self, proxy_manager_with_proxies):
+        manager = proxy_manager_with_proxies
+        first, second, third = manager.proxies
+        assert manager.get_best_proxy() is first
+        manager.mark_proxy_failure(first)
+        assert manager.get_best_proxy() is second
+        manager.mark_proxy_success(second)
+        # second and third both at 100%; third has never been used, so it goes first
+        assert manager.get_best_proxy() is third
+        for _ in range(3):
+            manager.mark_proxy_failure(third)
+        assert third.health == ProxyHealth.FAILED
+        assert manager.get_best_proxy() is second
+
+    def test_least_recently_used_wins_ties(self, proxy_manager_with_proxies):
+        manager = proxy_manager_with_proxies
+        for p in manager.proxies:
+            manager.mark_proxy_success(p, response_time=0.2)
+        assert manager.get_best_proxy() is manager.proxies[0]
+        manager.mark_proxy_success(manager.proxies[0], response_time=0.2)
+        assert manager.get_best_proxy() is manager.proxies[1]
+
+    def test_index_rebuilds_when_proxy_list_changes(self, empty_proxy_manager):
+        assert empty_proxy_manager.get_best_proxy() is None
+        added = ProxyInfo(server="http://new:1")
+        empty_proxy_manager.proxies.append(added)
+        assert empty_proxy_manager.get_best_proxy() is added
+        assert empty_proxy_manager.find_proxy({"server": "http://new:1"}) is added
+
+    def test_domain_pick_learns_per_site(self, proxy_manager_with_proxies):
+        manager = proxy_manager_with_proxies
+        fast, medium, slow = manager.proxies
+        for _ in range(15):
+            manager.mark_proxy_success(slow, response_time=0.5, domain="shop.com")
+            manager.mark_proxy_failure(fast, "shop.com", "timeout")
+            manager.mark_proxy_success(fast, response_time=0.5, domain="news.com")
+        picks = [manager.get_best_proxy(exclude_blocked_for="shop.com") for _ in range(50)]
+        assert picks.count(slow) > 40
+        assert manager.get_best_proxy(exclude_blocked_for="news.com") is not None
+
+    def test_site_block_does_not_retire_proxy(self, healthy_proxy):
+        manager = SmartProxyManager(proxies=[healthy_proxy])
+        for site in ("a.com", "b.com", "c.com", "d.com"):
+            manager.mark_proxy_failure(healthy_proxy, site, "cloudflare")
+        assert healthy_proxy.health == ProxyHealth.BLOCKED
+        assert healthy_proxy.consecutive_failures == 0
+        assert manager.get_best_proxy(exclude_blocked_for="e.com") is healthy_proxy
+        assert manager.get_best_proxy(exclude_blocked_for="a.com") is healthy_proxy  # fallback ignores blocks, as before
+
+
+# ── Background health checks (against a local stand-in proxy) ───────────────
+
+class _StandInProxy:
+    """Tiny forward proxy on localhost: answers every proxied request itself with 204."""
+
+    def __init__(self, require_auth: str | None = None):
+        self.require_auth = require_auth
+        self.requests: list[str] = []
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        head = (await reader.readuntil(b"\r\n\r\n")).decode()
+        self.requests.append(head.split("\r\n", 1)[0])
+        if self.require_auth and f"Proxy-Authorization: Basic {self.require_auth}" not in head:
+            writer.write(b"HTTP/1.1 407 Proxy Authentication Required\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        else:
+            writer.write(b"HTTP/1.1 204 No Content\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+
+def _closed_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestHealthChecks:
+    PROBE_URL = "http://probe.test/generate_204"
+
+    async def test_probe_updates_health_and_latency(self):
+        async with _StandInProxy() as up:
+            good = ProxyInfo(server=f"http://127.0.0.1:{up.port}")
+            dead = ProxyInfo(server=f"127.0.0.1:{_closed_port()}")
+            manager = SmartProxyManager(proxies=[good, dead])
+            good.health = ProxyHealth.DEGRADED
+
+            result = await manager.probe_proxies(url=self.PROBE_URL, timeout_s=2)
+            assert result == {"probed": 2, "healthy": 1, "revived": 0}
+            assert up.requests == [f"GET {self.PROBE_URL} HTTP/1.1"]
+            assert good.health == ProxyHealth.HEALTHY and good.probe_latency > 0
+            assert good.response_time == good.probe_latency  # no navigation history yet
+            assert dead.health == ProxyHealth.DEGRADED and dead.probe_failures == 1
+
+            await manager.probe_proxies(url=self.PROBE_URL, timeout_s=2)
+            assert dead.health == ProxyHealth.FAILED and dead.failed_at > 0
+            assert manager.get_best_proxy() is good
+            assert manager.get_proxy_stats()["health_checks"]["rounds"] == 2
+
+    async def test_proxy_credentials_are_sent(self):
+        import base64
+        token = base64.b64encode(b"user:secret").decode()
+        async with _StandInProxy(require_auth=token) as up:
+            ok = ProxyInfo(server=f"http://127.0.0.1:{up.port}", username="user", password="secret")
+            wrong = ProxyInfo(server=f"http://127.0.0.1:{up.port}", username="user", password="nope")
+            manager = SmartProxyManager(proxies=[ok, wrong])
+            result = await manager.probe_proxies(url=self.PROBE_URL, timeout_s=2)
+            assert result["healthy"] == 1
+            assert wrong.probe_failures == 1 and ok.probe_failures == 0
+
+    async def test_failed_proxy_revived_after_cooldown(self):
+        async with _StandInProxy() as up:
+            proxy = ProxyInfo(server=f"http://127.0.0.1:{up.port}")
+            manager = SmartProxyManager(proxies=[proxy])
+            for _ in range(3):
+                manager.mark_proxy_failure(proxy)
+            assert proxy.health == ProxyHealth.FAILED
+
+            # still cooling down: not probed
+            assert (await manager.probe_proxies(url=self.PROBE_URL, cooldown_s=60))["probed"] == 0
+            assert manager.get_best_proxy() is None
+
+            result = await manager.probe_proxies(url=self.PROBE_URL, cooldown_s=0)
+            assert result["revived"] == 1
+            assert proxy.health == ProxyHealth.HEALTHY and proxy.consecutive_failures == 0
+            assert manager.get_best_proxy() is proxy
+
+    async def test_socks_proxies_are_skipped(self):
+        manager = SmartProxyManager(proxies=[ProxyInfo(server="socks5://127.0.0.1:1080")])
+        assert (await manager.probe_proxies(url=self.PROBE_URL))["probed"] == 0
+
+    async def test_background_loop_starts_and_stops(self):
+        async with _StandInProxy() as up:
+            manager = SmartProxyManager(proxies=[ProxyInfo(server=f"http://127.0.0.1:{up.port}")])
+            manager.start_health_checks(interval_s=0)
+            assert not manager.get_proxy_stats()["health_checks"]["running"]
+            manager.start_health_checks(interval_s=3600)
+            for _ in range(100):
+                if manager.health_check_counts["rounds"]:
+                    break
+                await asyncio.sleep(0.01)
+            assert manager.get_proxy_stats()["health_checks"]["running"]
+            await manager.stop_health_checks()
+            assert not manager.get_proxy_stats()["health_checks"]["running"]
+            assert manager.health_check_counts["rounds"] == 1
+
+
+class TestSharedManager:
+    def test_controllers_share_one_manager(self, monkeypatch):
+        import backend.proxy_manager as proxy_manager
+        from backend.smart_browser_controller import SmartBrowserController
+        vision = MagicMock()
+        shared = SmartProxyManager(vision_model=vision, proxies=[ProxyInfo(server="http://a:8080")])
+        monkeypatch.setattr(proxy_manager, "_shared_manager", shared)
+        assert proxy_manager.get_shared_proxy_manager() is shared
+
+        first = SmartBrowserController(headless=True, proxy=None)
+        second = SmartBrowserController(headless=True, proxy=None)
+        assert first.proxy_manager is second.proxy_manager is shared
+        assert first.vision_model is vision
+        # a failure seen by one job steers the next one away
+        first.proxy_manager.mark_proxy_failure(shared.proxies[0], "shop.com", "cloudflare")
+        assert "shop.com" in second.proxy_manager.proxies[0].blocked_sites
+
+    def test_injected_instances_win(self):
+        from backend.smart_browser_controller import SmartBrowserController
+        manager, vision = SmartProxyManager(proxies=[]), MagicMock()
+        bc = SmartBrowserController(headless=True, proxy=None, proxy_manager=manager, vision_model=vision)
+        assert bc.proxy_manager is manager and bc.vision_model is vision
+
+    def test_reload_keeps_learned_state(self, monkeypatch):
+        monkeypatch.setenv("SCRAPER_PROXIES", json.dumps(["http://a:8080", "http://b:8080"]))
+        manager = SmartProxyManager()
+        a = manager.proxies[0]
+        manager.mark_proxy_success(a, 0.5)
+        monkeypatch.setenv("SCRAPER_PROXIES", json.dumps(["a:8080", "http://c:8080"]))
+        manager.reload_proxies()
+        assert manager.proxies[0] is a and a.success_count == 1
+        assert [p.server for p in manager.proxies] == ["http://a:8080", "http://c:8080"]
+        assert manager.get_best_proxy() in manager.proxies
+
+
+class TestProxyLeases:
+    def _manager(self, n=3, limit=2):
+        manager = SmartProxyManager(proxies=[ProxyInfo(server=f"http://p{i}:8080") for i in range(n)])
+        manager.max_concurrent_per_proxy = limit
+        return manager
+
+    async def test_leases_spread_over_the_pool(self):
+        manager = self._manager()
+        held = [await manager.acquire_proxy() for _ in range(6)]
+        assert sorted(p.server for p in held) == sorted([p.server for p in manager.proxies] * 2)
+        assert manager.get_proxy_stats()["leases"]["active"] == 6
+        for p in held:
+            manager.release_proxy(p)
+        assert manager.get_proxy_stats()["leases"]["active"] == 0
+
+    async def test_full_pool_waits_for_a_release(self):
+        manager = self._manager(n=1, limit=1)
+        first = await manager.acquire_proxy()
+        waiter = asyncio.create_task(manager.acquire_proxy(timeout_s=5))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        manager.release_proxy(first)
+        assert await asyncio.wait_for(waiter, 1) is first
+        assert manager.lease_counts["waited"] == 1 and manager.lease_counts["overcommitted"] == 0
+
+    async def test_full_pool_shares_least_loaded_after_timeout(self):
+        manager = self._manager(n=2, limit=1)
+        await manager.acquire_proxy(), await manager.acquire_proxy()
+        await manager.acquire_proxy(timeout_s=0)  # both full: shares one
+        assert manager.lease_counts["overcommitted"] == 1
+        assert sorted(manager._leases.values()) == [1, 2]
+
+    async def test_leases_skip_proxies_blocked_for_the_domain(self):
+        manager = self._manager()
+        manager.mark_proxy_failure(manager.proxies[0], "shop.com", "cloudflare")
+        picks = [await manager.acquire_proxy(domain="shop.com") for _ in range(4)]
+        assert manager.proxies[0] not in picks
+
+    async def test_sticky_sessions(self):
+        manager = self._manager(n=3, limit=5)
+        first = await manager.acquire_proxy(domain="shop.com", sticky_key="s1")
+        manager.release_proxy(first)
+        for _ in range(5):
+            p = await manager.acquire_proxy(domain="shop.com", sticky_key="s1")
+            assert p is first
+            manager.release_proxy(p)
+        assert manager.lease_counts["sticky_hits"] == 5
+        # a block for the domain moves the session to another exit, which then sticks
+        manager.mark_proxy_failure(first, "shop.com", "cloudflare")
+        moved = await manager.acquire_proxy(domain="shop.com", sticky_key="s1")
+        assert moved is not first
+        assert await manager.acquire_proxy(domain="shop.com", sticky_key="s1") is moved
+
+    async def test_no_proxies(self):
+        manager = SmartProxyManager(proxies=[])
+        assert await manager.acquire_proxy() is None
+        manager.release_proxy(None)
@@ -0,0 +1,73 @@
+"""Tests for per-(proxy, domain) Thompson scoring (backend/proxy_scoring.py)."""
+import random
+
+from backend.proxy_scoring import ProxyScorer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wins(scorer, a, b, domain, draws=400):
+    return sum(scorer.sample(a, domain) > scorer.sample(b, domain) for _ in range(draws)) / draws
+
+
+def test_reliable_proxy_wins_most_draws():
+    scorer = ProxyScorer(rng=random.Random(1))
+    for _ in range(10):
+        scorer.record("good", "shop.com", True, 1.0)
+        scorer.record("bad", "shop.com", False)
+    assert _wins(scorer, "good", "bad", "shop.com") > 0.95
+
+
+def test_scores_are_per_domain():
+    scorer = ProxyScorer(rng=random.Random(2))
+    for _ in range(10):
+        scorer.record("p1", "a.com", True, 1.0)
+        scorer.record("p1", "b.com", False)
+        scorer.record("p2", "a.com", False)
+        scorer.record("p2", "b.com", True, 1.0)
+    assert _wins(scorer, "p1", "p2", "a.com") > 0.9
+    assert _wins(scorer, "p2", "p1", "b.com") > 0.9
+
+
+def test_faster_proxy_preferred_at_equal_success():
+    scorer = ProxyScorer(rng=random.Random(3))
+    for _ in range(20):
+        scorer.record("fast", "a.com", True, 0.4)
+        scorer.record("slow", "a.com", True, 4.0)
+    assert _wins(scorer, "fast", "slow", "a.com") > 0.95
+
+
+def test_old_history_decays():
+    clock = _Clock()
+    scorer = ProxyScorer(half_life_s=60, clock=clock, rng=random.Random(4))
+    for _ in range(20):
+        scorer.record("p", "a.com", False)
+    clock.now += 600  # ten half-lives: 20 failures now weigh ~0.02
+    arm = scorer._domains["a.com"]["p"]
+    assert sum(arm.decayed(clock.now, 60)) < 0.05
+    scorer.record("p", "a.com", True, 1.0)
+    assert arm.successes == 1 and arm.failures < 0.05
+
+
+def test_prior_from_other_domains():
+    scorer = ProxyScorer(rng=random.Random(5))
+    for _ in range(30):
+        scorer.record("veteran", "x.com", True, 1.0)
+        scorer.record("flaky", "x.com", False)
+    # neither has been tried on new.com; the all-domain record tips the balance
+    assert _wins(scorer, "veteran", "flaky", "new.com") > 0.7
+    assert list(scorer.tried("new.com")) == []
+
+
+def test_domain_count_is_bounded():
+    scorer = ProxyScorer(max_domains=2)
+    for d in ("a.com", "b.com", "c.com"):
+        scorer.record("p", d, True, 1.0)
+    assert len(scorer) == 2 and list(scorer.tried("a.com")) == []
+    assert scorer.stats()["arms"] == 2
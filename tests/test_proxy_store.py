@@ -0,0 +1,89 @@
+"""Tests for persisted proxy stats (backend/proxy_store.py)."""
+import asyncio
+import time
+
+from backend.proxy_manager import ProxyHealth, ProxyInfo, SmartProxyManager
+from backend.proxy_store import ProxyStore
+
+
+def _manager(store, servers=("http://a:8080", "http://b:8080")):
+    return SmartProxyManager(proxies=[ProxyInfo(server=s, username="u") for s in servers], store=store)
+
+
+def test_missing_store_loads_empty(tmp_path):
+    assert ProxyStore(tmp_path / "none.db").load() == ({}, [])
+
+
+def test_stats_survive_a_restart(tmp_path):
+    store = ProxyStore(tmp_path / "stats" / "proxies.db")
+    manager = _manager(store)
+    a, b = manager.proxies
+    manager.mark_proxy_success(a, 0.8, "shop.com")
+    manager.mark_proxy_failure(b, "shop.com", "cloudflare")
+    for _ in range(3):
+        manager.mark_proxy_failure(b)
+    manager.save_stats()
+
+    restarted = _manager(store)
+    a2, b2 = restarted.proxies
+    assert (a2.success_count, a2.response_time, a2.health) == (1, 0.8, ProxyHealth.HEALTHY)
+    # health checks are off by default, so b comes back on probation rather than dead for good
+    assert b2.health == ProxyHealth.DEGRADED and b2.failed_at > 0
+    assert b2.consecutive_failures == restarted.max_consecutive_failures - 1
+    assert b2.failure_count == 4 and b2.blocked_sites == {"shop.com"}
+    assert list(restarted.scorer.tried("shop.com")) == [a.key, b.key]
+    assert restarted.get_best_proxy() is a2
+    restarted.mark_proxy_failure(b2)
+    assert b2.health == ProxyHealth.FAILED
+
+
+def test_failed_proxy_waits_for_the_health_checker(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.proxy_manager.PROXY_HEALTH_CHECK_INTERVAL_S", 60)
+    store = ProxyStore(tmp_path / "proxies.db")
+    manager = _manager(store)
+    b = manager.proxies[1]
+    for _ in range(3):
+        manager.mark_proxy_failure(b)
+    manager.save_stats()
+
+    # still cooling down: the prober will revive it
+    assert _manager(store).proxies[1].health == ProxyHealth.FAILED
+    # past its cooldown: on probation until the next probe or navigation
+    monkeypatch.setattr("backend.proxy_manager.PROXY_FAILED_COOLDOWN_S", 0)
+    assert _manager(store).proxies[1].health == ProxyHealth.DEGRADED
+
+
+def test_unknown_and_unconfigured_proxies(tmp_path):
+    store = ProxyStore(tmp_path / "proxies.db")
+    manager = _manager(store, servers=("http://old:8080",))
+    manager.mark_proxy_success(manager.proxies[0], 1.0, "a.com")
+    manager.save_stats()
+
+    fresh = _manager(store, servers=("new:8080",))
+    assert fresh.proxies[0].success_count == 0
+    fresh.save_stats()
+    saved, scores = store.load()
+    # the old proxy's row and scores are kept in case it is configured again
+    assert set(saved) == {("http://old:8080", "u"), ("http://new:8080", "u")}
+    assert {row[2] for row in scores} == {"", "a.com"}
+
+
+async def test_background_flush_and_final_save(tmp_path):
+    store = ProxyStore(tmp_path / "proxies.db")
+    manager = _manager(store)
+    manager.start_stats_flush(interval_s=0.01)
+    manager.mark_proxy_success(manager.proxies[0], 0.5)
+    deadline = time.time() + 2
+    while not manager.last_flushed and time.time() < deadline:
+        await asyncio.sleep(0.01)
+    assert store.load()[0][("http://a:8080", "u")]["success_count"] == 1
+    manager.mark_proxy_success(manager.proxies[0], 0.5)
+    await manager.stop_stats_flush()
+    assert store.load()[0][("http://a:8080", "u")]["success_count"] == 2
+
+
+def test_no_store_is_a_no_op():
+    manager = SmartProxyManager(proxies=[ProxyInfo(server="http://a:8080")])
+    manager.save_stats()
+    manager.start_stats_flush()
+    assert manager._flush_task is None
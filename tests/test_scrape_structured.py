@@ -7,7 +7,7 @@ import os
 os.environ.setdefault("GOOGLE_API_KEY", "test")
 
 from types import SimpleNamespace
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import backend.main as main
 from backend.main import StructuredScrapeRequest, scrape_structured, _parse_rows
@@ -21,8 +21,17 @@ class _FakePage:
         if "bad" in url:
             raise RuntimeError("navigation blocked")
 
-    async def wait_for_timeout(self, ms):
-        return None
+    def on(self, event, handler):
+        pass
+
+    def remove_listener(self, event, handler):
+        pass
+
+    async def evaluate(self, js, arg=None):
+        return True  # DOM already quiet
+
+    def is_closed(self):
+        return False
 
     async def title(self):
         return "Shoes"
@@ -35,18 +44,26 @@ class _FakeBC:
     def __init__(self, *a, **k):
         self.page = _FakePage()
 
-    async def __aenter__(self):
-        return self
 
-    async def __aexit__(self, *a):
-        return False
+class _FakePool:
+    def __init__(self):
+        self.leased = 0
+
+    async def acquire(self, **kwargs):
+        self.leased += 1
+        return _FakeBC()
+
+    async def release(self, bc):
+        self.leased -= 1
 
 
 def _wire(monkeypatch, text=_ROWS_JSON):
-    monkeypatch.setattr(main, "BrowserController", _FakeBC)
+    pool = _FakePool()
+    monkeypatch.setattr(main, "warm_pool", pool)
     monkeypatch.setattr(main, "MODEL",
                         SimpleNamespace(generate_content=MagicMock(return_value=SimpleNamespace(text=text))))
-    monkeypatch.setattr(main.smart_proxy_manager, "get_best_proxy", lambda: None)
+    monkeypatch.setattr(main.smart_proxy_manager, "acquire_proxy", AsyncMock(return_value=None))
+    return pool
 
 
 # ── pure parser ──────────────────────────────────────────────────────────────
@@ -62,9 +79,10 @@ def test_parse_rows_array_aware():
 
 # ── endpoint ─────────────────────────────────────────────────────────────────
 async def test_scrape_structured_happy(monkeypatch):
-    _wire(monkeypatch)
+    pool = _wire(monkeypatch)
     out = await scrape_structured(StructuredScrapeRequest(
         urls=["https://nike.com/a", "https://adidas.com/b"], prompt="compare shoe prices"))
+    assert pool.leased == 0  # the leased context went back to the pool
     assert out["success"] is True
     assert len(out["rows"]) == 4  # 2 rows per URL x 2 URLs
     assert all(r["_source_url"] in ("https://nike.com/a", "https://adidas.com/b") for r in out["rows"])
@@ -0,0 +1,81 @@
+"""Tests for the anti-bot verdict cache (backend/verdict_cache.py)."""
+import io
+
+from PIL import Image, ImageDraw
+
+from backend.verdict_cache import VerdictCache, normalize_title, perceptual_hash
+
+CHALLENGE = {"is_anti_bot": True, "detection_type": "cloudflare", "suggested_action": "rotate_proxy", "confidence": 0.9}
+
+
+def _png(text: str = "Checking your browser", spinner: int = 0) -> bytes:
+    image = Image.new("RGB", (320, 200), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((40, 60, 280, 140), fill="black")
+    draw.text((60, 90), text, fill="white")
+    draw.point((300 + spinner % 3, 190), fill="gray")
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_perceptual_hash_is_stable_and_tolerant():
+    a, b = perceptual_hash(_png()), perceptual_hash(_png(spinner=1))
+    assert a is not None and (a ^ b).bit_count() <= 4
+    blank = io.BytesIO()
+    Image.new("RGB", (320, 200), "white").save(blank, format="PNG")
+    assert (a ^ perceptual_hash(blank.getvalue())).bit_count() > 4
+    assert perceptual_hash(b"not an image") is None
+
+
+def test_normalize_title():
+    assert normalize_title("  Just a Moment...  Ray 8123 ") == "just a moment... ray #"
+
+
+def test_hit_for_same_and_near_identical_page():
+    cache = VerdictCache()
+    h = perceptual_hash(_png())
+    assert cache.get("shop.com", "Just a moment...", h) is None
+    cache.put("shop.com", "Just a moment...", h, CHALLENGE)
+    assert cache.get("shop.com", "just a moment... ", h) == CHALLENGE
+    assert cache.get("shop.com", "Just a moment...", h ^ 0b11) == CHALLENGE
+    assert cache.get("other.com", "Just a moment...", h) is None
+    assert cache.get("shop.com", "Just a moment...", ~h & (2**64 - 1)) is None
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 3, "hit_rate": 0.4}
+
+
+def test_cached_verdict_is_a_copy():
+    cache = VerdictCache()
+    cache.put("a.com", "t", 1, CHALLENGE)
+    cache.get("a.com", "t", 1)["detection_type"] = "mutated"
+    assert cache.get("a.com", "t", 1)["detection_type"] == "cloudflare"
+
+
+def test_entries_expire():
+    clock = _Clock()
+    cache = VerdictCache(ttl_s=60, clock=clock)
+    cache.put("a.com", "t", 1, CHALLENGE)
+    clock.now = 59
+    assert cache.get("a.com", "t", 1) is not None
+    clock.now = 61
+    assert cache.get("a.com", "t", 1) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = VerdictCache(max_entries=2, max_distance=0)
+    cache.put("a.com", "t", 1, CHALLENGE)
+    cache.put("b.com", "t", 2, CHALLENGE)
+    cache.get("a.com", "t", 1)
+    cache.put("c.com", "t", 3, CHALLENGE)
+    assert cache.get("b.com", "t", 2) is None
+    assert cache.get("a.com", "t", 1) is not None
+    assert cache.get("c.com", "t", 3) is not None
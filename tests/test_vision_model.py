@@ -35,7 +35,9 @@ with patch.dict(os.environ, {"GOOGLE_API_KEY": "fake-key"}):
         extract_search_query,
         get_fallback_action,
         extract_token_usage,
+        prepare_image,
     )
+    import backend.vision_model as vision_model
 
 
 class TestDetectWebsiteType:
@@ -225,3 +227,83 @@ class TestExtractTokenUsage:
         type(response).usage_metadata = property(lambda self: (_ for _ in ()).throw(Exception("fail")))
         result = extract_token_usage(response)
         assert result is None
+
+
+class TestPrepareImage:
+
+    @staticmethod
+    def _image(fmt, size):
+        import io
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new("RGB", size, "navy").save(buf, format=fmt)
+        return buf.getvalue()
+
+    def test_frame_sized_jpeg_is_passed_through(self):
+        jpeg = self._image("JPEG", (1280, 800))
+        assert prepare_image(jpeg) == {"mime_type": "image/jpeg", "data": jpeg}
+
+    def test_png_and_oversized_images_are_recompressed(self):
+        import io
+        from PIL import Image
+        for raw in (self._image("PNG", (1250, 800)), self._image("JPEG", (2560, 1600))):
+            part = prepare_image(raw)
+            image = Image.open(io.BytesIO(part["data"]))
+            assert image.format == "JPEG" and image.width <= 1280 and image.height <= 800
+
+
+class TestDecideTokenAccounting:
+    """decide() makes exactly one model call; usage comes from the response or a local estimate."""
+
+    @staticmethod
+    def _state():
+        elem = MockElement(tag_name="a", text="Pricing", is_clickable=True, attributes={"href": "/pricing"})
+        elem.center_coordinates = {"x": 10, "y": 10}
+        return MockPageState(selector_map={0: elem})
+
+    @staticmethod
+    def _model(usage):
+        model = MagicMock()
+        response = MagicMock()
+        response.text = '{"action": "click", "index": 0, "reason": "pricing"}'
+        response.usage_metadata = usage
+        response.result = None
+        response.candidates = None
+        model.generate_content.return_value = response
+        return model
+
+    async def test_usage_from_response_metadata(self):
+        usage = MagicMock(prompt_token_count=1200, candidates_token_count=30, total_token_count=1230)
+        model = self._model(usage)
+        img = TestPrepareImage._image("JPEG", (640, 400))
+        before = vision_model.get_decision_stats()["model"]["count"]
+        with patch.object(vision_model, "MODEL", model):
+            result = await vision_model.decide(img, self._state(), "find pricing")
+        assert result["action"] == "click" and result["token_usage"]["total_tokens"] == 1230
+        assert model.generate_content.call_count == 1
+        model.count_tokens.assert_not_called()
+        assert result["latency_ms"] >= 0
+        assert vision_model.get_decision_stats()["model"]["count"] == before + 1
+
+    async def test_estimates_locally_without_metadata(self):
+        model = self._model(None)
+        img = TestPrepareImage._image("JPEG", (1280, 800))
+        with patch.object(vision_model, "MODEL", model):
+            result = await vision_model.decide(img, self._state(), "find pricing")
+        usage = result["token_usage"]
+        # two 768px tiles across, two down: 4 * 258 image tokens plus the text
+        assert usage["prompt_tokens"] > 4 * 258 and usage["response_tokens"] == 13
+        model.count_tokens.assert_not_called()
+
+    async def test_optional_async_estimator(self):
+        model = self._model(None)
+        calls = []
+
+        async def estimator(content):
+            calls.append(content)
+            return 999
+
+        with patch.object(vision_model, "MODEL", model):
+            result = await vision_model.decide(TestPrepareImage._image("JPEG", (64, 64)), self._state(), "x",
+                                               token_estimator=estimator)
+        assert result["token_usage"]["prompt_tokens"] == 999 and len(calls) == 1